@@ -0,0 +1,222 @@
+"""
+Benchmarks plugins, rules and full scans over a synthetic corpus.
+
+    python -m tests.benchmarks.bench --output results.json
+    python -m tests.benchmarks.bench --compare results.json
+
+Results are written as JSON so that runs on different commits can be compared.
+"""
+
+import json
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser, Namespace
+from collections import defaultdict
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from tests.benchmarks.corpus import RENDERERS, generate_corpus
+from whispers.__version__ import __version__
+from whispers.cli import parse_args
+from whispers.core import run
+from whispers.plugins import WhisperPlugins
+from whispers.rules import WhisperRules
+from whispers.utils import LineIndex, Pair
+
+
+def measure(fn: Callable[[], int], repeat: int) -> dict:
+    """Times fn, which returns the number of items it processed"""
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        start = perf_counter()
+        items = fn()
+        timings.append(perf_counter() - start)
+    return {"min": min(timings), "median": median(timings), "items": items}
+
+
+def corpus_files(corpus: str) -> List[str]:
+    return sorted(path.as_posix() for path in Path(corpus).rglob("*") if path.is_file())
+
+
+def bench_plugins(corpus: str, repeat: int) -> Dict[str, dict]:
+    """Times WhisperPlugins.pairs per plugin over all corpus files it handles"""
+    rules = WhisperRules()
+    groups = defaultdict(list)
+    for filename in corpus_files(corpus):
+        plugin = WhisperPlugins(filename, rules).plugin
+        if plugin:
+            groups[type(plugin).__name__].append(filename)
+
+    ret = {}
+    for name, files in sorted(groups.items()):
+
+        def parse(files=files):
+            return sum(1 for filename in files for _ in WhisperPlugins(filename, rules).pairs())
+
+        result = measure(parse, repeat)
+        result["bytes"] = sum(Path(filename).stat().st_size for filename in files)
+        ret[f"plugins.{name}"] = result
+    return ret
+
+
+def corpus_pairs(corpus: str) -> Dict[str, List[Pair]]:
+    """Collects the pairs of every corpus file, as seen by the rules"""
+    rules = WhisperRules()
+    ret = {}
+    for filename in corpus_files(corpus):
+        pairs = []
+        for pair in WhisperPlugins(filename, rules).pairs():
+            if not isinstance(pair, Pair):
+                pair = Pair(*pair)
+            if isinstance(pair.value, (str, int)):
+                pairs.append(pair._replace(key=str(pair.key or ""), value=str(pair.value)))
+        ret[filename] = pairs
+    return ret
+
+
+def bench_rules(corpus: str, repeat: int) -> Dict[str, dict]:
+    """Times WhisperRules.check per rule over all corpus pairs"""
+    pairs = corpus_pairs(corpus)
+    ret = {}
+    for rule_id in sorted(WhisperRules().rules):
+        rules = WhisperRules(ruleslist=rule_id)
+
+        def check(rules=rules):
+            found = 0
+            for filename, items in pairs.items():
+                filepath = Path(filename)
+                lines = LineIndex(filepath)
+                for pair in items:
+                    found += sum(1 for _ in rules.check(pair.key, pair.value, filepath, lines, pair.line))
+            return found
+
+        result = measure(check, repeat)
+        result["pairs"] = sum(len(items) for items in pairs.values())
+        ret[f"rules.{rule_id}"] = result
+    return ret
+
+
+def bench_run(corpus: str, repeat: int, jobs: int = 1) -> Dict[str, dict]:
+    """Times core.run end to end, as the CLI does"""
+
+    def scan():
+        args = parse_args(["-j", str(jobs), corpus])
+        return sum(1 for _ in run(args))
+
+    return {f"run.jobs{jobs}": measure(scan, repeat)}
+
+
+def bench_startup(corpus: str, repeat: int) -> Dict[str, dict]:
+    """Times the CLI scanning a single file in a fresh interpreter, as a pre-commit hook does"""
+
+    def spawn(arguments: List[str]) -> Callable[[], int]:
+        def call():
+            subprocess.run([sys.executable] + arguments, stdout=subprocess.DEVNULL, check=True)
+            return 1
+
+        return call
+
+    ret = {"startup.python": measure(spawn(["-c", "pass"]), repeat)}
+    first = {}
+    for filename in corpus_files(corpus):
+        first.setdefault(Path(filename).suffix.lstrip("."), filename)
+    for filetype, filename in sorted(first.items()):
+        ret[f"startup.{filetype}"] = measure(spawn(["-m", "whispers.cli", filename]), repeat)
+    return ret
+
+
+def git_revision() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    return proc.stdout.decode().strip() or None
+
+
+def compare(results: dict, baseline: dict):
+    """Prints timings relative to a baseline result file"""
+    print(f"{'benchmark':40} {'baseline':>10} {'current':>10} {'ratio':>8}")
+    for name, result in results["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if not old:
+            print(f"{name:40} {'-':>10} {result['min']:10.4f} {'-':>8}")
+            continue
+        ratio = result["min"] / old["min"] if old["min"] else 0
+        print(f"{name:40} {old['min']:10.4f} {result['min']:10.4f} {ratio:8.2f}")
+
+
+def bench_parser() -> ArgumentParser:
+    parser = ArgumentParser("bench", description="Benchmark whispers over a synthetic corpus")
+    parser.add_argument("--corpus", default=None, help="corpus directory (default: generated into a temp dir)")
+    parser.add_argument("--files", default=10, type=int, help="generated files per format")
+    parser.add_argument("--entries", default=1000, type=int, help="key/value entries per generated file")
+    parser.add_argument("--density", default=0.01, type=float, help="fraction of entries that are secrets")
+    parser.add_argument("--seed", default=0, type=int, help="corpus random seed")
+    parser.add_argument("--formats", default=",".join(RENDERERS), help="comma-separated corpus formats")
+    parser.add_argument("--repeat", default=3, type=int, help="runs per benchmark, the fastest is reported")
+    parser.add_argument("--jobs", default="1", help="comma-separated job counts for full runs")
+    parser.add_argument("--only", default="plugins,rules,run,startup", help="comma-separated benchmark groups")
+    parser.add_argument("--output", default=None, help="write results to a JSON file")
+    parser.add_argument("--compare", default=None, help="baseline JSON file to compare with")
+    return parser
+
+
+def bench(args: Namespace, corpus: str) -> dict:
+    groups = args.only.split(",")
+    benchmarks = {}
+    if "plugins" in groups:
+        benchmarks.update(bench_plugins(corpus, args.repeat))
+    if "rules" in groups:
+        benchmarks.update(bench_rules(corpus, args.repeat))
+    if "run" in groups:
+        for jobs in args.jobs.split(","):
+            benchmarks.update(bench_run(corpus, args.repeat, int(jobs)))
+    if "startup" in groups:
+        benchmarks.update(bench_startup(corpus, args.repeat))
+    return {
+        "meta": {
+            "whispers": __version__,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": args.corpus
+            or {
+                "files": args.files,
+                "entries": args.entries,
+                "density": args.density,
+                "seed": args.seed,
+                "formats": args.formats.split(","),
+            },
+            "repeat": args.repeat,
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def main(arguments: Optional[List[str]] = None) -> dict:
+    args = bench_parser().parse_args(arguments)
+    if args.corpus:
+        results = bench(args, args.corpus)
+    else:
+        with TemporaryDirectory(prefix="whispers-bench-") as corpus:
+            generate_corpus(corpus, args.files, args.entries, args.density, args.seed, args.formats.split(","))
+            results = bench(args, corpus)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return results
+
+
+if __name__ == "__main__":
+    main()
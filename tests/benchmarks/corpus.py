@@ -0,0 +1,214 @@
+"""
+Deterministic synthetic corpus for benchmarks.
+
+The same seed, size and density always produce byte-identical trees, with
+secrets planted at known lines so that results can also be checked for recall.
+"""
+
+import json
+import string
+from collections import namedtuple
+from pathlib import Path
+from random import Random
+from typing import Callable, Dict, List, Tuple
+
+# Secret planted at a known location, rule is the expected rule ID
+Planted = namedtuple("Planted", ["file", "line", "rule"])
+
+WORDS = [
+    "alpha",
+    "bravo",
+    "cache",
+    "delta",
+    "engine",
+    "format",
+    "gamma",
+    "index",
+    "jitter",
+    "kernel",
+    "label",
+    "mode",
+    "node",
+    "output",
+    "queue",
+    "region",
+    "stage",
+    "timeout",
+    "unit",
+    "volume",
+    "worker",
+    "zone",
+]
+
+SECTION_SIZE = 20  # Entries per nested section
+
+
+class Generator:
+    """Produces filler and secret entries from a seeded random source"""
+
+    def __init__(self, seed: str, density: float):
+        self.random = Random(seed)
+        self.density = density
+
+    def word(self) -> str:
+        return self.random.choice(WORDS)
+
+    def key(self) -> str:
+        return f"{self.word()}_{self.word()}"
+
+    def filler(self) -> str:
+        kind = self.random.randrange(4)
+        if kind == 0:
+            return str(self.random.randrange(100000))
+        if kind == 1:
+            return " ".join(self.word() for _ in range(self.random.randrange(2, 6)))
+        if kind == 2:
+            return f"https://{self.word()}.example.com/{self.word()}"
+        return "-".join(self.word() for _ in range(3))
+
+    def token(self, alphabet: str, length: int) -> str:
+        return "".join(self.random.choice(alphabet) for _ in range(length))
+
+    def secret(self) -> Tuple[str, str, str]:
+        """Returns a (key, value, rule ID) triple"""
+        if self.random.randrange(2):
+            value = self.token(string.ascii_letters + string.digits, 15) + self.random.choice(string.digits)
+            return f"{self.word()}_password", value, "password"
+        value = "AKIA" + self.token(string.ascii_uppercase, 15) + self.random.choice(string.digits)
+        return f"{self.word()}_id", value, "aws-id"
+
+    def entries(self, count: int) -> List[Tuple[str, str, str]]:
+        """Returns (key, value, rule ID or empty) entries"""
+        ret = []
+        for _ in range(count):
+            if self.random.random() < self.density:
+                ret.append(self.secret())
+            else:
+                ret.append((self.key(), self.filler(), ""))
+        return ret
+
+
+def sections(entries: list) -> List[Tuple[str, list]]:
+    ret = []
+    for idx in range(0, len(entries), SECTION_SIZE):
+        ret.append((f"section_{len(ret)}", entries[idx:][:SECTION_SIZE]))
+    return ret
+
+
+def render_yml(gen: Generator, count: int) -> Tuple[List[str], Dict[int, str]]:
+    lines, planted = [], {}
+    for name, entries in sections(gen.entries(count)):
+        lines.append(f"{name}:")
+        for key, value, rule in entries:
+            lines.append(f"  {key}: {json.dumps(value)}")
+            if rule:
+                planted[len(lines)] = rule
+    return lines, planted
+
+
+def render_json(gen: Generator, count: int) -> Tuple[List[str], Dict[int, str]]:
+    lines, planted = ["{"], {}
+    blocks = sections(gen.entries(count))
+    for idx, (name, entries) in enumerate(blocks):
+        lines.append(f'  "{name}": {{')
+        for jdx, (key, value, rule) in enumerate(entries):
+            comma = "," if jdx < len(entries) - 1 else ""
+            lines.append(f'    "{key}": {json.dumps(value)}{comma}')
+            if rule:
+                planted[len(lines)] = rule
+        lines.append("  }," if idx < len(blocks) - 1 else "  }")
+    lines.append("}")
+    return lines, planted
+
+
+def render_xml(gen: Generator, count: int) -> Tuple[List[str], Dict[int, str]]:
+    lines, planted = ['<?xml version="1.0" encoding="UTF-8"?>', "<configuration>"], {}
+    for name, entries in sections(gen.entries(count)):
+        lines.append(f'  <section name="{name}">')
+        for key, value, rule in entries:
+            value = value.replace("&", "&amp;").replace("<", "&lt;")
+            lines.append(f"    <{key}>{value}</{key}>")
+            if rule:
+                planted[len(lines)] = rule
+        lines.append("  </section>")
+    lines.append("</configuration>")
+    return lines, planted
+
+
+def render_py(gen: Generator, count: int) -> Tuple[List[str], Dict[int, str]]:
+    lines, planted = ["import os", ""], {}
+    for name, entries in sections(gen.entries(count)):
+        lines.append(f"def {name}():")
+        for key, value, rule in entries:
+            lines.append(f"    {key} = {json.dumps(value)}")
+            if rule:
+                planted[len(lines)] = rule
+        lines.append(f"    return os.environ.get({json.dumps(name)})")
+        lines.append("")
+    return lines, planted
+
+
+def render_sh(gen: Generator, count: int) -> Tuple[List[str], Dict[int, str]]:
+    lines, planted = ["#!/bin/sh", "set -e"], {}
+    for name, entries in sections(gen.entries(count)):
+        lines.append(f"# {name}")
+        for key, value, rule in entries:
+            lines.append(f"export {key.upper()}={json.dumps(value)}")
+            if rule:
+                planted[len(lines)] = rule
+    return lines, planted
+
+
+def render_properties(gen: Generator, count: int) -> Tuple[List[str], Dict[int, str]]:
+    lines, planted = [], {}
+    for name, entries in sections(gen.entries(count)):
+        lines.append(f"# {name}")
+        for key, value, rule in entries:
+            lines.append(f"{name}.{key}={value}")
+            if rule:
+                planted[len(lines)] = rule
+    return lines, planted
+
+
+def render_txt(gen: Generator, count: int) -> Tuple[List[str], Dict[int, str]]:
+    lines, planted = [], {}
+    for key, value, rule in gen.entries(count):
+        prose = " ".join(gen.word() for _ in range(8))
+        if rule:
+            lines.append(f"{prose} https://{gen.word()}:{value}@{gen.word()}.example.com/{gen.word()}")
+            planted[len(lines)] = "uri"
+        else:
+            lines.append(f"{prose} {key} {value}")
+    return lines, planted
+
+
+RENDERERS: Dict[str, Callable[[Generator, int], Tuple[List[str], Dict[int, str]]]] = {
+    "yml": render_yml,
+    "json": render_json,
+    "xml": render_xml,
+    "py": render_py,
+    "sh": render_sh,
+    "properties": render_properties,
+    "txt": render_txt,
+}
+
+
+def generate_corpus(
+    dest: str, files: int = 10, entries: int = 1000, density: float = 0.01, seed: int = 0, formats: list = None
+) -> List[Planted]:
+    """
+    Writes `files` files of each format with `entries` key/value entries each
+    into dest/<format>/, a `density` fraction of which are secrets.
+    Returns the planted secrets.
+    """
+    ret = []
+    for fmt in formats or list(RENDERERS):
+        gen = Generator(f"{seed}:{fmt}", density)  # Formats are independent of each other
+        folder = Path(dest, fmt)
+        folder.mkdir(parents=True, exist_ok=True)
+        for idx in range(files):
+            filename = folder.joinpath(f"corpus_{idx:04d}.{fmt}")
+            lines, planted = RENDERERS[fmt](gen, entries)
+            filename.write_text("\n".join(lines) + "\n")
+            ret += [Planted(filename.as_posix(), line, rule) for line, rule in sorted(planted.items())]
+    return ret
@@ -0,0 +1,38 @@
+import json
+from collections import Counter
+
+from tests.benchmarks.bench import main
+from tests.benchmarks.corpus import RENDERERS, generate_corpus
+from whispers.cli import parse_args
+from whispers.core import run
+
+
+def test_generate_corpus(tmp_path):
+    planted = generate_corpus(tmp_path.joinpath("a"), files=2, entries=100, density=0.1, seed=1)
+    again = generate_corpus(tmp_path.joinpath("b"), files=2, entries=100, density=0.1, seed=1)
+    assert [(p.line, p.rule) for p in planted] == [(p.line, p.rule) for p in again]
+    assert set(Counter(p.file.split(".")[-1] for p in planted)) == set(RENDERERS)
+    for fmt in RENDERERS:
+        for a, b in zip(sorted(tmp_path.joinpath("a", fmt).iterdir()), sorted(tmp_path.joinpath("b", fmt).iterdir())):
+            assert a.read_bytes() == b.read_bytes()
+
+
+def test_corpus_recall(tmp_path):
+    planted = generate_corpus(tmp_path, files=1, entries=200, density=0.05)
+    found = {(secret.file, secret.line) for secret in run(parse_args([tmp_path.as_posix()]))}
+    assert planted
+    assert {(p.file, p.line) for p in planted} <= found
+
+
+def test_bench(tmp_path, capsys):
+    output = tmp_path.joinpath("build", "results.json")  # Created as needed
+    arguments = ["--files", "1", "--entries", "20", "--repeat", "1", "--output", output.as_posix()]
+    results = main(arguments)
+    assert json.loads(output.read_text()) == results
+    names = results["benchmarks"].keys()
+    assert "plugins.Yml" in names
+    assert "rules.password" in names
+    assert "run.jobs1" in names
+    assert "startup.yml" in names
+    main(arguments[:-2] + ["--only", "run", "--compare", output.as_posix()])
+    assert "run.jobs1" in capsys.readouterr().out
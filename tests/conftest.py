@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from whispers import cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def bundle_cache(tmp_path_factory):
+    """Keeps parsed config and rules bundles out of the user's cache, also for subprocesses"""
+    previous = os.environ.get("XDG_CACHE_HOME")
+    os.environ["XDG_CACHE_HOME"] = tmp_path_factory.mktemp("cache").as_posix()
+    yield
+    if previous is None:
+        del os.environ["XDG_CACHE_HOME"]
+    else:
+        os.environ["XDG_CACHE_HOME"] = previous
+
+
+@pytest.fixture(autouse=True)
+def library_bundles(monkeypatch):
+    """Starts each test without bundles, as library use does, even after a test ran the command line"""
+    monkeypatch.setattr(cache, "bundles", False)
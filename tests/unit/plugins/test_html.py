@@ -0,0 +1,29 @@
+import pytest
+
+from tests.unit.conftest import FIXTURE_PATH
+from whispers.plugins import html
+from whispers.plugins.html import Html
+
+
+def test_pairs():
+    assert list(Html().pairs(FIXTURE_PATH.joinpath("language.html"))) == [
+        ("comment", "hardcoded comment 01"),
+        ("comment", "hardcoded comment 02"),
+        ("comment", "hardcoded comment 03 has multiple lines"),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("document", "expected"),
+    [
+        ("<p>a</p>", []),
+        ("<!--[if IE]><p>a</p><![endif]-->", ["[if IE]><p>a</p><![endif]"]),
+        ("<script>var a = '<!-- b -->';</script>", []),
+        ("<p><!-- a\n\n b --></p><!-- c -->", ["a b", "c"]),
+    ],
+)
+def test_pairs_chunks(tmp_path, monkeypatch, document, expected):
+    monkeypatch.setattr(html, "CHUNK_SIZE", 3)
+    testfile = tmp_path.joinpath("test.html")
+    testfile.write_text(document)
+    assert [value for _, value in Html().pairs(testfile)] == expected
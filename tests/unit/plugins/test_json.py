@@ -0,0 +1,107 @@
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+
+from tests.unit.conftest import FIXTURE_PATH
+from whispers.plugins.json import Json, JsonTokenizer
+from whispers.rules import WhisperRules
+
+
+def scalars(pairs):
+    return [
+        (pair.key, pair.value, tuple(pair.breadcrumbs)) for pair in pairs if not isinstance(pair.value, (dict, list))
+    ]
+
+
+def test_tokenizer():
+    document = '{\n  "a": [1, -2.5e1, true, null],\n  // comment\n  "b\\u0041": "c"\n}'
+    assert list(JsonTokenizer(StringIO(document))) == [
+        ("{", None, 1, 1),
+        ("string", "a", 2, 3),
+        (":", None, 2, 6),
+        ("[", None, 2, 8),
+        ("number", 1, 2, 9),
+        (",", None, 2, 10),
+        ("number", -25.0, 2, 12),
+        (",", None, 2, 18),
+        ("literal", True, 2, 20),
+        (",", None, 2, 24),
+        ("literal", None, 2, 26),
+        ("]", None, 2, 30),
+        (",", None, 2, 31),
+        ("string", "bA", 4, 3),
+        (":", None, 4, 12),
+        ("string", "c", 4, 14),
+        ("}", None, 5, 1),
+    ]
+
+
+@pytest.mark.parametrize("filename", ["aws.json", "cloudformation.json", "custom.json", "passwords.json"])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_tokenizer_chunks(filename, chunk_size):
+    document = FIXTURE_PATH.joinpath(filename).read_text()
+    expected = list(JsonTokenizer(StringIO(document), len(document) + 1))
+    assert list(JsonTokenizer(StringIO(document), chunk_size)) == expected
+
+
+@pytest.mark.parametrize("document", ['{"a": 1', '{"a": }', '{"a" 1}', "{1: 2}", "[1}", '{"a": x}', '"a'])
+def test_stream_invalid(document):
+    with pytest.raises(ValueError):
+        list(Json(WhisperRules()).stream(StringIO(document)))
+
+
+@pytest.mark.parametrize("document", ['{"a": "' + "b" * 100, '{"a": "' + "b" * 100 + '"}'])
+def test_tokenizer_max_token(document):
+    with pytest.raises(ValueError, match="Token longer than 64 characters"):
+        list(JsonTokenizer(StringIO(document), chunk_size=8, max_token=64))
+
+
+def test_stream_max_token(tmp_path, monkeypatch):
+    document = tmp_path.joinpath("unterminated.json")
+    document.write_text('{"password": "hardcoded", "a": "' + "b" * 1000)
+    monkeypatch.setattr(Json, "stream_size", 0)
+    monkeypatch.setattr("whispers.plugins.json.JsonTokenizer", lambda stream: JsonTokenizer(stream, 8, 64))
+    with patch("whispers.plugins.json.debug") as debug:
+        assert [pair.key for pair in Json(WhisperRules()).pairs(document)] == ["password"]
+    debug.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "filename", ["apikeys.json", "aws.json", "cloudformation.json", "hardcoded.json", "passwords.json"]
+)
+def test_stream_traverse(filename):
+    document = FIXTURE_PATH.joinpath(filename)
+    expected = scalars(Json(WhisperRules()).pairs(document))
+    with document.open() as stream:
+        assert sorted(scalars(Json(WhisperRules()).stream(stream))) == sorted(expected)
+
+
+def test_stream_positions():
+    document = '// header\n{\n  "key": "password",\n  "value": "hardcoded",\n  "list": ["a", {"b": 1}]\n}'
+    pairs = Json(WhisperRules()).stream(StringIO(document))
+    assert [(pair.key, pair.value, list(pair.breadcrumbs), pair.line, pair.column) for pair in pairs] == [
+        ("key", "password", ["key"], 3, 10),
+        ("value", "hardcoded", ["value"], 4, 12),
+        ("list", "a", ["list"], 5, 12),
+        ("b", 1, ["list", "b"], 5, 23),
+        ("password", "hardcoded", [], 4, 12),
+    ]
+
+
+def test_stream_cloudformation():
+    with FIXTURE_PATH.joinpath("cloudformation.json").open() as stream:
+        pairs = list(Json(WhisperRules()).stream(stream))
+    assert [(pair.key, pair.value, pair.line) for pair in pairs[-2:]] == [
+        ("CompliantDBUser", "admin", 8),
+        ("NoncompliantDBPassword", "admin", 18),
+    ]
+
+
+def test_pairs_threshold(monkeypatch):
+    document = FIXTURE_PATH.joinpath("passwords.json")
+    expected = scalars(Json(WhisperRules()).pairs(document))
+    monkeypatch.setattr(Json, "stream_size", 0)
+    pairs = scalars(pair for pair in Json(WhisperRules()).pairs(document) if pair.line)
+    assert sorted(pairs) == sorted(expected)
+    assert list(Json(WhisperRules()).pairs(FIXTURE_PATH.joinpath("invalid.json"))) == []
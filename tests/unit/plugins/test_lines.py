@@ -0,0 +1,59 @@
+import re
+from unittest.mock import patch
+
+import pytest
+
+from whispers.plugins import lines
+from whispers.plugins.config import Config
+from whispers.plugins.go import Go
+from whispers.plugins.lines import LinePlugin
+from whispers.plugins.php import Php
+
+
+class Token(LinePlugin):
+    KEY = "token"
+    PREFILTER = "token:"
+    PATTERN = re.compile(r".*token:(?P<value>.*)$")
+
+
+def pairs(plugin, tmp_path, text: str) -> list:
+    testfile = tmp_path.joinpath("test")
+    testfile.write_bytes(text.encode())
+    return [(pair.key, pair.value, pair.line) for pair in plugin.pairs(testfile)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 16])
+def test_pairs_lines(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(lines, "CHUNK_SIZE", chunk_size)
+    text = "a\ntoken: b\r\n\ntoken:\nx token: token: c\rtoken: d"
+    assert pairs(Token(), tmp_path, text) == [("token", "b", 2), ("token", "c", 5), ("token", "d", 6)]
+
+
+def test_pairs_long_line(tmp_path, monkeypatch):
+    monkeypatch.setattr(lines, "CHUNK_SIZE", 4)
+    monkeypatch.setattr(lines, "MAX_LINE", 8)
+    assert pairs(Token(), tmp_path, "x" * 100 + "\ntoken: b\n") == [("token", "b", 2)]
+
+
+def test_pairs_prefilter(tmp_path):
+    with patch.object(Token, "PATTERN") as pattern:
+        pattern.match.return_value = None
+        assert pairs(Token(), tmp_path, "a\nb: c\n" * 100 + "token: d\n") == []
+    pattern.match.assert_called_once_with("token: d")
+
+
+@pytest.mark.parametrize(
+    ("plugin", "text", "expected"),
+    [
+        (Config(), " 'a' = 'b' \nc=\nd", [("a", "b", 1)]),
+        (
+            Go(),
+            'a := "b"\nc: = "d"\ne = f\nvar g, h = "i", "j"',
+            [("a", '"b"', 1), ("c:", '"d"', 2), ("g", '"i"', 4), ("h", '"j"', 4)],
+        ),
+        (Go(), 'var g, h string = "i", "j"', [("g", '"i"', 1), ("h", '"j"', 1)]),
+        (Php(), "$a = 'b';\n$c['d'] => 'e';\nf = g = h", [("a", "b", 1), ("'d'", "e", 2)]),
+    ],
+)
+def test_plugins(tmp_path, plugin, text, expected):
+    assert pairs(plugin, tmp_path, text) == expected
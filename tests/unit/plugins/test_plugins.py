@@ -1,7 +1,7 @@
 import pytest
 
 from tests.unit.conftest import fixture_path
-from whispers.plugins import WhisperPlugins
+from whispers.plugins import WhisperPlugins, classify, text_encoding
 from whispers.plugins.config import Config
 from whispers.plugins.dockercfg import Dockercfg
 from whispers.plugins.dockerfile import Dockerfile
@@ -22,6 +22,7 @@ from whispers.plugins.shell import Shell
 from whispers.plugins.xml import Xml
 from whispers.plugins.yml import Yml
 from whispers.rules import WhisperRules
+from whispers.utils import Pair
 
 
 @pytest.mark.parametrize(
@@ -50,6 +51,7 @@ from whispers.rules import WhisperRules
         ("settings.ini", Config),
         ("language.sh", Shell),
         ("language.py", Python),
+        ("language.py2", Python),
         ("cors.py", Python),
         ("language.js", Javascript),
         ("language.java", Java),
@@ -62,3 +64,107 @@ def test_init(filename, expected_plugin):
     filename = fixture_path(filename)
     plugin = WhisperPlugins(filename, WhisperRules()).plugin
     assert isinstance(plugin, expected_plugin)
+
+
+@pytest.mark.parametrize(
+    ("filename", "key", "line", "column"),
+    [
+        ("hardcoded.yml", "01_hardcoded_password", 12, 24),
+        ("privatekeys.yml", "key", 6, 6),
+        ("hardcoded.xml", "o1_hardcoded_password", 14, 0),
+        ("settings.ini", "SSHpassword", 6, 0),
+        ("language.py", "password", 24, 12),
+        ("language.sh", "DANGER_GITHUB_API_TOKEN", 4, 0),
+    ],
+)
+def test_pairs_location(filename, key, line, column):
+    pairs = WhisperPlugins(fixture_path(filename), WhisperRules()).pairs()
+    pair = next(pair for pair in pairs if pair.key == key)
+    assert isinstance(pair, Pair)
+    assert (pair.line, pair.column) == (line, column)
+
+
+@pytest.mark.parametrize(
+    ("head", "expected"),
+    [
+        (b"password = hardcoded\n", None),
+        ("café".encode()[:-1], None),
+        (b"\x7fELF\x02\x01\x01\x00\x00", "binary"),
+        ("password".encode("utf-16"), "binary"),
+        (b"caf\xe9 au lait", "encoding"),
+    ],
+)
+def test_classify(head, expected):
+    assert classify(head) == expected
+
+
+@pytest.mark.parametrize(
+    ("head", "encoding", "decode", "expected"),
+    [
+        ("password".encode("utf-16"), "utf-16", True, None),
+        (b"caf\xe9 au lait", "iso8859-1", True, None),
+        (b"caf\xe9 au lait", "utf-8", False, None),
+        (b"\x00\x01", "utf-8", False, "binary"),
+    ],
+)
+def test_classify_encoding(head, encoding, decode, expected):
+    assert classify(head, encoding, decode) == expected
+
+
+@pytest.mark.parametrize(
+    ("head", "expected"),
+    [
+        (b"password = hardcoded\n", "utf-8"),
+        ("password".encode("utf-16"), "utf-16"),
+        ("password".encode("utf-32"), "utf-32"),
+        ("password".encode("utf-8-sig"), "utf-8-sig"),
+        (b'<?xml version="1.0" encoding="ISO-8859-1"?>\n<a/>', "iso8859-1"),
+        (b'<html><head><meta charset="windows-1252">', "cp1252"),
+        (b"#!/usr/bin/env python\n# -*- coding: latin-1 -*-\n", "iso8859-1"),
+        (b'<?xml version="1.0" encoding="unknown"?>', "utf-8"),
+    ],
+)
+def test_text_encoding(head, expected):
+    assert text_encoding(head) == expected
+
+
+@pytest.mark.parametrize(
+    ("filename", "content", "expected"),
+    [
+        ("test.xml", '<?xml version="1.0" encoding="ISO-8859-1"?>\n<a password="caf\xe9"/>\n', ("password", "caf\xe9")),
+        ("test.html", '<meta charset="iso-8859-1"><!-- caf\xe9 -->\n', ("comment", "caf\xe9")),
+        ("test.py", '# -*- coding: latin-1 -*-\npassword = "caf\xe9"\n', ("password", "caf\xe9")),
+    ],
+)
+def test_declared_encoding(tmp_path, filename, content, expected):
+    testfile = tmp_path.joinpath(filename)
+    testfile.write_bytes(content.encode("iso8859-1"))
+    plugin = WhisperPlugins(testfile.as_posix(), WhisperRules())
+    assert plugin.skipped is None
+    assert expected in [tuple(pair[:2]) for pair in plugin.pairs()]
+
+
+def test_stream_size(tmp_path):
+    testfile = tmp_path.joinpath("test.json")
+    testfile.write_text('{"password": "hardcoded"}')
+    assert WhisperPlugins(testfile.as_posix(), WhisperRules()).plugin.stream_size == Json.stream_size
+    assert WhisperPlugins(testfile.as_posix(), WhisperRules(), {"size": 10}).plugin.stream_size == 10
+
+
+@pytest.mark.parametrize(
+    ("filename", "content", "limits", "expected_plugin", "skipped"),
+    [
+        ("test.txt", b"\x00\x01binary data", None, type(None), "binary"),
+        ("test.404", b"\x00\x01binary data", None, type(None), None),
+        ("test.txt", b"http://localhost/\n", {"size": 10}, Plaintext, None),
+        ("test.txt", b"http://localhost/\n", {"size": 10, "oversized": "skip"}, type(None), "oversized"),
+        ("test.yml", b"key: value\n", {"size": 10}, type(None), "oversized"),
+        ("test.yml", b"key: value\n", {"size": 11}, Yml, None),
+    ],
+)
+def test_init_skipped(tmp_path, filename, content, limits, expected_plugin, skipped):
+    testfile = tmp_path.joinpath(filename)
+    testfile.write_bytes(content)
+    plugin = WhisperPlugins(testfile.as_posix(), WhisperRules(), limits)
+    assert isinstance(plugin.plugin, expected_plugin)
+    assert plugin.skipped == skipped
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+import pytest
+
+from whispers.plugins import PLUGINS, WhisperPlugins
+from whispers.plugins.registry import PluginRegistry
+from whispers.plugins.shell import Shell
+from whispers.rules import WhisperRules
+
+
+class Plain:
+    pass
+
+
+class WithRules:
+    def __init__(self, rules):
+        self.rules = rules
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("a.yml", "whispers.plugins.yml:Yml"),
+        ("settings.env", "whispers.plugins.config:Config"),
+        (".envrc", "whispers.plugins.shell:Shell"),
+        ("pip.conf", "whispers.plugins.pip:Pip"),
+        ("Dockerfile.dev", "whispers.plugins.dockerfile:Dockerfile"),
+        ("Dockerfile.txt", "whispers.plugins.dockerfile:Dockerfile"),
+        ("Dockerfile.yml", "whispers.plugins.yml:Yml"),
+        ("index.html5", "whispers.plugins.html:Html"),
+        ("README", None),
+    ],
+)
+def test_lookup(name, expected):
+    assert PLUGINS.lookup(name, name.split(".")[-1])[0] == expected
+
+
+@pytest.mark.parametrize(
+    ("head", "expected"),
+    [
+        (b'<?xml version="1.0"?>', "whispers.plugins.xml:Xml"),
+        (b"#!/bin/bash\nset -e", "whispers.plugins.shell:Shell"),
+        (b"#! /usr/bin/env python3.8\n", "whispers.plugins.python:Python"),
+        (b"#!/usr/bin/env -S node --harmony\n", "whispers.plugins.javascript:Javascript"),
+        (b"#!/usr/bin/ruby\n", None),
+        (b"MZ\x90\x00", None),
+    ],
+)
+def test_sniff(head, expected):
+    assert PLUGINS.sniff(head) == expected
+
+
+def test_entry_points():
+    registry = PluginRegistry()
+    registry.register("whispers.plugins.json:Json", extensions=["json"])
+    external = {"json": "ext:Json", "tf": "ext:Terraform", "Jenkinsfile*": "ext:Jenkins"}
+    with patch("whispers.plugins.registry.plugin_entry_points", return_value=external) as entry_points:
+        assert registry.lookup("a.json", "json") == ("whispers.plugins.json:Json", False)
+        entry_points.assert_not_called()
+        assert registry.lookup("main.tf", "tf") == ("ext:Terraform", False)
+    entry_points.assert_called_once()
+    assert registry.lookup("Jenkinsfile.prod", "prod") == ("ext:Jenkins", False)
+    assert registry.lookup("a.yml", "yml") == (None, False)
+
+
+def test_create():
+    registry = PluginRegistry()
+    rules = WhisperRules()
+    assert isinstance(registry.create(f"{__name__}:Plain", rules), Plain)
+    assert registry.create(f"{__name__}:WithRules", rules).rules is rules
+    assert list(registry.classes) == [f"{__name__}:Plain", f"{__name__}:WithRules"]
+
+
+def test_plugin_shebang(tmp_path):
+    script = tmp_path.joinpath("deploy")
+    script.write_text("#!/bin/sh\nexport PASSWORD=hardcoded\n")
+    assert isinstance(WhisperPlugins(script.as_posix(), WhisperRules()).plugin, Shell)
+    script.write_text("PASSWORD=hardcoded\n")
+    assert WhisperPlugins(script.as_posix(), WhisperRules()).plugin is None
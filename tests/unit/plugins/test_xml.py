@@ -0,0 +1,50 @@
+from lxml import etree
+
+from tests.unit.conftest import fixture_path
+from whispers import core
+from whispers.cli import parse_args
+from whispers.plugins.xml import Xml
+from whispers.rules import WhisperRules
+
+
+def pairs(tmp_path, document: str) -> list:
+    testfile = tmp_path.joinpath("test.xml")
+    testfile.write_text(document)
+    return [(pair.key, pair.value, list(pair.breadcrumbs), pair.line) for pair in Xml(WhisperRules()).pairs(testfile)]
+
+
+def test_pairs(tmp_path):
+    document = (
+        '<a>\n  <b c="d">e=f</b>\n  <entry>\n    <key>password</key>\n    <value>hardcoded</value>\n  </entry>\n</a>'
+    )
+    assert pairs(tmp_path, document) == [
+        ("c", "d", ["a", "b"], 0),
+        ("b", "e=f", ["a", "b"], 2),
+        ("e", "f", ["a", "b"], 2),
+        ("key", "password", ["a", "entry", "key"], 4),
+        ("value", "hardcoded", ["a", "entry", "value"], 5),
+        ("entry", "\n    ", ["a", "entry"], 3),
+        ("password", "hardcoded", ["a", "entry"], 5),
+        ("a", "\n  ", ["a"], 1),
+    ]
+
+
+def test_pairs_recover(tmp_path):
+    assert pairs(tmp_path, "<a><b>c</b><d>e</a>") == [("b", "c", ["a", "b"], 1), ("d", "e", ["a", "d"], 1)]
+
+
+def test_traverse_frees_elements(tmp_path):
+    testfile = tmp_path.joinpath("test.xml")
+    testfile.write_text("<a>" + "<b>c</b>" * 100 + "</a>")
+    events = etree.iterparse(testfile.as_posix(), events=("start", "end"))
+    assert len(list(Xml(WhisperRules()).traverse(events))) == 100
+    assert len(events.root) == 0
+
+
+def test_attribute_lines():
+    args = parse_args([fixture_path("jdbc.xml")])
+    assert [(secret.line, secret.value) for secret in core.run(args)] == [
+        (22, "hardcoded1"),
+        (27, "hardcoded2"),
+        (32, "hardcoded3"),
+    ]
@@ -0,0 +1,40 @@
+import pytest
+
+from tests.unit.conftest import FIXTURE_PATH
+from whispers.plugins.yml import Yml, YmlLoader
+from whispers.rules import WhisperRules
+
+
+@pytest.mark.parametrize(
+    ("document", "expected"),
+    [
+        ("a: b\n", "a: b\n"),
+        ("a: {{ b }}\n", 'a: "{{ b }}"\n'),
+        ('a: "{{ b }}"\n', "a: '\"{{ b }}\"'\n"),
+        ("{{ a }}: b\n", "{{ a }}: b\n"),
+        ("a: <%= b %>\n", "a: \n"),
+        ("a: 1\n{% if b %}\nc: 2\n{% endif %}\n", "a: 1\n\nc: 2\n\n"),
+        ("a: 1\n<%\n  b\n%>\nc: 2\n", "a: 1\n\n\n\nc: 2\n"),
+        ("a: {{ b }} {% c %}\n", 'a: "{{ b }}" \n'),
+    ],
+)
+def test_preprocess(document, expected):
+    assert Yml.preprocess(document) == expected
+
+
+def test_pairs_multiple_documents(tmp_path):
+    testfile = tmp_path.joinpath("test.yml")
+    testfile.write_text("---\n- a\n- b\n---\npassword: c\n--- # Comment\nd: !Ref e\n")
+    pairs = list(Yml(WhisperRules()).pairs(testfile))
+    assert [(pair.key, pair.value, pair.line) for pair in pairs] == [
+        (None, "a", 2),
+        (None, "b", 3),
+        ("password", "c", 5),
+        ("d", "!Ref e", 7),
+    ]
+
+
+def test_loader():
+    assert YmlLoader.yaml_multi_constructors[""] == YmlLoader.construct_tagged
+    pairs = list(Yml(WhisperRules()).pairs(FIXTURE_PATH.joinpath("cloudformation.yml")))
+    assert pairs
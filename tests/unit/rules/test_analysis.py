@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+import pytest
+
+from whispers.rules import WhisperRules
+from whispers.rules.analysis import CHARSETS, PairMatrix, TextAnalysis, decode_base64, is_printable, shannon_entropy
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [("d2hpc3BlcnM=", "whispers"), ("yv4=", b"\xca\xfe")],
+)
+def test_decode_base64(text, expected):
+    assert decode_base64(text) == expected
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [("", True), ("whis pers\n", True), ("whis\x00pers", False), (b"binary", True), ("шёпот", False), (1, False)],
+)
+def test_is_printable(data, expected):
+    assert is_printable(data) == expected
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [("", 0.0), ("aaaa", 0.0), ("abab", 1.0), ("abcdefgh", 3.0), (b"\x00\xff", 1.0)],
+)
+def test_shannon_entropy(data, expected):
+    assert shannon_entropy(data) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    ("text", "charsets"),
+    [
+        ("deadBEEF01", {"alphanumeric", "base64", "base64url", "hex"}),
+        ("d2hpc3BlcnM=", {"base64", "base64url"}),
+        ("a+b/c", {"base64"}),
+        ("a-b_c", {"base64url"}),
+        ("a b", set()),
+    ],
+)
+def test_in_charset(text, charsets):
+    analysis = TextAnalysis(text, WhisperRules().match)
+    assert {charset for charset in CHARSETS if analysis.in_charset(charset)} == charsets
+
+
+def test_text_analysis():
+    rules = WhisperRules()
+    with patch.object(rules, "match", wraps=rules.match) as match:
+        analysis = TextAnalysis("aHR0cHM6Ly93aGlzcGVycw==", rules.match)
+        for _ in range(2):
+            assert analysis.is_base64()
+            assert analysis.decoded(True) == "https://whispers"
+            assert analysis.decoded(False) == "aHR0cHM6Ly93aGlzcGVycw=="
+            assert analysis.is_uri(True)
+            assert not analysis.is_uri(False)
+            assert analysis.is_printable(True)
+    assert match.call_count == 3
+
+
+def test_pair_matrix():
+    rules = WhisperRules()
+    matrix = PairMatrix("key", "value", rules.match)
+    assert matrix["key"] == "key"
+    assert matrix["analysis", "value"].text == "value"
+    assert matrix["analysis", "value"] is matrix["analysis", "value"]
+    assert matrix["analysis", "key"].text == "key"
+
+
+@pytest.mark.parametrize(
+    ("rule", "value", "expected"),
+    [
+        ({"value": {"isBase64": True, "isAscii": True}}, "d2hpc3BlcnM=", True),
+        ({"value": {"isBase64": True, "isAscii": True}}, "yv4=", False),
+        ({"value": {"isBase64": True, "isUri": True}}, "aHR0cHM6Ly93aGlzcGVycw==", True),
+        ({"value": {"isBase64": False, "isUri": False}}, "aHR0cHM6Ly93aGlzcGVycw==", False),
+        ({"value": {"isUri": False}}, "https://whispers", False),
+        ({"value": {"minEntropy": 3.0}}, "abcdefgh", True),
+        ({"value": {"minEntropy": 3.5}}, "abcdefgh", False),
+        ({"value": {"minEntropy": "high"}}, "abcdefgh", False),
+        ({"value": {"isBase64": True, "minEntropy": 2.9}}, "d2hpc3BlcnM=", False),
+        ({"value": {"charset": "hex", "minEntropy": 3.0}}, "0123456789abcdef", True),
+        ({"value": {"charset": "hex"}}, "whispers", False),
+        ({"value": {"charset": "octal"}}, "0123", False),
+    ],
+)
+def test_analysed_checks(rule, value, expected):
+    rules = WhisperRules()
+    matrix = PairMatrix("key", value, rules.match)
+    plan = [(function, "value", ("analysis", "value")) for idx, function in rules.checks if idx in rule["value"]]
+    assert rules.matches(rule, plan, "key", value, matrix) == expected
+
+
+def test_entropy_rule():
+    rules = WhisperRules(ruleslist="hex-token")
+    rules.load_rules_from_dict(
+        {
+            "hex-token": {
+                "message": "Hex token",
+                "severity": "MAJOR",
+                "value": {"minlen": 32, "charset": "hex", "minEntropy": 3.0},
+            }
+        }
+    )
+    assert rules.matching("token", "0123456789abcdef" * 2)
+    assert not rules.matching("token", "0" * 32)
+    assert not rules.matching("token", "0123456789abcdef")
@@ -0,0 +1,77 @@
+import re
+
+import pytest
+
+from whispers.rules.prefilter import LazyRegex, RegexSet
+
+
+@pytest.mark.parametrize(
+    ("regexes", "text", "expected"),
+    [
+        ([], "password", []),
+        ([re.compile("^file$")], "file", [0]),
+        ([re.compile("^file$")], "FILE", []),
+        ([re.compile("^file$", re.IGNORECASE)], "FILE", [0]),
+        ([re.compile("^npm authToken$")], "npm authToken", [0]),
+        ([re.compile(".*(key|token)$", re.IGNORECASE), re.compile("^api")], "apiKEY", [0, 1]),
+        ([re.compile(".*(key|token)$", re.IGNORECASE), re.compile("^api")], "API_TOKEN", [0]),
+        ([re.compile("^(?!.*name)", re.IGNORECASE)], "username", []),
+        ([re.compile("^(?!.*name)", re.IGNORECASE)], "password", [0]),
+        ([re.compile(r"^(a)\1$")], "aa", [0]),
+        ([re.compile("^file$"), re.compile(".*file")], "file", [0, 1]),
+        ([LazyRegex(".*(key|token)$", re.IGNORECASE), LazyRegex("^api")], "apiKEY", [0, 1]),
+    ],
+)
+def test_match(regexes, text, expected):
+    regexset = RegexSet()
+    for ident, regex in enumerate(regexes):
+        regexset.add(ident, regex)
+    regexset.compile()
+    assert sorted(regexset.match(text)) == expected
+
+
+@pytest.mark.parametrize(
+    ("regex", "kind"),
+    [
+        (re.compile("^file$"), "literals"),
+        (re.compile("^comment$", re.IGNORECASE), "literals_nocase"),
+        (re.compile("^file.*$"), "parts"),
+        (re.compile(r"^(a)\1$"), "fallback"),
+        (re.compile("^a$", re.MULTILINE), "fallback"),
+    ],
+)
+def test_add(regex, kind):
+    regexset = RegexSet()
+    regexset.add(0, regex)
+    assert getattr(regexset, kind)
+
+
+def test_lazy_regex():
+    regex = LazyRegex("^api", re.IGNORECASE)
+    assert "match" not in vars(regex)
+    assert regex.match("API_KEY")
+    assert not regex.match("key")
+    assert vars(regex)["match"].__self__ == re.compile("^api", re.IGNORECASE)
+
+
+def test_compile_invalid():
+    regexset = RegexSet()
+    regexset.add(0, LazyRegex("(?<=a|bc)x"))  # Variable width look-behind
+    regexset.add(1, LazyRegex("^api"))
+    regexset.compile()
+    assert [ident for ident, _ in regexset.fallback] == [0]
+    assert [ident for ident, _, _ in regexset.parts] == [1]
+    assert regexset.combined.match("api").groups() == ("api",)
+
+
+def test_compile_group_names():
+    regexset = RegexSet()
+    regexset.add(0, re.compile("(?P<name>api)_key"))
+    regexset.add(1, re.compile("(?P<name>api)_token"))
+    regexset.add(2, re.compile("(?P<r2>api)"))
+    regexset.add(3, re.compile("(?P<r_3>api)"))
+    regexset.compile()
+    assert [ident for ident, _ in regexset.fallback] == [1]
+    assert regexset.prefix == "r__"
+    assert sorted(regexset.match("api_key")) == [0, 2, 3]
+    assert sorted(regexset.match("api_token")) == [1, 2, 3]
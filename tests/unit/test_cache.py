@@ -0,0 +1,173 @@
+from os import utime
+from shutil import copy
+from unittest.mock import patch
+
+import pytest
+
+from tests.unit.conftest import fixture_path
+from whispers import cache, core
+from whispers.cache import VerdictCache, WhisperCache, config_fingerprint, file_digest, load_bundle
+from whispers.cli import parse_args
+from whispers.utils import Secret
+
+
+def scan(*arguments):
+    args = parse_args(list(arguments))
+    return list(core.run(args))
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cache_replay(tmp_path, jobs):
+    cachedir = tmp_path.joinpath("cache").as_posix()
+    expected = scan(fixture_path())
+    assert scan("-j", jobs, "--cache", cachedir, fixture_path()) == expected
+    with patch("whispers.secrets.WhisperSecrets.scan", side_effect=AssertionError):
+        assert scan("--cache", cachedir, fixture_path()) == expected
+
+
+def test_cache_cold(tmp_path):
+    cachedir = tmp_path.joinpath("cache").as_posix()
+    scan("--cache", cachedir, fixture_path("hardcoded.yml"))
+    with patch("whispers.secrets.WhisperSecrets.scan", return_value=iter([])) as mock_scan:
+        assert scan("--cache", cachedir, "--cold", fixture_path("hardcoded.yml")) == []
+        mock_scan.assert_called_once()
+
+
+def test_cache_invalidation(tmp_path):
+    cachedir = tmp_path.joinpath("cache").as_posix()
+    target = tmp_path.joinpath("hardcoded.yml")
+    copy(fixture_path("hardcoded.yml"), target.as_posix())
+    expected = scan("--cache", cachedir, target.as_posix())
+    assert len(expected) == 5
+
+    # Touched but unchanged content is replayed
+    utime(target.as_posix(), (0, 0))
+    with patch("whispers.secrets.WhisperSecrets.scan", side_effect=AssertionError):
+        assert scan("--cache", cachedir, target.as_posix()) == expected
+
+    # Changed content is rescanned
+    target.write_text("password: hardcoded")
+    assert len(scan("--cache", cachedir, target.as_posix())) == 1
+
+
+def test_cache_get_put(tmp_path):
+    target = tmp_path.joinpath("file.txt")
+    target.write_text("whispers")
+    cache = WhisperCache(tmp_path.joinpath("cache").as_posix(), "fingerprint")
+    secret = Secret(target.as_posix(), 1, "key", "value", "message", "MAJOR", 2)
+    assert cache.get(target.as_posix()) is None
+    cache.put(target.as_posix(), [secret])
+    assert cache.get(target.as_posix()) == [secret]
+    assert WhisperCache(tmp_path.joinpath("cache").as_posix(), "other").get(target.as_posix()) is None
+    assert cache.prune(1) == 0
+    assert cache.prune(-1) == 1
+    assert cache.get(target.as_posix()) is None
+    cache.close()
+
+
+def test_config_fingerprint():
+    args = parse_args([fixture_path()])
+    args.config = core.load_config("whispers/config.yml")
+    fingerprint = config_fingerprint(args)
+    assert fingerprint == config_fingerprint(args)
+    args.rules = "apikey"
+    assert fingerprint != config_fingerprint(args)
+
+
+def test_file_digest(tmp_path):
+    target = tmp_path.joinpath("file.txt")
+    target.write_text("whispers")
+    assert file_digest(target.as_posix()) == file_digest(target.as_posix())
+    assert len(file_digest(target.as_posix())) == 40
+
+
+def test_load_bundle(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", tmp_path.joinpath("bundles").as_posix())
+    monkeypatch.setattr(cache, "bundles", True)
+    source = tmp_path.joinpath("source.yml")
+    source.write_text("a: 1")
+    builds = []
+
+    def build():
+        builds.append(source.read_text())
+        return {"text": source.read_text()}
+
+    assert load_bundle([source], build) == {"text": "a: 1"}
+    assert load_bundle([source], build) == {"text": "a: 1"}
+    source.write_text("a: 2")
+    assert load_bundle([source], build) == {"text": "a: 2"}
+    assert builds == ["a: 1", "a: 2"]
+    assert len(list(tmp_path.joinpath("bundles", "whispers").iterdir())) == 1
+
+
+def test_load_bundle_unstored(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", tmp_path.joinpath("bundles").as_posix())
+    monkeypatch.setattr(cache, "bundles", True)
+    source = tmp_path.joinpath("source.yml")
+    source.write_text("a: 1")
+    assert load_bundle([source], lambda: {1: "not a JSON key"}) == {1: "not a JSON key"}
+    assert not tmp_path.joinpath("bundles").exists()
+    monkeypatch.setenv("XDG_CACHE_HOME", source.as_posix())  # Not a directory
+    assert load_bundle([source], lambda: {"a": 1}) == {"a": 1}
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_load_bundle_disabled(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", tmp_path.joinpath("bundles").as_posix())
+    monkeypatch.setattr(cache, "bundles", True)
+    monkeypatch.setenv("WHISPERS_NO_BUNDLES", "1")
+    source = tmp_path.joinpath("source.yml")
+    source.write_text("a: 1")
+    assert load_bundle([source], lambda: {"a": 1}) == {"a": 1}
+    assert cache.bundle_dir() is None
+    assert not tmp_path.joinpath("bundles").exists()
+
+
+def test_load_bundle_library(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", tmp_path.joinpath("bundles").as_posix())
+    source = tmp_path.joinpath("source.yml")
+    source.write_text("a: 1")
+    assert load_bundle([source], lambda: {"a": 1}) == {"a": 1}
+    assert cache.bundle_dir() is None
+    cache.enable_bundles()
+    assert load_bundle([source], lambda: {"a": 1}) == {"a": 1}
+    assert len(list(cache.bundle_dir().iterdir())) == 1
+
+
+def test_prune_bundles(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", tmp_path.joinpath("bundles").as_posix())
+    monkeypatch.setattr(cache, "bundles", True)
+    monkeypatch.setattr(cache, "BUNDLE_LIMIT", 3)
+    sources = []
+    for idx in range(5):
+        sources.append(tmp_path.joinpath(f"source{idx}.yml"))
+        sources[-1].write_text(f"a: {idx}")
+        load_bundle([sources[-1]], lambda: {"a": idx})
+        bundle = sorted(cache.bundle_dir().iterdir(), key=lambda path: path.stat().st_mtime)[-1]
+        utime(bundle.as_posix(), (idx, idx))  # Distinct use times
+    assert len(list(cache.bundle_dir().iterdir())) == 3
+    builds = []
+    load_bundle([sources[0]], lambda: builds.append(0) or {"a": 0})
+    load_bundle([sources[4]], lambda: builds.append(4) or {"a": 4})
+    assert builds == [0]
+
+
+def test_verdict_cache():
+    calls = []
+
+    def evaluate(key, value):
+        calls.append((key, value))
+        return [key + value]
+
+    verdicts = VerdictCache(evaluate, size=2, max_length=5)
+    assert verdicts.get("a", "1") == ["a1"]
+    assert verdicts.get("a", "1") == ["a1"]
+    assert verdicts.get("b", "2") == ["b2"]
+    assert verdicts.get("a", "1") == ["a1"]
+    assert verdicts.get("c", "3") == ["c3"]  # Evicts b, least recently used
+    assert verdicts.get("b", "2") == ["b2"]
+    assert verdicts.get("a", "123456") == ["a123456"]
+    assert verdicts.get("a", "123456") == ["a123456"]  # Too long to keep
+    assert calls == [("a", "1"), ("b", "2"), ("c", "3"), ("b", "2"), ("a", "123456"), ("a", "123456")]
+    assert (verdicts.hits, verdicts.misses) == (2, 6)
+    assert len(verdicts.verdicts) == 2
@@ -1,7 +1,9 @@
+import json
 import os
 import re
 import shlex
 import subprocess
+import sys
 from argparse import ArgumentParser
 from io import StringIO
 from pathlib import Path
@@ -24,7 +26,7 @@ def test_cli_parser():
     ("arguments", "expected", "result"),
     [
         ([], pytest.raises(SystemExit), None),
-        (["src"], does_not_raise(), {"config": None, "output": None, "rules": "all", "src": "src"}),
+        (["src"], does_not_raise(), {"config": None, "output": None, "rules": "all", "jobs": 1, "src": "src"}),
         (
             ["-c", config_path("detection_by_value.yml"), "src"],
             does_not_raise(),
@@ -32,6 +34,7 @@ def test_cli_parser():
                 "config": {
                     "exclude": {"keys": [re.compile("^file$", re.IGNORECASE)], "files": [], "values": []},
                     "include": {"files": ["**/*"]},
+                    "limits": {"size": 104857600, "oversized": "stream"},
                     "rules": {},
                 },
                 "src": "src",
@@ -39,7 +42,14 @@ def test_cli_parser():
         ),
         (["-r", "rule-1,rule-2", "src"], does_not_raise(), {"rules": "rule-1,rule-2"}),
         (["-o", "/tmp/output", "src"], does_not_raise(), {"output": Path("/tmp/output")}),
+        (["-f", "sarif", "src"], does_not_raise(), {"format": "sarif"}),
+        (["src"], does_not_raise(), {"stats": None}),
         (["-e", "123", "src"], does_not_raise(), {"exitcode": 123}),
+        (["-j", "4", "src"], does_not_raise(), {"jobs": 4}),
+        (["-j", "0", "src"], does_not_raise(), {"jobs": 0}),
+        (["-j", "-1", "src"], pytest.raises(SystemExit), None),
+        (["--cache", "--cache-prune", "30", "src"], does_not_raise(), {"cache": ".whispers-cache", "cache_prune": 30}),
+        (["--cache-prune", "30", "src"], pytest.raises(SystemExit), None),
         (["-s", "a,b,c", "src"], does_not_raise(), {"severity": ["a", "b", "c"]}),
     ],
 )
@@ -99,3 +109,53 @@ def test_cli_severity(arg, expected):
     assert len(result) == len(expected)
     for value in result.values():
         assert value["severity"] in expected
+
+
+def test_cli_sarif():
+    fd, tmp = mkstemp(suffix=".sarif", text=True)
+    proc = subprocess.Popen(
+        shlex.split(f"whispers -o {tmp} -r apikey tests/fixtures/apikeys.yml"), stdout=subprocess.PIPE
+    )
+    stdout, _ = proc.communicate()
+    result = json.loads(Path(tmp).read_text())
+    os.close(fd)
+    os.remove(tmp)
+    assert len(result["runs"][0]["results"]) == len(stdout.splitlines()) > 0
+
+
+def test_cli_stats():
+    fd, tmp = mkstemp(suffix=".json", text=True)
+    proc = subprocess.Popen(
+        shlex.split("whispers --stats -r apikey tests/fixtures/apikeys.yml"),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, stderr = proc.communicate()
+    assert b"apikey" in stderr
+    proc = subprocess.Popen(shlex.split(f"whispers --stats-json {tmp} -r apikey tests/fixtures/apikeys.yml"))
+    proc.communicate()
+    result = json.loads(Path(tmp).read_text())
+    os.close(fd)
+    os.remove(tmp)
+    assert result["counters"]["secrets"] == len(stdout.splitlines())
+    assert result["plugins"]["Yml"]["files"] == 1
+
+
+def test_cli_lazy_imports(tmp_path):
+    envfile = tmp_path.joinpath(".env")
+    envfile.write_text("PASSWORD=hardcoded\n")
+    script = "; ".join(
+        [
+            "import sys",
+            "from whispers.cli import cli",
+            f"sys.argv = ['whispers', {envfile.as_posix()!r}]",
+            "cli()",
+            "print(json.dumps(sorted(sys.modules)))",
+        ]
+    )
+    proc = subprocess.run([sys.executable, "-c", "import json; " + script], cwd=tmp_path, stdout=subprocess.PIPE)
+    *secrets, modules = proc.stdout.decode().splitlines()
+    assert len(secrets) == 1
+    for module in ["lxml", "jproperties", "luhn", "sqlite3", "multiprocessing", "whispers.git", "whispers.plugins.yml"]:
+        assert module not in json.loads(modules)
+    assert not tmp_path.joinpath("whispers.log").exists()
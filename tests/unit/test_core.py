@@ -1,6 +1,5 @@
 import re
 from os import urandom
-from pathlib import Path
 
 import pytest
 from yaml.parser import ParserError
@@ -32,6 +31,7 @@ def test_run(filename, expectation):
         ("/dev/null", pytest.raises(TypeError)),
         (config_path("invalid.yml"), pytest.raises(ParserError)),
         (config_path("empty.yml"), pytest.raises(NameError)),
+        (config_path("invalid_limits.yml"), pytest.raises(NameError)),
         (config_path("example.yml"), does_not_raise()),
     ],
 )
@@ -42,14 +42,7 @@ def test_load_config_exception(filename, expectation):
 
 def test_load_config():
     config = core.load_config(config_path("example.yml"), FIXTURE_PATH)
-    assert set(config["exclude"]["files"]) == set(
-        [
-            Path(fixture_path(".npmrc")),
-            Path(fixture_path("hardcoded.json")),
-            Path(fixture_path("hardcoded.yml")),
-            Path(fixture_path("hardcoded.xml")),
-        ]
-    )
+    assert config["exclude"]["files"] == ["*.npmrc", "*coded*", ".git/*/**"]
     assert config["exclude"]["keys"] == [re.compile("SECRET_VALUE_KEY", flags=re.IGNORECASE)]
     assert config["exclude"]["values"] == [re.compile("SECRET_VALUE_PLACEHOLDER", flags=re.IGNORECASE)]
 
@@ -63,6 +56,27 @@ def test_include_files():
         next(secrets)
 
 
+@pytest.mark.parametrize("jobs", ["0", "2", "4"])
+def test_run_jobs(jobs):
+    expected = list(core.run(parse_args([fixture_path()])))
+    result = list(core.run(parse_args(["-j", jobs, fixture_path()])))
+    assert expected
+    assert result == expected
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_run_stats(jobs):
+    args = parse_args(["--stats", "-j", jobs, fixture_path()])
+    result = list(core.run(args))
+    assert result == list(core.run(parse_args([fixture_path()])))
+    stats = args.stats
+    assert stats.counters["files"] == sum(entry["files"] for entry in stats.plugins.values())
+    assert stats.plugins["Yml"]["pairs"]
+    assert sum(entry["matches"] for entry in stats.rules.values())
+    assert stats.counters["verdicts.hits"] + stats.counters["verdicts.misses"] >= len(result)
+    assert set(stats.stages) >= {"walk", "parse", "rules", "lines"}
+
+
 def test_exclude_files():
     args = parse_args([fixture_path()])
     args.config = core.load_config(config_path("exclude_files.yml"), FIXTURE_PATH)
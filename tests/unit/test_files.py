@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import pytest
+
+from tests.unit.conftest import FIXTURE_PATH, fixture_path
+from whispers.files import compile_dir_globs, compile_globs, glob_to_regex, walk_files
+
+
+@pytest.mark.parametrize(
+    ("pattern", "path", "expectation"),
+    [
+        ("**/*", "file", True),
+        ("**/*", "dir/file", True),
+        ("*.yml", "file.yml", True),
+        ("*.yml", "dir/file.yml", False),
+        ("**/*.yml", "dir/sub/file.yml", True),
+        ("**/tests/**/*", "tests/file", True),
+        ("**/tests/**/*", "dir/tests/sub/file", True),
+        ("**/tests/**/*", "dir/tests", False),
+        ("**/package.json", "package.json", True),
+        ("**/package.json", "dir/package-lock.json", False),
+        (".git/**/*", ".git/config", True),
+        (".git/*/**", ".git/refs/heads/master", True),
+        ("file?.[ch]", "file1.c", True),
+        ("file?.[!ch]", "file1.c", False),
+    ],
+)
+def test_glob_to_regex(pattern, path, expectation):
+    assert bool(compile_globs([pattern]).fullmatch(path)) == expectation
+
+
+@pytest.mark.parametrize(
+    ("pattern", "path", "expectation"),
+    [
+        ("**/node_modules/**/*", "node_modules", True),
+        ("**/node_modules/**/*", "dir/node_modules", True),
+        ("**/node_modules/**/*", "dir/node_modules_old", False),
+        ("build/**/*", "build", True),
+        ("build/**/*", "dir/build", False),
+        (".git/*/**", ".git/refs", True),
+        ("**/*", "dir", True),
+        ("**/package.json", "dir", False),
+        ("*coded*", "hardcoded", False),
+    ],
+)
+def test_compile_dir_globs(pattern, path, expectation):
+    regex = compile_dir_globs([pattern])
+    assert bool(regex and regex.fullmatch(path)) == expectation
+
+
+def test_glob_to_regex_segments():
+    assert glob_to_regex("**/a*") == "(?:[^/]+/)*a[^/]*"
+
+
+def test_walk_files():
+    exclude = ["*.npmrc", "*coded*", ".git/*/**"]
+    result = set(walk_files(FIXTURE_PATH, ["**/*"], exclude))
+    expected = set(path.as_posix() for path in FIXTURE_PATH.glob("**/*") if path.is_file())
+    excluded = set(map(fixture_path, [".npmrc", "hardcoded.json", "hardcoded.yml", "hardcoded.xml"]))
+    assert excluded <= expected
+    assert result == expected - excluded
+
+
+@pytest.mark.parametrize(
+    ("include", "exclude", "expected"),
+    [
+        (["**/*.pypirc"], [], [".pypirc"]),
+        (["**/credentials"], [], [".aws/credentials"]),
+        (["**/credentials"], [".aws/**/*"], []),
+        (["**/*"], ["**/*"], []),
+        ([], [], []),
+    ],
+)
+def test_walk_files_filters(include, exclude, expected):
+    result = list(walk_files(FIXTURE_PATH, include, exclude))
+    assert result == list(map(fixture_path, expected))
+
+
+def test_walk_files_order():
+    result = list(walk_files(Path(fixture_path()), ["**/*"], []))
+    assert result == list(walk_files(Path(fixture_path()), ["**/*"], []))
+    assert len(result) == len(set(result))
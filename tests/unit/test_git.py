@@ -0,0 +1,131 @@
+import subprocess
+
+import pytest
+
+from whispers import core
+from whispers.cli import parse_args
+from whispers.git import changed_files, parse_diff, parse_range
+
+
+def git(repo, *args):
+    cmd = ["git", "-C", repo.as_posix(), "-c", "user.name=whispers", "-c", "user.email=whispers@localhost"]
+    subprocess.run(cmd + list(args), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init", "-q")
+    tmp_path.joinpath("config.yml").write_text("old_password: hardcoded0\n")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-q", "-m", "base")
+    tmp_path.joinpath("config.yml").write_text("old_password: hardcoded0\nnew_password: hardcoded1\n")
+    tmp_path.joinpath(".npmrc").write_text("//registry.npmjs.org/:_authToken=YXNkZmZmZmZm_HARDcoded2\n")
+    return tmp_path
+
+
+def test_parse_diff():
+    output = "\n".join(
+        [
+            "diff --git a/a.yml b/a.yml",
+            "--- a/a.yml",
+            "+++ b/a.yml",
+            "@@ -1,0 +2,2 @@",
+            "@@ -5 +7 @@",
+            "diff --git a/b.yml b/b.yml",
+            "new file mode 100644",
+            "--- /dev/null",
+            "+++ b/b.yml",
+            "@@ -0,0 +1 @@",
+            "diff --git a/c.yml b/c.yml",
+            "--- a/c.yml",
+            "+++ b/c.yml",
+            "@@ -1 +0,0 @@",
+        ]
+    )
+    result = parse_diff(output)
+    assert [(change.path, change.added, change.new) for change in result] == [
+        ("a.yml", {2, 3, 7}, False),
+        ("b.yml", {1}, True),
+        ("c.yml", set(), False),
+    ]
+
+
+def test_parse_diff_paths():
+    output = "\n".join(
+        [
+            "diff --git a/sub/my file.yml b/sub/my file.yml",
+            "+++ b/sub/my file.yml\t",
+            "@@ -0,0 +1 @@",
+            'diff --git "a/a\\tb.yml" "b/a\\tb.yml"',
+            '+++ "b/a\\tb.yml"',
+            "@@ -0,0 +1 @@",
+            'diff --git "a/\\303\\251 \\"q\\".yml" "b/\\303\\251 \\"q\\".yml"',
+            '+++ "b/\\303\\251 \\"q\\".yml"',
+            "@@ -0,0 +1 @@",
+        ]
+    )
+    assert [change.path for change in parse_diff(output)] == ["sub/my file.yml", "a\tb.yml", 'é "q".yml']
+
+
+@pytest.mark.parametrize(
+    ("diff", "staged", "expected"),
+    [
+        ("HEAD", False, (["HEAD"], None)),
+        ("main..HEAD", False, (["main..HEAD"], "HEAD")),
+        ("main...", False, (["main..."], "HEAD")),
+        ("HEAD~1..feature", False, (["HEAD~1..feature"], "feature")),
+        (None, True, (["--cached"], "")),
+    ],
+)
+def test_parse_range(diff, staged, expected):
+    assert parse_range(diff, staged) == expected
+
+
+def test_changed_files(repo):
+    root, rev, changes = changed_files(repo.as_posix(), diff="HEAD")
+    assert root.resolve() == repo.resolve()
+    assert rev is None
+    assert [(change.path, change.added) for change in changes] == [("config.yml", {2})]
+
+
+def test_scan_worktree(repo):
+    args = parse_args(["--diff", "HEAD", repo.as_posix()])
+    assert [secret.value for secret in core.run(args)] == ["hardcoded1"]
+
+
+def test_scan_staged(repo):
+    git(repo, "add", ".npmrc")
+    args = parse_args(["--staged", repo.as_posix()])
+    secrets = list(core.run(args))
+    assert [(secret.line, secret.value) for secret in secrets] == [(1, "YXNkZmZmZmZm_HARDcoded2")]
+    assert secrets[0].file.endswith(".npmrc")
+
+
+@pytest.mark.parametrize("name", ["sub/my file.yml", "sub/sécret.yml"])
+@pytest.mark.parametrize("staged", [False, True])
+def test_scan_unusual_paths(repo, name, staged):
+    repo.joinpath("sub").mkdir()
+    repo.joinpath(name).write_text("password: hardcoded3\n")
+    git(repo, "add", name)
+    args = parse_args(["--staged" if staged else "--diff=HEAD", repo.as_posix()])
+    secrets = [secret for secret in core.run(args) if secret.value == "hardcoded3"]
+    assert [secret.line for secret in secrets] == [1]
+    assert secrets[0].file.endswith(name)
+
+
+def test_scan_commits(repo):
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "change")
+    repo.joinpath("config.yml").write_text("")
+    args = parse_args(["--diff", "HEAD~1..HEAD", repo.as_posix()])
+    secrets = list(core.run(args))
+    assert sorted((secret.line, secret.value) for secret in secrets if secret.line) == [
+        (1, "YXNkZmZmZmZm_HARDcoded2"),
+        (2, "hardcoded1"),
+    ]
+
+
+def test_scan_not_a_repo(tmp_path):
+    args = parse_args(["--staged", tmp_path.as_posix()])
+    with pytest.raises(ValueError):
+        list(core.run(args))
@@ -21,6 +21,18 @@ def test_configure_log(logpath, expectation):
         remove(expected_file.as_posix())
 
 
+def test_configure_log_delay(tmp_path):
+    logfile = tmp_path.joinpath("whispers.log")
+    logfile.write_text("previous run")
+    assert configure_log(tmp_path.as_posix(), delay=True) == logfile
+    assert not logfile.exists()
+    cleanup_log(tmp_path.as_posix())
+    debug("message")
+    assert "message" in logfile.read_text()
+    with pytest.raises(ValueError):
+        configure_log(tmp_path.joinpath("missing").as_posix(), delay=True)
+
+
 @pytest.mark.parametrize(
     ("data", "expectation"),
     [
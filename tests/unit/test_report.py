@@ -0,0 +1,103 @@
+import json
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from whispers.report import JsonLinesWriter, Report, SarifWriter, YamlWriter, encode_secret, output_format
+from whispers.utils import Secret, load_yaml_from_file, secret_checksum
+
+SECRETS = [
+    Secret("file", 123, "key", "value", "message", "MAJOR"),
+    Secret("dir/file.yml", 7, "password", "hardcoded", "Password", "CRITICAL", 12),
+    Secret("file.txt", 0, "", "value", "API key", "MINOR"),
+]
+
+
+@pytest.mark.parametrize("secret", SECRETS)
+def test_encode_secret(secret):
+    data, checksum = encode_secret(secret)
+    assert json.loads(data) == secret._asdict()
+    assert checksum == secret_checksum(secret)
+
+
+def write(writer_class, secrets):
+    stream = StringIO()
+    writer = writer_class(stream)
+    for secret in secrets:
+        writer.write(secret, *encode_secret(secret))
+    writer.close()
+    return stream.getvalue()
+
+
+def test_yaml_writer():
+    assert write(YamlWriter, SECRETS[:1]) == (
+        f"{secret_checksum(SECRETS[0])}:\n  "
+        + 'file: "file"\n  line: "123"\n  key: "key"\n  '
+        + 'value: "value"\n  message: "message"\n  severity: "MAJOR"\n\n'
+    )
+
+
+def test_json_lines_writer():
+    result = write(JsonLinesWriter, SECRETS)
+    assert [json.loads(line) for line in result.splitlines()] == [secret._asdict() for secret in SECRETS]
+
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_sarif_writer(count):
+    sarif = json.loads(write(SarifWriter, SECRETS[:count]))
+    assert sarif["version"] == "2.1.0"
+    run = sarif["runs"][0]
+    assert len(run["results"]) == count
+    assert len(run["tool"]["driver"]["rules"]) == count
+    for result, secret in zip(run["results"], SECRETS):
+        location = result["locations"][0]["physicalLocation"]
+        assert location["artifactLocation"]["uri"] == secret.file
+        assert location.get("region", {}).get("startLine", 0) == secret.line
+        assert result["partialFingerprints"]["whispers/v1"] == secret_checksum(secret)
+        assert secret.value not in json.dumps(result)
+
+
+def test_sarif_rule_ids():
+    secrets = [
+        Secret("a.yml", 1, "password", "hardcoded", "Password", "CRITICAL", 0, "password"),
+        Secret("b.txt", 2, "", "user:hardcoded", "Password", "CRITICAL", 0, "password-uri"),
+        Secret("c.yml", 3, "password", "hardcoded", "Password", "CRITICAL"),
+    ]
+    run = json.loads(write(SarifWriter, secrets))["runs"][0]
+    assert [result["ruleId"] for result in run["results"]] == ["password", "password-uri", "password"]
+    assert run["tool"]["driver"]["rules"] == [
+        {"id": "password", "shortDescription": {"text": "Password"}},
+        {"id": "password-uri", "shortDescription": {"text": "Password"}},
+    ]
+
+
+@pytest.mark.parametrize(
+    ("output", "fmt", "expected"),
+    [
+        ("out.yml", None, "yml"),
+        ("out", None, "yml"),
+        ("out.jsonl", None, "jsonl"),
+        ("out.SARIF", None, "sarif"),
+        ("out.yml", "sarif", "sarif"),
+    ],
+)
+def test_output_format(output, fmt, expected):
+    assert output_format(Path(output), fmt) == expected
+
+
+def test_report(tmp_path, capsys):
+    output = tmp_path.joinpath("report.yml")
+    with Report(output) as report:
+        for secret in SECRETS:
+            report.write(secret)
+    assert len(capsys.readouterr().out.splitlines()) == len(SECRETS)
+    assert list(load_yaml_from_file(output).keys()) == [secret_checksum(secret) for secret in SECRETS]
+
+
+def test_report_quiet(tmp_path, capsys):
+    output = tmp_path.joinpath("report.sarif")
+    with Report(output, stdout=False) as report:
+        report.write(SECRETS[0])
+    assert capsys.readouterr().out == ""
+    assert json.loads(output.read_text())["runs"][0]["results"]
@@ -81,7 +81,7 @@ def test_detection_by_key(src, expected):
         ("falsepositive.yml", 4),
         ("language.sh", 14),
         ("language.py", 11),
-        ("language.py2", 0),
+        ("language.py2", 1),
         ("language.js", 4),
         ("language.java", 3),
         ("language.go", 9),
@@ -177,3 +177,30 @@ def test_is_static(key, value, expectation):
     args.config = core.load_config(CONFIG_PATH.joinpath("example.yml"))
     secrets = WhisperSecrets(args)
     assert secrets.is_static(key, value) == expectation
+
+
+def test_skipped_stats(tmp_path):
+    tmp_path.joinpath("id_rsa.txt").write_bytes(b"\x00\x01binary data")
+    tmp_path.joinpath("dump.txt").write_bytes(b"x" * 100)
+    args = parse_args(["--stats", tmp_path.as_posix()])
+    args.config = core.load_config(config_path("example.yml"))
+    args.config["limits"] = {"size": 10, "oversized": "skip"}
+    list(WhisperSecrets(args).scan(tmp_path.joinpath("id_rsa.txt").as_posix()))
+    list(WhisperSecrets(args).scan(tmp_path.joinpath("dump.txt").as_posix()))
+    assert args.stats.counters["skipped.binary"] == 1
+    assert args.stats.counters["skipped.oversized"] == 1
+
+
+def test_verdicts_across_files(tmp_path):
+    for name, padding in (("a.yml", ""), ("b.yml", "\n\n")):
+        tmp_path.joinpath(name).write_text(f"{padding}password: hardcoded123\nname: value\n")
+    args = parse_args([tmp_path.as_posix()])
+    args.config = core.load_config(config_path("example.yml"))
+    whispers = WhisperSecrets(args)
+    first = list(whispers.scan(tmp_path.joinpath("a.yml").as_posix()))
+    misses = whispers.verdicts.misses
+    second = list(whispers.scan(tmp_path.joinpath("b.yml").as_posix()))
+    assert whispers.verdicts.misses == misses  # File names are not cached
+    assert ("file", tmp_path.joinpath("a.yml").as_posix()) not in whispers.verdicts.verdicts
+    assert [(secret.key, secret.line) for secret in first] == [("password", 1)]
+    assert [(secret.key, secret.line) for secret in second] == [("password", 3)]
@@ -0,0 +1,51 @@
+import json
+import pickle
+
+from whispers.stats import WhisperStats
+
+
+def test_count():
+    stats = WhisperStats()
+    stats.count("files")
+    stats.count("files", 2)
+    assert stats.counters == {"files": 3}
+
+
+def test_timed():
+    stats = WhisperStats()
+    entry = stats.plugin("Yml")
+    assert list(stats.timed(range(3), "parse", entry)) == [0, 1, 2]
+    assert entry["pairs"] == 3
+    assert entry["seconds"] == stats.stages["parse"] > 0
+    assert list(stats.timed([], "walk")) == []
+    assert "walk" in stats.stages
+
+
+def test_merge():
+    worker = WhisperStats()
+    worker.count("files")
+    worker.add_time("parse", 1.0)
+    worker.plugin("Yml")["files"] += 1
+    worker.rule("apikey")["matches"] += 2
+    worker = pickle.loads(pickle.dumps(worker))  # Shipped to a worker process
+    data = worker.pop()
+    assert worker.to_dict() == WhisperStats().to_dict()
+    stats = WhisperStats()
+    stats.rule("apikey")["matches"] += 1
+    stats.merge(data)
+    stats.merge(data)
+    assert stats.counters == {"files": 2}
+    assert stats.stages == {"parse": 2.0}
+    assert stats.plugins["Yml"]["files"] == 2
+    assert stats.rules["apikey"]["matches"] == 5
+
+
+def test_dump_summary():
+    stats = WhisperStats()
+    stats.count("files")
+    stats.plugin("Python")["seconds"] += 0.5
+    stats.rule("password")["evaluations"] += 1
+    assert json.loads(stats.dump())["plugins"]["Python"]["seconds"] == 0.5
+    summary = stats.summary()
+    for text in ("files", "Python", "password"):
+        assert text in summary
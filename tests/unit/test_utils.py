@@ -1,7 +1,5 @@
-import json
-import os
 from pathlib import Path
-from tempfile import mkstemp
+from unittest.mock import patch
 
 import pytest
 
@@ -9,10 +7,10 @@ from tests.unit.conftest import FIXTURE_PATH, fixture_path, rule_path
 from whispers import core
 from whispers.cli import parse_args
 from whispers.utils import (
+    LineIndex,
     Secret,
     find_line_number,
-    format_secret,
-    format_stdout,
+    is_similar,
     line_begins_with_value,
     line_with_key_value,
     line_with_value,
@@ -79,6 +77,24 @@ def test_similar_strings(str1, str2):
     assert similar_strings(str1, str2)
 
 
+@pytest.mark.parametrize(
+    ("str1", "str2", "threshold", "expected", "computed"),
+    [
+        ("API_TOKEN", "${API_TOKEN}", 0.35, True, True),
+        ("api", "tokenvalue", 0.35, False, True),
+        ("api", "averylongtokenvalue", 0.35, False, False),
+        ("", "", 0.3, True, True),
+        ("", "value", 0.3, False, False),
+    ],
+)
+def test_is_similar(str1, str2, threshold, expected, computed):
+    assert is_similar(str1, str2, threshold) == expected
+    assert (similar_strings(str1, str2) >= threshold) == expected
+    with patch("Levenshtein.ratio", return_value=1.0) as ratio:
+        is_similar(str1, str2, threshold)
+    assert ratio.called == computed
+
+
 @pytest.mark.parametrize(
     ("key", "value", "line"),
     [
@@ -135,12 +151,53 @@ def test_line_begins_with_value(value, line):
     ],
 )
 def test_find_line_number_single(src, key, value, expectation):
-    assert find_line_number(FIXTURE_PATH.joinpath(src), key, value, []) == expectation
+    assert find_line_number(FIXTURE_PATH.joinpath(src), key, value, set()) == expectation
+
+
+@pytest.mark.parametrize(
+    ("src", "lookups", "expectation"),
+    [
+        ("apikeys.yml", [("apikey", "YXNkZmZmZmZm_HARDcoded")] * 2, [11, 20]),
+        ("hardcoded.yml", [("", "hardcoded0"), ("", "Hardcoded1"), ("", "hardcoded0")], [12, 14, 0]),
+    ],
+)
+def test_line_index(src, lookups, expectation):
+    index = LineIndex(FIXTURE_PATH.joinpath(src))
+    assert index.lines is None
+    assert [index.find(key, value) for key, value in lookups] == expectation
+    assert index.foundlines == set(filter(None, expectation))
+
+
+def test_line_index_list():
+    foundlines = [11]
+    index = LineIndex(FIXTURE_PATH.joinpath("apikeys.yml"), foundlines)
+    assert index.find("apikey", "YXNkZmZmZmZm_HARDcoded") == 20
+    assert foundlines == [11, 20]
+
+
+@pytest.mark.parametrize(
+    ("value", "expectation"),
+    [
+        ("cret-to", 1),
+        ("p@ss", 2),
+        ("!!", 3),
+        ("+=", 0),
+        ("tok", 1),
+    ],
+)
+def test_line_index_lookup(tmp_path, value, expectation):
+    path = tmp_path.joinpath("pairs.txt")
+    path.write_text("token = secret-token\nword = p@ss\nbang = !!\n")
+    assert LineIndex(path).find("", value) == expectation
 
 
 @pytest.mark.parametrize(
     ("src", "linenumbers"),
-    [("hardcoded.yml", [12, 14, 15, 16, 19]), ("privatekeys.yml", [5, 7, 11, 12, 13, 14])],
+    [
+        ("hardcoded.yml", [12, 14, 15, 16, 19]),
+        ("privatekeys.yml", [5, 6, 11, 12, 13, 14]),
+        ("language.sh", [23, 24, 25, 26, 28, 31, 32, 34]),
+    ],
 )
 def test_find_line_number_all(src, linenumbers):
     args = parse_args([fixture_path(src)])
@@ -161,28 +218,4 @@ def test_load_yaml_from_file(rulefile, expected_count):
 def test_secret_checksum():
     secret = Secret("file", 123, "key", "value", "message", "severity")
     assert secret_checksum(secret) == "6370fb4455c053420588d92bd292d371"
-
-
-def test_format_secret():
-    secret = Secret("file", 123, "key", "value", "message", "severity")
-    assert format_secret(secret) == (
-        "6370fb4455c053420588d92bd292d371:\n  "
-        + 'file: "file"\n  line: "123"\n  key: "key"\n  '
-        + 'value: "value"\n  message: "message"\n  severity: "severity"\n\n'
-    )
-
-
-def test_format_stdout():
-    secret = Secret("file", 123, "key", "value", "message", "severity")
-    secret_str = json.dumps(secret._asdict())
-    assert format_stdout(secret) == secret_str
-
-
-def test_format_stdout_to_file():
-    secret = Secret("file", 123, "key", "value", "message", "severity")
-    secret_str = json.dumps(secret._asdict())
-    fd, tmp = mkstemp()
-    result = format_stdout(secret, Path(tmp))
-    os.close(fd)
-    os.remove(tmp)
-    assert result == secret_str
+    assert secret_checksum(secret._replace(column=7)) == "6370fb4455c053420588d92bd292d371"
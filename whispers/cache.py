@@ -0,0 +1,258 @@
+import json
+from collections import OrderedDict
+from hashlib import blake2b
+from os import environ, getpid, replace, stat, utime
+from os.path import expanduser
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from whispers.__version__ import __version__
+from whispers.log import debug
+from whispers.utils import Secret
+
+CACHE_DIR = ".whispers-cache"
+BUNDLE_LIMIT = 32  # Bundles kept, the least recently used are removed beyond
+VERDICT_CACHE_SIZE = 1 << 16  # Pairs
+VERDICT_MAX_LENGTH = 1 << 10  # Longer values are rarely repeated and not kept
+
+bundles = False  # Whether to keep bundles, see enable_bundles()
+
+
+def file_digest(filename: str) -> str:
+    digest = blake2b(digest_size=20)
+    with open(filename, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_fingerprint(args) -> str:
+    """
+    Fingerprint of everything that affects per-file results:
+    whispers version, rule sources, selected rules and config
+    """
+    digest = blake2b(digest_size=20)
+    digest.update(__version__.encode())
+    digest.update(args.rules.encode())
+    rulespath = Path(__file__).parent.joinpath("rules")
+    for rulefile in sorted(rulespath.glob("*.yml")):
+        digest.update(rulefile.name.encode())
+        digest.update(rulefile.read_bytes())
+    config = {
+        "keys": [regex.pattern for regex in args.config["exclude"]["keys"]],
+        "values": [regex.pattern for regex in args.config["exclude"]["values"]],
+        "rules": args.config["rules"],
+        "limits": args.config.get("limits"),
+    }
+    digest.update(json.dumps(config, sort_keys=True, default=lambda obj: getattr(obj, "pattern", str(obj))).encode())
+    return digest.hexdigest()
+
+
+def enable_bundles(enabled: bool = True):
+    """
+    Keeps parsed config and rule files as bundles from now on.
+    The command line does; library use opts in.
+    """
+    global bundles
+    bundles = enabled
+
+
+def bundle_dir() -> Optional[Path]:
+    """
+    Returns the directory bundles are kept in, $XDG_CACHE_HOME/whispers,
+    or None when bundles are not enabled or WHISPERS_NO_BUNDLES is set
+    """
+    if not bundles or environ.get("WHISPERS_NO_BUNDLES"):
+        return None
+    return Path(environ.get("XDG_CACHE_HOME") or expanduser("~/.cache"), "whispers")
+
+
+def prune_bundles(directory: Path, limit: int):
+    """Removes the least recently used bundles beyond limit"""
+    bundles = []
+    for bundle in directory.glob("*.json"):
+        try:
+            bundles.append((bundle.stat().st_mtime, bundle))
+        except OSError:
+            continue  # Removed meanwhile
+    for _, bundle in sorted(bundles, reverse=True)[limit:]:
+        try:
+            bundle.unlink()
+        except OSError:
+            pass
+
+
+def load_bundle(sources: List[Path], build: Callable[[], Any]) -> Any:
+    """
+    Returns build(), which parses the source files into JSON compatible data.
+    The data is kept as JSON in bundle_dir(), one bundle per set of source
+    paths, so that unchanged sources are loaded without being parsed again.
+    Changed sources replace their bundle. Failing to store it is not an error.
+    """
+    directory = bundle_dir()
+    if directory is None:
+        return build()
+    digest = blake2b(digest_size=20)
+    digest.update(__version__.encode())
+    for source in sources:
+        digest.update(source.as_posix().encode() + b"\0")
+        digest.update(source.read_bytes())
+    digest = digest.hexdigest()
+    slot = blake2b("\0".join(sorted(source.resolve().as_posix() for source in sources)).encode(), digest_size=10)
+    bundle = directory.joinpath(f"{slot.hexdigest()}.json")
+    try:
+        cached = json.loads(bundle.read_text())
+        if cached["digest"] == digest:
+            utime(bundle.as_posix())  # Recently used
+            return cached["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # Missing, stale or broken: rebuild
+    data = build()
+    partial = bundle.with_name(f"{bundle.name}.{getpid()}")
+    try:
+        text = json.dumps({"digest": digest, "data": data})
+        if json.loads(text)["data"] != data:
+            return data  # Not representable as JSON
+        directory.mkdir(parents=True, exist_ok=True)
+        partial.write_text(text)
+        replace(partial.as_posix(), bundle.as_posix())  # Atomic for concurrent workers
+        prune_bundles(directory, BUNDLE_LIMIT)
+    except (OSError, TypeError, ValueError):
+        debug(f"Failed storing bundle {bundle.as_posix()}")
+        try:
+            partial.unlink()
+        except OSError:
+            pass
+    return data
+
+
+class VerdictCache:
+    """
+    Bounded LRU memo of evaluate(key, value) for pairs repeated across files.
+    Verdicts only depend on the pair, under the rules and config of the
+    scanner that owns the cache, so entries are keyed by the pair alone.
+    """
+
+    def __init__(
+        self, evaluate: Callable[[str, str], Any], size: int = VERDICT_CACHE_SIZE, max_length: int = VERDICT_MAX_LENGTH
+    ):
+        self.evaluate = evaluate
+        self.size = size
+        self.max_length = max_length
+        self.verdicts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, value: str) -> Any:
+        if len(value) > self.max_length:
+            self.misses += 1
+            return self.evaluate(key, value)
+        pair = (key, value)
+        if pair in self.verdicts:
+            self.hits += 1
+            self.verdicts.move_to_end(pair)
+            return self.verdicts[pair]
+        self.misses += 1
+        verdict = self.verdicts[pair] = self.evaluate(key, value)
+        if len(self.verdicts) > self.size:
+            self.verdicts.popitem(last=False)
+        return verdict
+
+
+class WhisperCache:
+    """
+    Persistent per-file scan results in SQLite.
+    Entries are keyed by file path and config fingerprint, and are valid
+    while the file size and mtime (or else its content hash) are unchanged.
+    """
+
+    def __init__(self, cachedir: str, fingerprint: str, cold: bool = False):
+        self.fingerprint = fingerprint
+        self.cold = cold  # Ignore existing entries
+        self.pending = {}  # File metadata between lookup and store
+        self.lock = Lock()  # Lookups run in the pool feeder thread
+        self.writes = 0
+        import sqlite3
+
+        cachedir = Path(cachedir)
+        cachedir.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(cachedir.joinpath("cache.sqlite").as_posix(), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT, fingerprint TEXT, size INTEGER, mtime INTEGER, digest TEXT, secrets TEXT, used REAL, "
+            "PRIMARY KEY (path, fingerprint))"
+        )
+
+    def get(self, filename: str) -> Optional[List[Secret]]:
+        """Returns cached secrets for an unchanged file, None otherwise"""
+        try:
+            info = stat(filename)
+        except OSError:
+            return None
+        with self.lock:
+            row = self.db.execute(
+                "SELECT size, mtime, digest, secrets FROM files WHERE path = ? AND fingerprint = ?",
+                (filename, self.fingerprint),
+            ).fetchone()
+            digest = None
+            if row and not self.cold and row[0] == info.st_size:
+                if row[1] != info.st_mtime_ns:
+                    digest = file_digest(filename)  # Touched, compare content
+                if row[1] == info.st_mtime_ns or row[2] == digest:
+                    self.db.execute(
+                        "UPDATE files SET mtime = ?, used = ? WHERE path = ? AND fingerprint = ?",
+                        (info.st_mtime_ns, time(), filename, self.fingerprint),
+                    )
+                    return [Secret(*secret) for secret in json.loads(row[3])]
+            self.pending[filename] = (info.st_size, info.st_mtime_ns, digest)
+        return None
+
+    def put(self, filename: str, secrets: List[Secret]):
+        """Stores secrets found in a file looked up with get()"""
+        with self.lock:
+            if filename not in self.pending:
+                return
+            size, mtime, digest = self.pending.pop(filename)
+            try:
+                digest = digest or file_digest(filename)
+            except OSError:
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (filename, self.fingerprint, size, mtime, digest, json.dumps(secrets), time()),
+            )
+            self.writes += 1
+            if not self.writes % 500:
+                self.db.commit()
+
+    def lookup(self, files: Iterable[str]) -> Iterator[Tuple[str, Optional[List[Secret]]]]:
+        """Pairs each file with its cached secrets, or None if it must be scanned"""
+        for filename in files:
+            yield filename, self.get(filename)
+
+    def prune(self, days: float) -> int:
+        """Deletes entries not used in the given number of days"""
+        with self.lock:
+            cursor = self.db.execute("DELETE FROM files WHERE used < ?", (time() - days * 86400,))
+            self.db.commit()
+        return cursor.rowcount
+
+    def close(self):
+        import sqlite3
+
+        with self.lock:
+            try:
+                self.db.commit()
+                self.db.close()
+            except sqlite3.Error:
+                debug("Failed closing scan cache")
+
+    @classmethod
+    def from_args(cls, args) -> Optional["WhisperCache"]:
+        if not args.cache:
+            return None
+        return cls(args.cache, config_fingerprint(args), cold=args.cold)
@@ -1,14 +1,16 @@
 from argparse import ArgumentParser, Namespace
 from os import environ
 from pathlib import Path
-from sys import exit
+from sys import exit, stderr
+from time import perf_counter
 from typing import List, Optional
 
 from whispers.__version__ import __version__
+from whispers.cache import CACHE_DIR, enable_bundles
 from whispers.core import load_config, run
 from whispers.log import cleanup_log, configure_log
-from whispers.rules import WhisperRules
-from whispers.utils import format_stdout
+from whispers.report import WRITERS, Report
+from whispers.stats import WhisperStats
 
 environ["PYTHONIOENCODING"] = "UTF-8"
 
@@ -22,15 +24,41 @@ def cli_parser() -> ArgumentParser:
     args_parser.add_argument(
         "-s", "--severity", default="BLOCKER,CRITICAL,MAJOR,MINOR", help="severity levels to report"
     )
-    args_parser.add_argument("-o", "--output", help="output file (.yml)")
+    args_parser.add_argument("-o", "--output", help="output file (.yml, .jsonl, .sarif)")
+    args_parser.add_argument(
+        "-f", "--format", choices=sorted(WRITERS), help="output file format (default by extension)"
+    )
     args_parser.add_argument("-e", "--exitcode", default=0, type=int, help="exit code on success")
+    args_parser.add_argument("-j", "--jobs", default=1, type=int, help="parallel scan processes (0 for all CPUs)")
+    args_parser.add_argument("--diff", default=None, metavar="BASE[..HEAD]", help="scan lines added in a git diff")
+    args_parser.add_argument("--staged", action="store_true", default=False, help="scan lines added in git index")
+    args_parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=CACHE_DIR,
+        default=None,
+        help=f"reuse results of unchanged files (default {CACHE_DIR})",
+    )
+    args_parser.add_argument("--cold", action="store_true", default=False, help="ignore cached results and rescan")
+    args_parser.add_argument(
+        "--cache-prune", default=None, type=float, metavar="DAYS", help="delete cache entries unused for DAYS"
+    )
+    args_parser.add_argument("--stats", action="store_true", default=False, help="print scan statistics to stderr")
+    args_parser.add_argument("--stats-json", default=None, metavar="FILE", help="write scan statistics as JSON")
     args_parser.add_argument("src", nargs="?", help="target file or directory")
     return args_parser
 
 
 def parse_args(arguments: Optional[List] = None) -> Namespace:
-    configure_log()
-    args, _ = cli_parser().parse_known_args(arguments)
+    configure_log(delay=True)
+    parser = cli_parser()
+    args, _ = parser.parse_known_args(arguments)
+
+    # Validate arguments
+    if args.jobs < 0:
+        parser.error("argument -j/--jobs: must be 0 or more")
+    if args.cache_prune is not None and not args.cache:
+        parser.error("argument --cache-prune: requires --cache")
 
     # Show information
     if args.info:
@@ -54,18 +82,37 @@ def parse_args(arguments: Optional[List] = None) -> Namespace:
     # Load severity levels
     args.severity = args.severity.split(",")
 
+    # Collect statistics
+    args.stats = WhisperStats() if args.stats or args.stats_json else None
+
     return args
 
 
 def cli():
+    enable_bundles()
     args = parse_args()
-    for secret in run(args):
-        format_stdout(secret, args.output)
+    start = perf_counter()
+    with Report(args.output, args.format) as report:
+        for secret in run(args):
+            report.write(secret)
+    if args.stats:
+        args.stats.count("secrets", report.count)
+        cli_stats(args, perf_counter() - start)
     cleanup_log()
     return args.exitcode
 
 
+def cli_stats(args: Namespace, elapsed: float):
+    args.stats.add_time("total", elapsed)
+    if args.stats_json:
+        Path(args.stats_json).write_text(args.stats.dump())
+    else:
+        print(args.stats.summary(), file=stderr, end="")
+
+
 def cli_info():
+    from whispers.rules import WhisperRules
+
     rule_ids = list(WhisperRules().rules.keys())
     rule_ids.sort()
     cli_parser().print_help()
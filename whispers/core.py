@@ -1,9 +1,18 @@
+import os
 import re
 from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+from whispers.cache import WhisperCache, bundle_dir, enable_bundles, load_bundle
+from whispers.files import compile_globs, walk_files
 from whispers.log import debug
+from whispers.plugins import MAX_SIZE, OVERSIZED
 from whispers.secrets import WhisperSecrets
-from whispers.utils import load_yaml_from_file
+from whispers.stats import WhisperStats
+from whispers.utils import Secret, load_yaml_from_file
+
+# Per-process scanner used by the worker pool
+worker = None
 
 
 def load_config(configfile, src="."):
@@ -16,7 +25,7 @@ def load_config(configfile, src="."):
         debug(f"{configfile} is not a file")
         raise TypeError
 
-    config = load_yaml_from_file(configfile)
+    config = load_bundle([configfile], lambda: load_yaml_from_file(configfile))
 
     # Ensure minimal expected config structure
     try:
@@ -30,17 +39,16 @@ def load_config(configfile, src="."):
             config["include"] = {"files": ["**/*"]}
         elif "files" not in config["include"]:
             config["include"]["files"] = ["**/*"]
+        if "limits" not in config:
+            config["limits"] = {}
+        config["limits"].setdefault("size", MAX_SIZE)
+        config["limits"].setdefault("oversized", OVERSIZED[0])
+        if config["limits"]["oversized"] not in OVERSIZED:
+            raise ValueError
     except Exception:
         debug(f"{configfile} is not valid")
         raise NameError
 
-    # Glob excluded files
-    exfiles = []
-    for fileglob in config["exclude"]["files"]:
-        for filepath in Path(src).glob(fileglob):
-            exfiles.append(filepath)
-    config["exclude"]["files"] = exfiles
-
     # Compile regex from excluded keys and values
     for param in ["keys", "values"]:
         excluded = []
@@ -61,11 +69,7 @@ def run(args):
         debug(f"{src} does not exist")
         raise FileNotFoundError
 
-    if src.is_file():
-        files = [src.as_posix()]
-    elif src.is_dir():
-        files = []
-    else:
+    if not src.is_file() and not src.is_dir():
         debug(f"{src} is neither a file nor a directory")
         raise TypeError
 
@@ -75,16 +79,136 @@ def run(args):
         configfile = configpath.joinpath("config.yml").as_posix()
         args.config = load_config(configfile, src=args.src)
 
-    # Include files
-    for incfile in args.config["include"]["files"]:
-        files += set(src.glob(incfile))
+    # Changes only
+    if args.diff or args.staged:
+        results = scan_diff(args, src)
 
-    # Exclude files
-    files = list(set(files) - set(args.config["exclude"]["files"]))
+    # Include and exclude files
+    elif src.is_file():
+        results = scan_files(args, [src.as_posix()])
+    else:
+        files = walk_files(src, args.config["include"]["files"], args.config["exclude"]["files"])
+        if args.stats:
+            files = args.stats.timed(files, "walk")
+        results = scan_files(args, files)
 
     # Scan files
-    whispers = WhisperSecrets(args)
-    for filename in files:
-        for secret in whispers.scan(filename):
+    for secrets in results:
+        for secret in secrets:
             if secret and secret.severity in args.severity:
                 yield secret
+
+
+def scan_files(args, files: Iterable[str]) -> Iterator[List[Secret]]:
+    """
+    Scans files in the given order, yielding one list of secrets per file.
+    With more than one job, files are distributed over a process pool and
+    results are streamed back in the original order as soon as they are ready.
+    Unchanged files found in the scan cache are replayed instead of parsed.
+    """
+    cache = WhisperCache.from_args(args)
+    if cache:
+        tasks = cache.lookup(files)
+    else:
+        tasks = ((filename, None) for filename in files)
+
+    jobs = args.jobs or os.cpu_count() or 1
+    try:
+        if jobs == 1 or isinstance(files, list) and len(files) < 2:
+            whispers = WhisperSecrets(args)
+            results = (scan_task(task, whispers) for task in tasks)
+            yield from store_results(results, cache, args.stats)
+        else:
+            from multiprocessing import Pool
+
+            with Pool(jobs, initializer=init_worker, initargs=(args, bundle_dir() is not None)) as pool:
+                results = pool.imap(scan_task, tasks, chunksize=4)
+                yield from store_results(results, cache, args.stats)
+        if cache and args.cache_prune is not None:
+            cache.prune(args.cache_prune)
+    finally:
+        if cache:
+            cache.close()
+
+
+def scan_diff(args, src: Path) -> Iterator[List[Secret]]:
+    """
+    Scans files changed in a git diff, reporting findings on added lines only.
+    New blobs are read with git plumbing into a temporary tree, so findings
+    are mapped back to working tree paths and new-side line numbers.
+    Findings without a line (e.g. sensitive file names) are kept for new files.
+    """
+    from tempfile import TemporaryDirectory
+
+    from whispers.git import changed_files, read_blob
+
+    root, rev, changes = changed_files(args.src, diff=args.diff, staged=args.staged)
+    include = compile_globs(args.config["include"]["files"])
+    exclude = compile_globs(args.config["exclude"]["files"])
+    base = src.resolve() if src.is_dir() else src.resolve().parent
+    whispers = WhisperSecrets(args)
+    with TemporaryDirectory(prefix="whispers-") as tmpdir:
+        for change in changes:
+            worktree = root.joinpath(change.path)
+            relpath = worktree.resolve().relative_to(base).as_posix()
+            if src.is_dir():
+                if not include or not include.fullmatch(relpath):
+                    continue
+                if exclude and exclude.fullmatch(relpath):
+                    continue
+            filename = Path(os.path.relpath(worktree)).as_posix()
+            if rev is None:
+                target = filename  # Working tree
+            else:
+                target = Path(tmpdir, change.path)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(read_blob(root, rev, change.path))
+                target = target.as_posix()
+            secrets = []
+            for secret in whispers.scan(target):
+                if secret.line in change.added or not secret.line and change.new:
+                    secret = secret._replace(file=filename)
+                    if secret.key == "file":
+                        secret = secret._replace(value=filename)
+                    secrets.append(secret)
+            yield secrets
+
+
+def store_results(
+    results: Iterator[Tuple[str, List[Secret], bool, Optional[dict]]],
+    cache: Optional[WhisperCache],
+    stats: Optional[WhisperStats] = None,
+) -> Iterator[List[Secret]]:
+    for filename, secrets, cached, task_stats in results:
+        if cache and not cached:
+            cache.put(filename, secrets)
+        if stats:
+            if task_stats:
+                stats.merge(task_stats)  # Collected in a worker process
+            if cached:
+                stats.count("cached")
+        yield secrets
+
+
+def init_worker(args, bundles: bool = False):
+    """Compiles rules and plugin state once per worker process, with the bundles setting of the parent"""
+    global worker
+    enable_bundles(bundles)
+    worker = WhisperSecrets(args)
+
+
+def scan_task(
+    task: Tuple[str, Optional[List[Secret]]], whispers: Optional[WhisperSecrets] = None
+) -> Tuple[str, List[Secret], bool, Optional[dict]]:
+    """
+    Scans a file unless its secrets are already known from the cache.
+    Returns the filename, its secrets, whether they were cached and, in
+    worker processes, the stats collected while scanning it.
+    """
+    filename, cached = task
+    if cached is not None:
+        return filename, cached, True, None
+    if whispers:
+        return filename, list(whispers.scan(filename)), False, None
+    secrets = list(worker.scan(filename))
+    return filename, secrets, False, worker.stats.pop() if worker.stats else None
@@ -0,0 +1,129 @@
+import re
+from os import scandir
+from pathlib import Path
+from typing import Iterator, List, Optional, Pattern
+
+
+def glob_segment_to_regex(segment: str) -> str:
+    """
+    Translates a single path segment glob into regex.
+    Wildcards never cross directory separators.
+    """
+    ret = ""
+    idx = 0
+    while idx < len(segment):
+        char = segment[idx]
+        idx += 1
+        if char == "*":
+            ret += "[^/]*"
+        elif char == "?":
+            ret += "[^/]"
+        elif char == "[":
+            end = segment.find("]", idx + 1)
+            if end == -1:
+                ret += re.escape(char)
+                continue
+            chars = segment[idx:end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            ret += f"[{chars}]"
+            idx = end + 1
+        else:
+            ret += re.escape(char)
+    return ret
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translates a pathlib-style glob into regex matching relative POSIX paths.
+    `**` matches zero or more directories, and a trailing `**` matches
+    everything below the preceding directory.
+    """
+    segments = [segment for segment in pattern.strip("/").split("/") if segment and segment != "."]
+    ret = ""
+    for idx, segment in enumerate(segments):
+        last = idx == len(segments) - 1
+        if segment == "**":
+            ret += ".*" if last else "(?:[^/]+/)*"
+        else:
+            ret += glob_segment_to_regex(segment)
+            if not last:
+                ret += "/"
+    return ret
+
+
+def glob_to_dir_regex(pattern: str) -> Optional[str]:
+    """
+    Returns regex for directories whose whole contents are matched by the glob,
+    i.e. globs ending with `/**` or `/**/*`. Returns None for other globs.
+    """
+    segments = [segment for segment in pattern.strip("/").split("/") if segment and segment != "."]
+    if segments[-1:] == ["**"]:
+        prefix = segments[:-1]
+    elif segments[-2:] == ["**", "*"]:
+        prefix = segments[:-2]
+    else:
+        return None
+    if not prefix or prefix == ["**"]:
+        return ".*"  # Everything
+    return glob_to_regex("/".join(prefix)).rstrip("/")
+
+
+def compile_globs(patterns: List[str]) -> Optional[Pattern]:
+    """Compiles a list of globs into a single regex, None if empty"""
+    regexes = [glob_to_regex(pattern) for pattern in patterns if pattern.strip("/")]
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes), flags=re.DOTALL)
+
+
+def compile_dir_globs(patterns: List[str]) -> Optional[Pattern]:
+    """Compiles directory pruning regex from a list of globs, None if empty"""
+    regexes = list(filter(None, [glob_to_dir_regex(pattern) for pattern in patterns if pattern.strip("/")]))
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes), flags=re.DOTALL)
+
+
+def walk_files(src: Path, include: List[str], exclude: List[str]) -> Iterator[str]:
+    """
+    Lazily yields files under src matching any include glob and no exclude glob.
+    The tree is walked once in sorted order; directories whose whole contents
+    are excluded are skipped without listing them.
+    """
+    include_regex = compile_globs(include)
+    exclude_regex = compile_globs(exclude)
+    prune_regex = compile_dir_globs(exclude)
+    if not include_regex:
+        return
+
+    base = Path(src).as_posix()
+    prefix = "" if base == "." else base.rstrip("/") + "/"
+    stack = [""]
+    while stack:
+        reldir = stack.pop()
+        try:
+            with scandir(prefix + reldir if reldir else base) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue  # Unreadable directory
+
+        subdirs = []
+        for entry in entries:
+            relpath = reldir + entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if prune_regex and prune_regex.fullmatch(relpath):
+                    continue  # Excluded directory
+                subdirs.append(relpath + "/")
+                continue
+            if not include_regex.fullmatch(relpath):
+                continue
+            if exclude_regex and exclude_regex.fullmatch(relpath):
+                continue
+            yield prefix + relpath
+
+        stack.extend(reversed(subdirs))
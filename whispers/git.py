@@ -0,0 +1,130 @@
+import re
+import subprocess
+from collections import namedtuple
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from whispers.log import debug
+
+# File changed in a diff: repository-relative path, new-side line numbers and status
+ChangedFile = namedtuple("ChangedFile", ["path", "added", "new"])
+
+HUNK_REGEX = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+# Escapes in paths that git quotes, e.g. "b/a\tb" or "b/\303\251.yml"
+QUOTED_ESCAPE_REGEX = re.compile(rb"\\([0-7]{3}|.)")
+C_ESCAPES = {b"a": b"\a", b"b": b"\b", b"t": b"\t", b"n": b"\n", b"v": b"\v", b"f": b"\f", b"r": b"\r"}
+
+
+def git(cwd: str, *args: str) -> bytes:
+    """Runs a git plumbing command, raising ValueError on failure"""
+    try:
+        proc = subprocess.run(["git", "-C", cwd] + list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError:
+        debug("git is not available")
+        raise ValueError("git is not available")
+    if proc.returncode:
+        message = proc.stderr.decode("utf-8", "replace").strip()
+        debug(f"git {' '.join(args)}: {message}")
+        raise ValueError(message)
+    return proc.stdout
+
+
+def toplevel(src: str) -> Path:
+    cwd = src if Path(src).is_dir() else Path(src).parent.as_posix()
+    return Path(git(cwd, "rev-parse", "--show-toplevel").decode().strip())
+
+
+def parse_range(diff: Optional[str], staged: bool) -> Tuple[List[str], Optional[str]]:
+    """
+    Returns `git diff` arguments and the revision holding the new side of the diff:
+    - BASE..HEAD and BASE...HEAD compare two commits, new side is HEAD
+    - BASE compares a commit with the working tree, new side is read from disk
+    - staged compares HEAD with the index, new side is the staged blob
+    """
+    if staged:
+        return ["--cached"], ""
+    if "..." in diff:
+        new = diff.split("...", 1)[1] or "HEAD"
+    elif ".." in diff:
+        new = diff.split("..", 1)[1] or "HEAD"
+    else:
+        new = None  # Working tree
+    return [diff], new
+
+
+def unquote_path(text: str) -> str:
+    """
+    Returns a path as written on a diff header line. Git appends a tab to
+    paths with spaces, and C-quotes paths with unusual characters.
+    """
+    if text.endswith("\t"):
+        text = text[:-1]
+    if len(text) < 2 or not (text.startswith('"') and text.endswith('"')):
+        return text
+    raw = text[1:-1].encode("utf-8", "surrogateescape")
+
+    def unescape(match):
+        escape = match.group(1)
+        if len(escape) == 3:
+            return bytes([int(escape, 8)])
+        return C_ESCAPES.get(escape, escape)
+
+    return QUOTED_ESCAPE_REGEX.sub(unescape, raw).decode("utf-8", "replace")
+
+
+def parse_diff(output: str) -> List[ChangedFile]:
+    """Parses `git diff -U0` output into added line numbers per file"""
+    ret = []
+    path, added, new = None, set(), False
+    for line in output.splitlines():
+        if line.startswith("diff --git "):
+            if path:
+                ret.append(ChangedFile(path, added, new))
+            path, added, new = None, set(), False
+        elif line.startswith("new file mode"):
+            new = True
+        elif line.startswith("+++ "):
+            target = unquote_path(line[4:])
+            path = target[2:] if target.startswith("b/") else None
+        elif line.startswith("@@"):
+            hunk = HUNK_REGEX.match(line)
+            if not hunk:
+                continue
+            start = int(hunk.group(1))
+            count = 1 if hunk.group(2) is None else int(hunk.group(2))
+            added.update(range(start, start + count))
+    if path:
+        ret.append(ChangedFile(path, added, new))
+    return ret
+
+
+def changed_files(src: str, diff: Optional[str] = None, staged: bool = False) -> Tuple[Path, Optional[str], list]:
+    """
+    Lists files changed under src with their added lines.
+    Returns the repository root, the revision to read new blobs from
+    (None for the working tree, "" for the index) and the changed files.
+    """
+    root = toplevel(src)
+    args, new = parse_range(diff, staged)
+    pathspec = Path(src).resolve().relative_to(root.resolve()).as_posix()
+    output = git(
+        root.as_posix(),
+        "-c",
+        "core.quotepath=off",
+        "diff",
+        "--no-color",
+        "--no-ext-diff",
+        "--no-renames",
+        "--diff-filter=ACM",
+        "-U0",
+        *args,
+        "--",
+        pathspec,
+    )
+    return root, new, parse_diff(output.decode("utf-8", "replace"))
+
+
+def read_blob(root: Path, rev: str, path: str) -> bytes:
+    """Reads file contents at a revision, or from the index when rev is empty"""
+    return git(root.as_posix(), "cat-file", "blob", f"{rev}:{path}")
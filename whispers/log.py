@@ -1,42 +1,32 @@
 import logging
-import logging.config
-import traceback
 from os import remove
 from pathlib import Path
 
 
-def configure_log(logpath: str = "") -> Path:
+def configure_log(logpath: str = "", delay: bool = False) -> Path:
+    """
+    Logs to whispers.log in logpath, replacing any previous log.
+    With delay, the file is only created when the first message is logged.
+    """
     try:
         logpath = Path(logpath, "whispers.log")
-        logpath.write_text("")
+        if not delay:
+            logpath.write_text("")
+        elif logpath.exists():
+            remove(logpath.as_posix())
+        elif not logpath.parent.is_dir():
+            raise NotADirectoryError
     except Exception:
         debug(f"{logpath} is not valid")
         raise ValueError
-    logging.config.dictConfig(
-        {
-            "version": 1,
-            "disable_existing_loggers": False,
-            "formatters": {
-                "default": {
-                    "class": "logging.Formatter",
-                    "style": "{",
-                    "datefmt": "%Y-%m-%d %H:%M",
-                    "format": "[{asctime:s}] {message:s}\n",
-                }
-            },
-            "handlers": {
-                "default": {
-                    "level": "DEBUG",
-                    "class": "logging.handlers.WatchedFileHandler",
-                    "formatter": "default",
-                    "filename": logpath.as_posix(),
-                    "mode": "w",
-                    "encoding": "utf-8",
-                }
-            },
-            "loggers": {"": {"handlers": ["default"], "level": "DEBUG", "propagate": False}},  # root logger
-        }
-    )
+    handler = logging.FileHandler(logpath.as_posix(), mode="w", encoding="utf-8", delay=delay)
+    handler.setFormatter(logging.Formatter("[{asctime:s}] {message:s}\n", datefmt="%Y-%m-%d %H:%M", style="{"))
+    log = logging.getLogger()  # root logger
+    for previous in log.handlers[:]:
+        log.removeHandler(previous)
+        previous.close()
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG)
     return logpath
 
 
@@ -45,11 +35,13 @@ def cleanup_log(logpath: str = ""):
     Delete the log file if it's empty
     """
     logpath = Path(logpath, "whispers.log")
-    if not logpath.stat().st_size:
+    if logpath.exists() and not logpath.stat().st_size:
         remove(logpath.as_posix())
 
 
 def debug(message: str = "") -> str:
+    import traceback
+
     trace = traceback.format_exc().strip()
     if trace == "NoneType: None":
         ret = message
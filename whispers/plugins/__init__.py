@@ -1,91 +1,154 @@
+import re
+from codecs import BOM_UTF8, BOM_UTF16_BE, BOM_UTF16_LE, BOM_UTF32_BE, BOM_UTF32_LE, getincrementaldecoder, lookup
 from pathlib import Path
+from stat import S_ISREG
 from typing import Optional
 
 from whispers.log import debug
-from whispers.plugins.config import Config
-from whispers.plugins.dockercfg import Dockercfg
-from whispers.plugins.dockerfile import Dockerfile
-from whispers.plugins.go import Go
-from whispers.plugins.html import Html
-from whispers.plugins.htpasswd import Htpasswd
-from whispers.plugins.java import Java
-from whispers.plugins.javascript import Javascript
-from whispers.plugins.jproperties import Jproperties
-from whispers.plugins.json import Json
-from whispers.plugins.npmrc import Npmrc
-from whispers.plugins.php import Php
-from whispers.plugins.pip import Pip
-from whispers.plugins.plaintext import Plaintext
-from whispers.plugins.pypirc import Pypirc
-from whispers.plugins.python import Python
-from whispers.plugins.shell import Shell
-from whispers.plugins.xml import Xml
-from whispers.plugins.yml import Yml
+from whispers.plugins.registry import PluginRegistry
 from whispers.rules import WhisperRules
 
+HEAD_SIZE = 8000  # Bytes read to recognise and classify file contents, as git does
+MAX_SIZE = 100 << 20  # Default size above which files are oversized
+OVERSIZED = ("stream", "skip")  # Oversized files go to streaming plugins only, or are skipped
+
+# Byte order marks, longest first as the UTF-32 LE one starts with the UTF-16 LE one
+BOMS = [
+    (BOM_UTF32_LE, "utf-32"),
+    (BOM_UTF32_BE, "utf-32"),
+    (BOM_UTF8, "utf-8-sig"),
+    (BOM_UTF16_LE, "utf-16"),
+    (BOM_UTF16_BE, "utf-16"),
+]
+
+# Encoding declarations: <?xml encoding="..."?>, <meta charset="...">, and Python or Emacs style coding cookies
+DECLARED_ENCODING_REGEXES = [
+    re.compile(rb"""\A\s*<\?xml[^>]*?\sencoding\s*=\s*["']([\w.:-]+)"""),
+    re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE),
+    re.compile(rb"\A(?:[^\n]*\n)?[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)"),
+]
+
+# Built-in plugins, earlier registrations take precedence
+PLUGINS = PluginRegistry()
+PLUGINS.register("whispers.plugins.yml:Yml", extensions=["yaml", "yml"])
+PLUGINS.register("whispers.plugins.json:Json", extensions=["json"])
+PLUGINS.register("whispers.plugins.xml:Xml", extensions=["xml"], magic=[b"<?xml "])
+PLUGINS.register("whispers.plugins.npmrc:Npmrc", prefixes=["npmrc"])
+PLUGINS.register("whispers.plugins.pypirc:Pypirc", prefixes=["pypirc"])
+PLUGINS.register("whispers.plugins.pip:Pip", names=["pip.conf"])
+PLUGINS.register(
+    "whispers.plugins.config:Config",
+    extensions=["conf", "cfg", "config", "ini", "env", "credentials", "s3cfg"],
+    sniff=True,
+)
+PLUGINS.register("whispers.plugins.jproperties:Jproperties", extensions=["properties"])
+PLUGINS.register(
+    "whispers.plugins.shell:Shell",
+    prefixes=["sh", "bash", "zsh", "env"],
+    interpreters=["sh", "bash", "zsh", "dash", "ksh"],
+)
+PLUGINS.register("whispers.plugins.dockerfile:Dockerfile", names=["Dockerfile*"])
+PLUGINS.register("whispers.plugins.dockercfg:Dockercfg", extensions=["dockercfg"])
+PLUGINS.register("whispers.plugins.htpasswd:Htpasswd", prefixes=["htpasswd"])
+PLUGINS.register("whispers.plugins.plaintext:Plaintext", extensions=["txt"])
+PLUGINS.register("whispers.plugins.html:Html", prefixes=["htm"])
+PLUGINS.register(
+    "whispers.plugins.python:Python",
+    extensions=["py", "py2", "py3", "py35", "py36", "py37", "py38"],
+    interpreters=["python"],
+)
+PLUGINS.register("whispers.plugins.javascript:Javascript", extensions=["js"], interpreters=["node"])
+PLUGINS.register("whispers.plugins.java:Java", extensions=["java"])
+PLUGINS.register("whispers.plugins.go:Go", extensions=["go"])
+PLUGINS.register("whispers.plugins.php:Php", prefixes=["php"], interpreters=["php"])
+
+
+def text_encoding(head: bytes) -> str:
+    """Returns the encoding of file contents starting with head, per its BOM or declaration, or UTF-8"""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    for regex in DECLARED_ENCODING_REGEXES:
+        declared = regex.search(head)
+        if declared:
+            try:
+                return lookup(declared.group(1).decode("ascii")).name
+            except LookupError:
+                break  # Unknown encoding, try the default
+    return "utf-8"
+
+
+def classify(head: bytes, encoding: str = "utf-8", decode: bool = True) -> Optional[str]:
+    """
+    Returns why file contents starting with head can not be parsed as text:
+    - binary: NUL bytes, other than in UTF-16 or UTF-32 text
+    - encoding: not decodable with encoding, checked with decode
+    """
+    if b"\0" in head and not encoding.startswith(("utf-16", "utf-32")):
+        return "binary"
+    if decode:
+        try:
+            getincrementaldecoder(encoding)().decode(head)  # Tolerates a cut multibyte character
+        except UnicodeDecodeError:
+            return "encoding"
+    return None
+
 
 class WhisperPlugins:
-    def __init__(self, filename: str, rules: WhisperRules):
-        """Inits the rules objects. Call pairs() to get results"""
+    def __init__(self, filename: str, rules: WhisperRules, limits: Optional[dict] = None):
+        """
+        Inits the rules objects. Call pairs() to get results
+        @limits: "size" in bytes above which files are handled per "oversized" policy
+        """
         self.filename = filename
         self.filepath = Path(filename)
         self.filetype = self.filepath.name.split(".")[-1]
         self.rules = rules
+        self.limits = limits or {}
+        self.skipped = None  # Why a supported file is not parsed
         self.plugin = self.load_plugin()
 
     def load_plugin(self) -> Optional[object]:
         """Loads the correct plugin for a given file"""
-        if not self.filepath.exists():
+        try:
+            stat = self.filepath.stat()
+        except OSError:
             return None
-        elif not self.filepath.is_file():
+        if not S_ISREG(stat.st_mode) or stat.st_size < 7:
             return None
-        elif self.filepath.stat().st_size < 7:
-            return None
-        elif self.filepath.suffix in [".dist", ".template"]:
-            self.filename = self.filepath.stem
+        name = self.filepath.name
+        if self.filepath.suffix in [".dist", ".template"]:
+            name = self.filename = self.filepath.stem
             self.filetype = self.filename.split(".")[-1]
-        if self.filetype in ["yaml", "yml"]:
-            return Yml(self.rules)
-        elif self.filetype == "json":
-            return Json(self.rules)
-        elif self.filetype == "xml":
-            return Xml(self.rules)
-        elif self.filetype.startswith("npmrc"):
-            return Npmrc()
-        elif self.filetype.startswith("pypirc"):
-            return Pypirc()
-        elif self.filepath.name == "pip.conf":
-            return Pip()
-        elif self.filetype in ["conf", "cfg", "config", "ini", "env", "credentials", "s3cfg"]:
-            if self.filepath.open("r").readline().startswith("<?xml "):
-                return Xml(self.rules)
-            else:
-                return Config()
-        elif self.filetype == "properties":
-            return Jproperties()
-        elif self.filetype.startswith(("sh", "bash", "zsh", "env")):
-            return Shell()
-        elif self.filepath.name.startswith("Dockerfile"):
-            return Dockerfile()
-        elif self.filetype == "dockercfg":
-            return Dockercfg()
-        elif self.filetype.startswith("htpasswd"):
-            return Htpasswd()
-        elif self.filetype == "txt":
-            return Plaintext(self.rules)
-        elif self.filetype.startswith("htm"):
-            return Html()
-        elif self.filetype in ["py", "py3", "py35", "py36", "py37", "py38"]:
-            return Python()
-        elif self.filetype == "js":
-            return Javascript()
-        elif self.filetype == "java":
-            return Java()
-        elif self.filetype == "go":
-            return Go()
-        elif self.filetype.startswith("php"):
-            return Php()
-        return None
+        target, sniff = PLUGINS.lookup(name, self.filetype)
+        if not target and "." in name.lstrip("."):
+            return None  # Unknown extension, not worth a read
+        # One small read tells XML in config files, scripts without an extension, and binaries
+        try:
+            with self.filepath.open("rb") as fh:
+                head = fh.read(HEAD_SIZE)
+        except OSError:
+            return None
+        if sniff or not target:
+            target = PLUGINS.sniff(head, shebang=not sniff) or target
+            if not target:
+                return None
+        plugin = PLUGINS.create(target, self.rules)
+        encoding = text_encoding(head)
+        self.skipped = classify(head, encoding, decode=not getattr(plugin, "PARSES_BYTES", False))
+        if self.skipped:
+            return None
+        size = self.limits.get("size", MAX_SIZE)
+        if stat.st_size > size:
+            if self.limits.get("oversized", OVERSIZED[0]) == "skip" or not getattr(plugin, "STREAMING", False):
+                self.skipped = "oversized"
+                return None
+        # Built-in plugins declare these settings
+        if hasattr(plugin, "encoding"):
+            plugin.encoding = encoding
+        if hasattr(plugin, "stream_size"):
+            plugin.stream_size = min(plugin.stream_size, size)
+        return plugin
 
     def pairs(self):
         if self.plugin:
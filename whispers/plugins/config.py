@@ -1,18 +1,15 @@
-from pathlib import Path
+import re
 
+from whispers.plugins.lines import LinePlugin
 from whispers.utils import strip_string
 
 
-class Config:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            line = line.strip()
-            if "=" not in line:
-                continue
+class Config(LinePlugin):
+    PREFILTER = "="
+    PATTERN = re.compile(r"(?P<key>[^=]*)=(?P<value>.*)$")
 
-            key, value = line.split("=", 1)
-            key = strip_string(key)
-            value = strip_string(value)
-
-            if value:
-                yield key, value
+    def parse(self, match):
+        key = strip_string(match["key"].lstrip())
+        value = strip_string(match["value"].rstrip())
+        if value:
+            yield key, value
@@ -3,8 +3,10 @@ from pathlib import Path
 
 
 class Dockercfg:
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
     def pairs(self, filepath: Path):
-        config = json.loads(filepath.read_text())
+        config = json.loads(filepath.read_text(self.encoding))
         if "auths" not in config:
             return
 
@@ -1,13 +1,15 @@
-from pathlib import Path
-
-
-class Dockerfile:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            # ENV key=value
-            if line.startswith("ENV "):
-                item = line.replace("ENV ", "", 1)
-                for op in ["=", " "]:
-                    if op in item and len(item.split(op)) == 2:
-                        key, value = item.split(op)
-                        yield key, value
+import re
+
+from whispers.plugins.lines import LinePlugin
+
+
+class Dockerfile(LinePlugin):
+    PREFILTER = "ENV "
+    PATTERN = re.compile(r"ENV (?P<value>.*)$")
+
+    def parse(self, match):
+        # ENV key=value
+        for op in ["=", " "]:
+            item = match["value"].split(op)
+            if len(item) == 2:
+                yield item[0], item[1]
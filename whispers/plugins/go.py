@@ -1,19 +1,20 @@
-from pathlib import Path
+import re
 
+from whispers.plugins.lines import LinePlugin
 from whispers.utils import string_is_function, string_is_quoted
 
 
-class Go:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            if line.count("=") == 1:
-                yield from self.parse_assignment(line)
+class Go(LinePlugin):
+    PREFILTER = "="
+    # Single assignment of a quoted value, the key is matched once without backtracking
+    PATTERN = re.compile(r"""(?=(?P<key>[^=]*))(?P=key)=(?P<value>[^='"]*['"][^=]*)$""")
 
-    def parse_assignment(self, line: str):
-        line = line.replace(":=", "=")
-        key, value = line.split("=")
+    def parse(self, match):
+        key = match["key"]
+        if key.endswith(":"):
+            key = key[:-1]  # key := value
         key = key.strip()
-        value = value.strip()
+        value = match["value"].strip()
         if string_is_function(value) or not string_is_quoted(value):
             return
         if key.startswith(("var ", "const ")):
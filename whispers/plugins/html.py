@@ -1,18 +1,41 @@
+from html.parser import HTMLParser
 from pathlib import Path
 
-from bs4 import BeautifulSoup, Comment
-from bs4.element import PageElement
-
 from whispers.utils import truncate_all_space
 
+CHUNK_SIZE = 1 << 16
+
+
+class CommentParser(HTMLParser):
+    """Collects comments while HTML is fed, without building a document tree"""
+
+    def __init__(self):
+        super().__init__()
+        self.comments = []
+
+    def handle_comment(self, data: str):
+        self.comments.append(data)
+
 
 class Html:
+    STREAMING = True  # Reads files in bounded chunks
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
     def pairs(self, filepath: Path):
-        soup = BeautifulSoup(filepath.read_text(), "lxml")
-        for comment in soup.find_all(text=lambda text: isinstance(text, Comment)):
-            yield from self.parse_comments(comment)
-
-    def parse_comments(self, comment: PageElement):
-        comment = truncate_all_space(comment.extract()).strip()
-        if comment:
-            yield "comment", comment
+        parser = CommentParser()
+        with filepath.open("r", encoding=self.encoding) as fh:
+            chunk = fh.read(CHUNK_SIZE)
+            while chunk:
+                parser.feed(chunk)
+                yield from self.parse_comments(parser)
+                chunk = fh.read(CHUNK_SIZE)
+        parser.close()
+        yield from self.parse_comments(parser)
+
+    def parse_comments(self, parser: CommentParser):
+        """Yields and forgets comments parsed so far"""
+        for comment in parser.comments:
+            comment = truncate_all_space(comment).strip()
+            if comment:
+                yield "comment", comment
+        parser.comments.clear()
@@ -1,14 +1,15 @@
-from pathlib import Path
+import re
 
+from whispers.plugins.lines import LinePlugin
 from whispers.utils import strip_string
 
 
-class Htpasswd:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            if ":" not in line:
-                continue
-            creds = line.split(":")
-            value = strip_string(creds[1])
-            if value:
-                yield "htpasswd_Hash", value
+class Htpasswd(LinePlugin):
+    KEY = "htpasswd_Hash"
+    PREFILTER = ":"
+    PATTERN = re.compile(r"[^:]*:(?P<value>[^:]*)")
+
+    def parse(self, match):
+        value = strip_string(match["value"])
+        if value:
+            yield self.KEY, value
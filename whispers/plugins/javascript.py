@@ -1,17 +1,16 @@
-from pathlib import Path
+import re
 
+from whispers.plugins.lines import LinePlugin
 from whispers.utils import string_is_function, string_is_quoted, strip_string
 
 
-class Javascript:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            if line.count("=") == 1:
-                yield from self.parse_assignment(line)
+class Javascript(LinePlugin):
+    PREFILTER = "="
+    # Single assignment of a quoted value, the key is matched once without backtracking
+    PATTERN = re.compile(r"""(?=(?P<key>[^=]*))(?P=key)=(?P<value>[^='"]*['"][^=]*)$""")
 
-    def parse_assignment(self, line: str):
-        key, value = line.split("=")
-        key = strip_string(key).split(" ")[-1]
-        value = value.replace(";", "").strip()
+    def parse(self, match):
+        key = strip_string(match["key"]).split(" ")[-1]
+        value = match["value"].replace(";", "").strip()
         if string_is_quoted(value) and not string_is_function(value):
             yield key, value
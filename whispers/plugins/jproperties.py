@@ -4,9 +4,11 @@ from jproperties import Properties
 
 
 class Jproperties:
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
     def pairs(self, filepath: Path):
         props = Properties()
-        props.load(filepath.read_text(), "utf-8")
+        props.load(filepath.read_text(self.encoding), "utf-8")
         for key, value in props.properties.items():
             key = key.replace(".", "_")
             yield key, value
@@ -1,28 +1,197 @@
 import json
 import re
 from pathlib import Path
+from typing import Iterator, List, Optional, TextIO
 
 from whispers.log import debug
 from whispers.plugins.traverse import StructuredDocument
+from whispers.utils import Pair
+
+# Files above this size are tokenized while they are read
+STREAM_THRESHOLD = 8 << 20
+CHUNK_SIZE = 1 << 16
+MAX_TOKEN = 1 << 24  # Characters buffered for one token, beyond the file is malformed or hostile
+
+TOKEN_REGEX = re.compile(
+    r"""
+    (?P<space>[ \t\r\n]+)
+    |(?P<comment>//[^\n]*)
+    |(?P<string>"(?:[^"\\\n]|\\.)*")
+    |(?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)
+    |(?P<literal>true|false|null)
+    |(?P<punct>[{}\[\]:,])
+    """,
+    flags=re.VERBOSE,
+)
+
+LITERALS = {"true": True, "false": False, "null": None}
+
+SAFE_CUTS = "\n,:{}[]"
+
+
+class JsonTokenizer:
+    """
+    Reads JSON tokens from a text stream one chunk at a time.
+    Yields (kind, value, line, column) with values decoded, skipping
+    whitespace and // comments. Memory is bounded by the longest token,
+    and tokens longer than max_token, such as unterminated strings, raise
+    ValueError.
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int = CHUNK_SIZE, max_token: int = MAX_TOKEN):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.max_token = max_token
+
+    def __iter__(self) -> Iterator[tuple]:
+        buffer = ""
+        line, line_start = 1, 0  # line_start is the offset of the current line in buffer
+        eof = False
+        while not eof:
+            chunk = self.stream.read(self.chunk_size)
+            eof = not chunk
+            buffer += chunk
+            # Tokens never continue past a structural character or a line break
+            cut = len(buffer) if eof else max(buffer.rfind(char) for char in SAFE_CUTS) + 1
+            scanner = TOKEN_REGEX.scanner(buffer, 0, cut)
+            pos = 0
+            for match in iter(scanner.match, None):
+                kind = match.lastgroup
+                if kind == "space":
+                    text = match.group()
+                    if "\n" in text:
+                        line += text.count("\n")
+                        line_start = pos + text.rindex("\n") + 1
+                elif kind == "string":
+                    text = match.group()
+                    yield kind, json.loads(text) if "\\" in text else text[1:-1], line, pos - line_start + 1
+                elif kind == "punct":
+                    yield match.group(), None, line, pos - line_start + 1
+                elif kind == "number":
+                    text = match.group()
+                    value = int(text) if text.lstrip("-").isdigit() else float(text)
+                    yield kind, value, line, pos - line_start + 1
+                elif kind == "literal":
+                    yield kind, LITERALS[match.group()], line, pos - line_start + 1
+                elif match.end() == cut and not eof:
+                    break  # Comment continues in the next chunk
+                pos = match.end()
+            if eof and pos < len(buffer):
+                raise ValueError(f"Invalid JSON at line {line}, column {pos - line_start + 1}")
+            buffer = buffer[pos:]
+            line_start -= pos
+            if len(buffer) > self.max_token:
+                raise ValueError(f"Token longer than {self.max_token} characters at line {line}")
 
 
 class Json(StructuredDocument):
+    STREAMING = True  # Reads files above stream_size in bounded chunks
+    stream_size = STREAM_THRESHOLD  # Lowered by WhisperPlugins to the size limit
+
     def pairs(self, filepath: Path):
+        try:
+            if filepath.stat().st_size > self.stream_size:
+                with filepath.open("r", encoding=self.encoding) as stream:
+                    yield from self.stream(stream)
+                return
+            document = json.loads(self.strip_comments(filepath))
+            yield from self.traverse(document)
+        except Exception as e:
+            debug(f"{type(e)} in {filepath}")
+
+    def strip_comments(self, filepath: Path) -> str:
         """
         Convert custom JSON to parsable JSON
         - Remove lines that start with // comments
         - Strip // comments from the end the line
         """
-        document = ""
-        for line in filepath.open("r").readlines():
+        lines = []
+        for line in filepath.open("r", encoding=self.encoding):
             if line.startswith("//"):
                 continue
-            line = re.sub(r" // ?.*$", "", line)
-            document += line
+            if " //" in line:
+                line = re.sub(r" // ?.*$", "", line)
+            lines.append(line)
+        return "".join(lines)
 
-        # Load converted JSON
-        try:
-            document = json.loads(document)
-            yield from self.traverse(document)
-        except Exception as e:
-            debug(f"{type(e)} in {filepath}")
+    def stream(self, stream: TextIO) -> Iterator[Pair]:
+        """
+        Yields the same pairs as traverse() while the document is read.
+        Scalars are yielded as soon as they are read, so memory is bounded by
+        nesting depth: a stack of open containers and the key path.
+        Pairs carry the position of their value.
+        """
+        stack: List[dict] = []  # Open objects and arrays
+        cloudformation = {"version": False, "defaults": []}
+        expect_key = expect_colon = False
+        for kind, value, line, column in JsonTokenizer(stream):
+            frame = stack[-1] if stack else None
+            if expect_colon and kind != ":":
+                raise ValueError(f"Expected : at line {line}, column {column}")
+            if kind == "{" or kind == "[":
+                child = {"object": kind == "{", "key": self.member_key(frame), "siblings": {}}
+                stack.append(child)
+                expect_key = child["object"]
+            elif kind == "}" or kind == "]":
+                if not frame or frame["object"] != (kind == "}") or "member" in frame:
+                    raise ValueError(f"Unexpected {kind} at line {line}, column {column}")
+                stack.pop()
+                if kind == "}":
+                    if not stack and cloudformation["version"]:
+                        for default in cloudformation["defaults"]:
+                            yield Pair(*default)
+                    siblings = frame["siblings"]
+                    if "key" in siblings and "value" in siblings:
+                        yield Pair(siblings["key"][0], siblings["value"][0], self.breadcrumbs, *siblings["value"][1:])
+                self.end_value(stack)
+            elif kind == ":" or kind == ",":
+                expect_key = kind == "," and bool(frame and frame["object"])
+                expect_colon = False
+            elif expect_key and kind != "string":
+                raise ValueError(f"Expected a key at line {line}, column {column}")
+            elif expect_key:
+                frame["member"] = value
+                self.breadcrumbs.append(value)
+                expect_key, expect_colon = False, True
+                if len(stack) == 1 and value == "AWSTemplateFormatVersion":
+                    cloudformation["version"] = True
+            else:
+                yield from self.scalar(frame, value, line, column)
+                if frame and frame["object"]:
+                    self.cloudformation_default(stack, cloudformation, value, line, column)
+                self.end_value(stack)
+        if stack:
+            raise ValueError("Unexpected end of JSON")
+
+    def member_key(self, frame: Optional[dict]) -> Optional[str]:
+        """Key that values in a new container are reported under"""
+        if not frame:
+            return None
+        if frame["object"]:
+            return frame.get("member")
+        return frame["key"]
+
+    def scalar(self, frame: Optional[dict], value, line: int, column: int) -> Iterator[Pair]:
+        if frame:
+            key = self.member_key(frame)
+            if frame["object"] and key in ("key", "value"):
+                frame["siblings"][key] = (value, line, column)
+            yield Pair(key, value, self.breadcrumbs, line, column)
+        if isinstance(value, str):
+            for pair in self.traverse(value, line=line, column=column):
+                yield pair
+
+    def end_value(self, stack: List[dict]):
+        """Closes the member whose value was just read"""
+        if stack and stack[-1]["object"] and "member" in stack[-1]:
+            del stack[-1]["member"]
+            self.breadcrumbs.pop()
+
+    @staticmethod
+    def cloudformation_default(stack: List[dict], cloudformation: dict, value, line: int, column: int):
+        """Collects Parameters.<name>.Default values of a root object"""
+        if len(stack) != 3 or stack[-1].get("member") != "Default":
+            return
+        if not stack[0]["object"] or stack[0].get("member") != "Parameters" or not stack[1]["object"]:
+            return
+        cloudformation["defaults"].append((stack[1]["member"], value, [], line, column))
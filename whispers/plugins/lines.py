@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Iterator, Match, Optional, Pattern, Tuple
+
+from whispers.utils import Pair
+
+CHUNK_SIZE = 1 << 16
+MAX_LINE = 1 << 20  # Longer lines, e.g. minified files, are matched in pieces of this size
+
+
+class LinePlugin:
+    """
+    Base for line oriented formats, declared by:
+    - PATTERN: matched from the start of each line, without its line break.
+      It captures a "value" group, and optionally a "key" group. It may
+      select more lines than parse() accepts, but never fewer.
+    - KEY: key reported when PATTERN has no "key" group.
+    - PREFILTER: text that every matching line contains. Lines without it are
+      skipped before PATTERN runs, and so are whole blocks of lines.
+    Override parse() when matches need further processing.
+    """
+
+    PATTERN: Pattern
+    KEY: Optional[str] = None
+    PREFILTER: Optional[str] = None
+    STREAMING = True  # Reads files in bounded chunks
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
+    def pairs(self, filepath: Path) -> Iterator[Pair]:
+        prefilter = self.PREFILTER or ""
+        match_line, parse = self.PATTERN.match, self.parse  # Bound once, called per line
+        lines = 0  # Lines before the current block
+        with filepath.open("r", encoding=self.encoding) as fh:
+            block = fh.read(CHUNK_SIZE)
+            while block:
+                if not block.endswith("\n"):
+                    block += fh.readline(MAX_LINE)  # Complete the last line, within bounds
+                if prefilter in block:
+                    for line_number, line in enumerate(block.split("\n"), lines + 1):
+                        if prefilter not in line:
+                            continue
+                        match = match_line(line)
+                        if not match:
+                            continue
+                        for key, value in parse(match):
+                            yield Pair(key, value, line=line_number)
+                lines += block.count("\n")
+                block = fh.read(CHUNK_SIZE)
+
+    def parse(self, match: Match) -> Iterator[Tuple[str, str]]:
+        groups = match.groupdict()
+        value = groups["value"].strip()
+        if value:
+            yield groups.get("key", self.KEY), value
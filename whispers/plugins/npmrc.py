@@ -1,12 +1,9 @@
-from pathlib import Path
+import re
 
+from whispers.plugins.lines import LinePlugin
 
-class Npmrc:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            if ":_authToken=" not in line:
-                continue
 
-            value = line.split(":_authToken=")[-1].strip()
-            if value:
-                yield "npm_authToken", value
+class Npmrc(LinePlugin):
+    KEY = "npm_authToken"
+    PREFILTER = ":_authToken="
+    PATTERN = re.compile(r".*:_authToken=(?P<value>.*)$")
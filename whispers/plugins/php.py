@@ -1,19 +1,22 @@
-from pathlib import Path
+import re
 
+from whispers.plugins.lines import LinePlugin
 from whispers.utils import string_is_function, strip_string
 
 
-class Php:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            if line.startswith("define"):
-                yield from self.parse_define(line)
-            elif line.count("=") == 1:
-                yield from self.parse_assignment(line)
+class Php(LinePlugin):
+    # define(key, value) or a single assignment, the key is matched once without backtracking
+    PATTERN = re.compile(r"(?:(?P<define>define.*)|(?=(?P<key>[^=]*))(?P=key)=(?P<value>[^=]*))$")
 
-    def parse_assignment(self, line: str):
-        line = line.replace("=>", "=")
-        key, value = line.split("=")
+    def parse(self, match):
+        if match["define"]:
+            yield from self.parse_define(match["define"])
+        else:
+            yield from self.parse_assignment(match["key"], match["value"])
+
+    def parse_assignment(self, key: str, value: str):
+        if value.startswith(">"):
+            value = value[1:]  # key => value
         key = strip_string(key.replace("$", ""))
         if "[" in key and "]" in key:
             key = key.split("[")[-1].replace("]", "")
@@ -1,13 +1,15 @@
-from pathlib import Path
+import re
 from urllib.parse import urlparse
 
+from whispers.plugins.lines import LinePlugin
 
-class Pip:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            if "http" not in line:
-                continue
 
-            value = urlparse(line.split("=")[-1].strip()).password
-            if value:
-                yield "pip_Password", value
+class Pip(LinePlugin):
+    KEY = "pip_Password"
+    PREFILTER = "http"
+    PATTERN = re.compile(r"(?=.*http)(?:.*=)?(?P<value>[^=]*)$")
+
+    def parse(self, match):
+        value = urlparse(match["value"].strip()).password
+        if value:
+            yield self.KEY, value
@@ -2,20 +2,23 @@ from pathlib import Path
 
 from whispers.plugins.uri import Uri
 from whispers.rules import WhisperRules
-from whispers.utils import strip_string
+from whispers.utils import Pair, strip_string
 
 
 class Plaintext:
+    STREAMING = True  # Reads files line by line
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
     def __init__(self, rules: WhisperRules):
         self.rules = rules
 
     def pairs(self, filepath: Path):
-        lines = filepath.open("r").readlines()
-        for idx in range(len(lines)):
-            line = lines[idx]
-            if not strip_string(line):
-                continue
+        with filepath.open("r", encoding=self.encoding) as fh:
+            for line_number, line in enumerate(fh, 1):
+                if not strip_string(line):
+                    continue
 
-            for value in line.split():
-                if self.rules.match("uri", value):
-                    yield from Uri().pairs(value)
+                for value in line.split():
+                    if self.rules.match("uri", value):
+                        for k, v in Uri().pairs(value):
+                            yield Pair(k, v, line=line_number)
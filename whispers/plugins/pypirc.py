@@ -1,12 +1,9 @@
-from pathlib import Path
+import re
 
+from whispers.plugins.lines import LinePlugin
 
-class Pypirc:
-    def pairs(self, filepath: Path):
-        for line in filepath.open("r").readlines():
-            if "password:" not in line:
-                continue
 
-            value = line.split("password:")[-1].strip()
-            if value:
-                yield "PyPI_Password", value
+class Pypirc(LinePlugin):
+    KEY = "PyPI_Password"
+    PREFILTER = "password:"
+    PATTERN = re.compile(r".*password:(?P<value>.*)$")
@@ -1,51 +1,187 @@
+import ast
+import io
+import re
+import sys
+import tokenize
+import warnings
+from keyword import iskeyword
 from pathlib import Path
-
-import astroid
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
 
 from whispers.log import debug
+from whispers.rules import WhisperRules
+from whispers.utils import Pair
+
+# Python < 3.8 parses literals into these types instead of ast.Constant
+if sys.version_info < (3, 8):
+    LEGACY_CONSTANTS = {ast.Str: "s", ast.Bytes: "s", ast.Num: "n", ast.NameConstant: "value"}
+else:
+    LEGACY_CONSTANTS = {}
+
+CONSTANT_TYPES = (ast.Constant,) + tuple(LEGACY_CONSTANTS)
+
+# Identifiers in a rule regex, after dropping escapes such as \S and \(
+REGEX_ESCAPE = re.compile(r"\\.")
+REGEX_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Inline flags that apply to the whole regex, e.g. (?i)^eval, or to part of it only, e.g. (?i:eval)
+REGEX_GLOBAL_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+REGEX_SCOPED_FLAGS = re.compile(r"\(\?(?:[aiLmsux]+-?[imsx]*|-[imsx]+):")
+
+# Regex (alternative) start that matches callees without naming them, e.g. ^.* or ^\w+ or |[a-z]
+REGEX_WILDCARD_START = re.compile(r"(?:^\^?|\|)(?:\((?:\?:)?)*[.\[\\?]")
+
+# Tokens that end a literal operand in the tokenize fallback
+TERMINAL_OPS = {",", ")", "]", "}", ":", ";"}
+TERMINAL_NAMES = {"and", "or", "if", "else"}
+SKIPPED_TOKENS = {tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT}
 
 
 class Python:
     """
-    Parses Python source code into AST using Astroid
-    http://pylint.pycqa.org/projects/astroid/en/latest/api/astroid.nodes.html#id1
+    Parses Python source code into AST using the standard library
+    https://docs.python.org/3/library/ast.html
+    Sources that do not parse, such as Python 2, are scanned token by token.
     Returns key-value pairs
     """
 
+    envfuncs = ["getenv", "environ.get"]
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
+    def __init__(self, rules: Optional[WhisperRules] = None):
+        self.callees, self.contents = self.call_filters(rules) if rules else (None, None)
+
+    @classmethod
+    def call_filters(cls, rules: WhisperRules) -> Tuple[Optional[List[Pattern]], Optional[List[Pattern]]]:
+        """function_callees() and content_regexes(), worked out once per rules index"""
+        rules.candidates("function")  # Builds the index
+        if "function_filters" not in rules.index:
+            rules.index["function_filters"] = (cls.function_callees(rules), cls.content_regexes(rules))
+        return rules.index["function_filters"]
+
+    @staticmethod
+    def matches_any_key(rule: dict) -> bool:
+        """Rules without a key regex, or with one matching an empty key, also match calls"""
+        return "regex" not in rule.get("key", {}) or bool(rule["key"]["regex"].match(""))
+
+    @classmethod
+    def function_callees(cls, rules: WhisperRules) -> Optional[List[Pattern]]:
+        """
+        Returns a regex for each loaded rule on "function" pairs, of the
+        identifiers a callee must contain for the rule to match its call,
+        with the flags of the rule's value regex.
+        Returns None if any callee can match.
+        Rules that match any key do not limit callees, see content_regexes().
+        """
+        ret = []
+        for _, rule, _ in rules.candidates("function"):
+            if cls.matches_any_key(rule):
+                continue
+            regex = rule.get("value", {}).get("regex")
+            if regex is None:
+                return None
+            pattern = REGEX_GLOBAL_FLAGS.sub("", regex.pattern)
+            if REGEX_WILDCARD_START.search(pattern) or REGEX_SCOPED_FLAGS.search(pattern):
+                return None
+            identifiers = REGEX_IDENTIFIER.findall(REGEX_ESCAPE.sub(" ", pattern))
+            if not identifiers:
+                return None
+            flags = re.compile(regex.pattern, regex.flags).flags & re.IGNORECASE  # Including (?i)
+            ret.append(re.compile("|".join(identifiers), flags))
+        return ret
+
+    @classmethod
+    def content_regexes(cls, rules: WhisperRules) -> Optional[List[Pattern]]:
+        """
+        Returns the value regexes of loaded rules that match any key, which
+        are searched for in the callee and the literals of each call.
+        Returns None if such a rule has no value regex, so any call can match.
+        """
+        ret = []
+        for _, rule, _ in rules.candidates("function"):
+            if not cls.matches_any_key(rule):
+                continue
+            regex = rule.get("value", {}).get("regex")
+            if regex is None:
+                return None
+            ret.append(re.compile(regex.pattern, regex.flags))
+        return ret
+
+    def is_call_checked(self, callee: str, contents: Iterable[str]) -> bool:
+        """
+        Checks if any rule can match a call, given its callee and contents:
+        the literals in the call, or its source text
+        """
+        if self.callees is None or self.contents is None:
+            return True
+        if any(regex.search(callee) for regex in self.callees):
+            return True
+        if not self.contents:
+            return False
+        return any(regex.search(text) for text in (callee, *contents) for regex in self.contents)
+
+    def call_literals(self, node: ast.Call) -> Iterator[str]:
+        for child in ast.walk(node):
+            if self.is_const(child):
+                yield str(self.const_value(child))
+
+    @staticmethod
+    def pair(key: str, value: str, node) -> Pair:
+        """
+        Pair located at the given node
+        """
+        return Pair(key, value, [], getattr(node, "lineno", 0) or 0, (getattr(node, "col_offset", 0) or 0) + 1)
+
     def pairs(self, filepath: Path):
         try:
-            tree = astroid.parse(filepath.read_text())
-            yield from self.traverse(tree)
+            code = filepath.read_text(self.encoding)
         except Exception as e:
             debug(f"{type(e)} in {filepath}")
+            return
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # Invalid escapes and such in scanned code
+                tree = ast.parse(code)
+        except (SyntaxError, ValueError) as e:
+            debug(f"{type(e)} in {filepath}, scanning tokens")
+            yield from self.tokens(code)
+            return
+        yield from self.traverse(tree)
+
+    @staticmethod
+    def is_const(node) -> bool:
+        return isinstance(node, CONSTANT_TYPES)
+
+    @staticmethod
+    def const_value(node):
+        for legacy, attr in LEGACY_CONSTANTS.items():
+            if isinstance(node, legacy):
+                return getattr(node, attr)
+        return node.value
 
     @staticmethod
     def is_key(node) -> bool:
         """
         Check if node is a variable
         """
-        types = [astroid.node_classes.Name, astroid.node_classes.AssignName]
-        return type(node) in types
+        return type(node) is ast.Name
 
-    @staticmethod
-    def is_value(node) -> bool:
+    def is_value(self, node) -> bool:
         """
         Check if node is a value
         """
-        types = [astroid.node_classes.Const, astroid.node_classes.JoinedStr, astroid.node_classes.Call]
-        return type(node) in types
+        return self.is_const(node) or type(node) in (ast.JoinedStr, ast.Call)
 
-    @staticmethod
-    def node_concat_const(nodes) -> str:
+    def node_concat_const(self, nodes) -> str:
         """
         Joins all Const node values and returns as string
         Return empty string if a non-Const node is found
         """
         ret = ""
         for value in nodes:
-            if not isinstance(value, astroid.node_classes.Const):
+            if not self.is_const(value):
                 return ""
-            ret += f"{value.value}"
+            ret += f"{self.const_value(value)}"
         return ret
 
     def node_to_str(self, node) -> str:
@@ -53,83 +189,279 @@ class Python:
         Converts node valid objects to string
         Returns empty string otherwise
         """
-        if isinstance(node, astroid.node_classes.Name):
-            return node.name
-        if isinstance(node, astroid.node_classes.AssignName):
-            return node.name
-        if isinstance(node, astroid.node_classes.Const):
-            return node.value
-        if isinstance(node, astroid.node_classes.JoinedStr):
+        if isinstance(node, ast.Name):
+            return node.id
+        if self.is_const(node):
+            return self.const_value(node)
+        if isinstance(node, ast.JoinedStr):
             return self.node_concat_const(node.values)
-        if isinstance(node, astroid.node_classes.Keyword):
+        if isinstance(node, ast.keyword):
             return node.arg
-        if isinstance(node, astroid.node_classes.Call):
+        if isinstance(node, ast.Call):
             return self.node_concat_const(node.args)
         return ""
 
+    @staticmethod
+    def children(node) -> List[ast.AST]:
+        if isinstance(node, ast.Dict):
+            ret = []
+            for key, value in zip(node.keys, node.values):
+                if key is not None:
+                    ret.append(key)
+                ret.append(value)
+            return ret
+        return list(ast.iter_child_nodes(node))
+
     def traverse(self, tree):
         """
-        Recursively traverse nodes yielding key-value pairs
+        Traverse nodes depth-first, yielding key-value pairs of each node
+        after those of its children
         """
-        for node in tree.get_children():
-            yield from self.traverse(node)
-            # Assignment
-            if isinstance(node, astroid.node_classes.Assign):
-                if not self.is_value(node.value):
-                    continue
-                value = self.node_to_str(node.value)
-                for key in node.targets:
-                    key = self.node_to_str(key)
-                    if key and value:
-                        yield key, value
-            # Comparison
-            elif isinstance(node, astroid.node_classes.Compare):
-                left = node.left
-                right = node.ops[0][1]
-                key, value = "", ""
-                if self.is_key(left) and self.is_value(right):
-                    key = self.node_to_str(left)
-                    value = self.node_to_str(right)
-                elif self.is_key(right) and self.is_value(left):
-                    key = self.node_to_str(right)
-                    value = self.node_to_str(left)
-                if key and value:
-                    yield key, value
-            # Dictionary values
-            elif isinstance(node, astroid.node_classes.Dict):
-                for key, value in node.items:
-                    if not self.is_value(value):
-                        continue
-                    key = self.node_to_str(key)
-                    value = self.node_to_str(value)
-                    if key and value:
-                        yield key, value
-            # Keywords
-            elif isinstance(node, astroid.node_classes.Keyword):
-                key = self.node_to_str(node)
-                value = self.node_to_str(node.value)
+        stack = [(child, False) for child in reversed(self.children(tree))]
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                yield from self.node_pairs(node)
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(self.children(node)))
+
+    def node_pairs(self, node):
+        # Assignment
+        if isinstance(node, ast.Assign):
+            if not self.is_value(node.value):
+                return
+            value = self.node_to_str(node.value)
+            for key in node.targets:
+                key = self.node_to_str(key)
                 if key and value:
-                    yield key, value
-            # Function call
-            elif isinstance(node, astroid.node_classes.Call):
-                key = "function"
-                value = node.as_string()  # Entire function call
-                yield key, value
-                yield from self.parse_env_functions(node)
+                    yield self.pair(key, value, node.value)
+        # Comparison
+        elif isinstance(node, ast.Compare):
+            left = node.left
+            right = node.comparators[0]
+            key, value = "", ""
+            if self.is_key(left) and self.is_value(right):
+                key = self.node_to_str(left)
+                value = self.node_to_str(right)
+            elif self.is_key(right) and self.is_value(left):
+                key = self.node_to_str(right)
+                value = self.node_to_str(left)
+            if key and value:
+                yield self.pair(key, value, node)
+        # Dictionary values
+        elif isinstance(node, ast.Dict):
+            for key, value in zip(node.keys, node.values):
+                if not self.is_value(value):
+                    continue
+                key_str = self.node_to_str(key)
+                value_str = self.node_to_str(value)
+                if key_str and value_str:
+                    yield self.pair(key_str, value_str, value)
+        # Keywords
+        elif isinstance(node, ast.keyword):
+            key = self.node_to_str(node)
+            value = self.node_to_str(node.value)
+            if key and value:
+                yield self.pair(key, value, node.value)
+        # Function call
+        elif isinstance(node, ast.Call):
+            callee = self.callee(node.func)
+            if self.is_call_checked(callee, self.call_literals(node)):
+                yield self.pair("function", self.unparse(node), node)  # Entire function call
+            yield from self.parse_env_functions(node, callee)
+
+    def callee(self, node) -> str:
+        """
+        Dotted name of a called function, e.g. os.path.join
+        """
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            return f"{self.callee(node.value)}.{node.attr}"
+        if isinstance(node, ast.Call):
+            return f"{self.callee(node.func)}()"
+        return ""
 
-    def parse_env_functions(self, node: astroid.node_classes.Call):
+    def unparse(self, node) -> str:
+        """
+        Renders an expression back to source code
+        """
+        if hasattr(ast, "unparse"):
+            return ast.unparse(node)
+        return self.render(node)
+
+    def render(self, node) -> str:
+        """
+        Minimal ast.unparse for Python < 3.9, covering typical call arguments
+        """
+        if isinstance(node, ast.Name):
+            return node.id
+        if self.is_const(node):
+            return repr(self.const_value(node))
+        if isinstance(node, ast.Attribute):
+            return f"{self.render(node.value)}.{node.attr}"
+        if isinstance(node, ast.Call):
+            args = [self.render(arg) for arg in node.args]
+            args += [self.render(keyword) for keyword in node.keywords]
+            return f"{self.render(node.func)}({', '.join(args)})"
+        if isinstance(node, ast.keyword):
+            return f"{node.arg}={self.render(node.value)}" if node.arg else f"**{self.render(node.value)}"
+        if isinstance(node, ast.Starred):
+            return f"*{self.render(node.value)}"
+        if isinstance(node, ast.List):
+            return f"[{', '.join(self.render(item) for item in node.elts)}]"
+        if isinstance(node, ast.Tuple):
+            items = [self.render(item) for item in node.elts]
+            return f"({items[0]},)" if len(items) == 1 else f"({', '.join(items)})"
+        if isinstance(node, ast.Dict):
+            items = []
+            for key, value in zip(node.keys, node.values):
+                items.append(f"{self.render(key)}: {self.render(value)}" if key else f"**{self.render(value)}")
+            return f"{{{', '.join(items)}}}"
+        if isinstance(node, ast.Subscript):
+            index = node.slice.value if type(node.slice).__name__ == "Index" else node.slice  # Python < 3.9
+            return f"{self.render(node.value)}[{self.render(index)}]"
+        if isinstance(node, ast.JoinedStr):
+            return f"f{repr(self.node_concat_const(node.values))}"
+        return "..."
+
+    def parse_env_functions(self, node: ast.Call, callee: str):
         """
         Decompose environment calls into key-value pairs
         """
-        envfuncs = [
-            "getenv",
-            "environ.get",
-        ]
-        node_name = node.func.as_string()
-        if any(name in node_name for name in envfuncs):
+        if any(name in callee for name in self.envfuncs):
             if len(node.args) == 2:
                 key, value = node.args
-                key = self.node_to_str(key)
-                value = self.node_to_str(value)
-                if key and value:
-                    yield key, value
+                key_str = self.node_to_str(key)
+                value_str = self.node_to_str(value)
+                if key_str and value_str:
+                    yield self.pair(key_str, value_str, value)
+
+    def tokens(self, code: str) -> Iterator[Pair]:
+        """
+        Fallback for sources that do not parse: finds assignments, keywords,
+        comparisons, dict items, environment calls and function calls
+        with literal operands in the token stream
+        """
+        tokens = []
+        try:
+            for token in tokenize.generate_tokens(io.StringIO(code).readline):
+                if token.type not in SKIPPED_TOKENS:
+                    tokens.append(token)
+        except (tokenize.TokenError, SyntaxError):
+            pass  # Keep tokens read so far
+        lines = code.splitlines()
+        for idx, token in enumerate(tokens):
+            prev = tokens[idx - 1] if idx else None
+            if token.type == tokenize.NAME:
+                if prev and prev.string == ".":
+                    continue  # Attribute, not a variable
+                if iskeyword(token.string):
+                    continue
+                yield from self.token_name(tokens, idx, lines)
+            elif token.type == tokenize.STRING:
+                yield from self.token_string(tokens, idx, prev)
+
+    @staticmethod
+    def token_literal(tokens: list, idx: int):
+        """
+        Returns the value of a literal token followed by the end of an operand, or None
+        """
+        if idx + 1 >= len(tokens):
+            return None
+        token, end = tokens[idx], tokens[idx + 1]
+        if token.type not in (tokenize.STRING, tokenize.NUMBER):
+            return None
+        if end.type == tokenize.OP and end.string not in TERMINAL_OPS:
+            return None
+        if end.type == tokenize.NAME and end.string not in TERMINAL_NAMES:
+            return None
+        try:
+            return ast.literal_eval(token.string)
+        except (SyntaxError, ValueError):
+            return None
+
+    def token_pair(self, key: str, value, token) -> Iterator[Pair]:
+        if key and value:
+            yield Pair(key, value, [], token.start[0], token.start[1] + 1)
+
+    def token_name(self, tokens: list, idx: int, lines: list) -> Iterator[Pair]:
+        name = tokens[idx]
+        if idx + 2 >= len(tokens):
+            return
+        op = tokens[idx + 1]
+        if op.string in ("=", "==", "!=", "<>"):  # Assignment, keyword or comparison
+            value = self.token_literal(tokens, idx + 2)
+            if value is not None:
+                yield from self.token_pair(name.string, value, tokens[idx + 2] if op.string == "=" else name)
+            return
+        # Function call
+        callee = [name.string]
+        end = idx + 1
+        while end + 1 < len(tokens) and tokens[end].string == "." and tokens[end + 1].type == tokenize.NAME:
+            callee.append(tokens[end + 1].string)
+            end += 2
+        if end >= len(tokens) or tokens[end].string != "(":
+            return
+        callee = ".".join(callee)
+        close = self.token_close(tokens, end)
+        if close is None:
+            return
+        text = self.token_text(lines, name.start, tokens[close].end)
+        if self.is_call_checked(callee, [text]):
+            yield from self.token_pair("function", text, name)
+        if any(envfunc in callee for envfunc in self.envfuncs) and close == end + 4 and tokens[end + 2].string == ",":
+            key = self.token_literal(tokens, end + 1)
+            value = self.token_literal(tokens, end + 3)
+            if key is not None and value is not None:
+                yield from self.token_pair(key, value, tokens[end + 3])
+
+    def token_string(self, tokens: list, idx: int, prev) -> Iterator[Pair]:
+        if idx + 2 >= len(tokens):
+            return
+        op = tokens[idx + 1]
+        if op.string == ":" and prev and prev.string in ("{", ","):  # Dict item
+            try:
+                key = ast.literal_eval(tokens[idx].string)
+            except (SyntaxError, ValueError):
+                return
+            value = self.token_literal(tokens, idx + 2)
+            if value is not None:
+                yield from self.token_pair(key, value, tokens[idx + 2])
+        elif op.string in ("==", "!=", "<>") and tokens[idx + 2].type == tokenize.NAME:  # Comparison
+            if idx + 3 < len(tokens) and tokens[idx + 3].string in (".", "(", "["):
+                return
+            try:
+                value = ast.literal_eval(tokens[idx].string)
+            except (SyntaxError, ValueError):
+                return
+            yield from self.token_pair(tokens[idx + 2].string, value, tokens[idx])
+
+    @staticmethod
+    def token_close(tokens: list, idx: int) -> Optional[int]:
+        """
+        Returns the index of the parenthesis closing the one at idx
+        """
+        depth = 0
+        for end in range(idx, len(tokens)):
+            if tokens[end].string in ("(", "[", "{"):
+                depth += 1
+            elif tokens[end].string in (")", "]", "}"):
+                depth -= 1
+                if not depth:
+                    return end
+        return None
+
+    @staticmethod
+    def token_text(lines: list, start: tuple, end: tuple) -> str:
+        """
+        Source text between token positions, joined into one line
+        """
+        (start_line, start_column), (end_line, end_column) = start, end
+        if start_line == end_line:
+            return lines[start_line - 1][start_column:end_column]
+        text = [lines[start_line - 1][start_column:].strip()]
+        text += [line.strip() for line in lines[start_line:][: end_line - start_line - 1]]
+        text.append(lines[end_line - 1][:end_column].strip())
+        return " ".join(text)
@@ -0,0 +1,128 @@
+import re
+from fnmatch import fnmatchcase
+from importlib import import_module
+from typing import Dict, Iterable, Optional, Tuple
+
+ENTRY_POINT_GROUP = "whispers.plugins"
+SHEBANG_REGEX = re.compile(rb"#!\s*(?:\S*/)?(?:env\s+(?:-\S+\s+)*)?(?:\S*/)?([A-Za-z]+)")
+
+
+def plugin_entry_points() -> Dict[str, str]:
+    """
+    Third party plugins, as entry point name: "module:Class".
+    Names are file extensions, or file name patterns when they contain a wildcard.
+    """
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python < 3.8
+        from pkg_resources import iter_entry_points
+
+        return {ep.name: f"{ep.module_name}:{ep.attrs[0]}" for ep in iter_entry_points(ENTRY_POINT_GROUP)}
+    found = entry_points()
+    if hasattr(found, "select"):
+        group = found.select(group=ENTRY_POINT_GROUP)
+    else:  # Python < 3.10
+        group = found.get(ENTRY_POINT_GROUP, [])
+    return {ep.name: ep.value for ep in group}
+
+
+class PluginRegistry:
+    """
+    Maps file names to plugin classes given as "module:Class" targets, which
+    are imported on first use. Registrations are matched in order and the
+    earliest one wins, whichever way it matched. Entry point plugins are
+    only looked up, once, for a file that no registration matches.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.extensions = {}  # extension: (position, target, sniff)
+        self.prefixes = []  # (extension prefix, position, target, sniff)
+        self.names = []  # (file name pattern, position, target, sniff)
+        self.interpreters = {}  # shebang interpreter: target
+        self.magic = {}  # leading bytes: target
+        self.classes = {}  # target: (imported class, whether it takes rules)
+        self.external = None  # Entry point plugins
+
+    def register(
+        self,
+        target: str,
+        extensions: Iterable[str] = (),
+        prefixes: Iterable[str] = (),
+        names: Iterable[str] = (),
+        interpreters: Iterable[str] = (),
+        magic: Iterable[bytes] = (),
+        sniff: bool = False,
+    ):
+        """
+        Registers target for files whose extension is one of extensions or
+        starts with one of prefixes, or whose name matches a names pattern.
+        Files without an extension that match nothing are handled when their
+        shebang runs one of interpreters, or when they start with magic.
+        With sniff, matched files starting with any magic are handed over to
+        the plugin registered for it.
+        """
+        position = self.count
+        self.count += 1
+        for extension in extensions:
+            self.extensions.setdefault(extension, (position, target, sniff))
+        self.prefixes += [(prefix, position, target, sniff) for prefix in prefixes]
+        self.names += [(name, position, target, sniff) for name in names]
+        self.prefixes.sort(key=lambda item: item[1])
+        self.names.sort(key=lambda item: item[1])
+        for interpreter in interpreters:
+            self.interpreters.setdefault(interpreter, target)
+        for prefix in magic:
+            self.magic.setdefault(prefix, target)
+
+    def load_entry_points(self):
+        """Registers third party plugins in a registry of their own"""
+        self.external = PluginRegistry()
+        for name, target in sorted(plugin_entry_points().items()):
+            if any(char in name for char in "*?["):
+                self.external.register(target, names=[name])
+            else:
+                self.external.register(target, extensions=[name])
+
+    def lookup(self, name: str, filetype: str) -> Tuple[Optional[str], bool]:
+        """Returns (target, sniff) for a file name and its extension"""
+        target, sniff = self.match(name, filetype)
+        if target is None:
+            if self.external is None:
+                self.load_entry_points()
+            target, sniff = self.external.match(name, filetype)
+        return target, sniff
+
+    def match(self, name: str, filetype: str) -> Tuple[Optional[str], bool]:
+        """Returns the earliest registration matching a file name and its extension"""
+        found = [self.extensions.get(filetype, (self.count, None, False))]
+        for prefix, position, target, sniff in self.prefixes:
+            if filetype.startswith(prefix):
+                found.append((position, target, sniff))
+                break
+        for pattern, position, target, sniff in self.names:
+            if fnmatchcase(name, pattern):
+                found.append((position, target, sniff))
+                break
+        _, target, sniff = min(found, key=lambda item: item[0])
+        return target, sniff
+
+    def sniff(self, head: bytes, shebang: bool = True) -> Optional[str]:
+        """Returns the target for file contents starting with head"""
+        for prefix, target in self.magic.items():
+            if head.startswith(prefix):
+                return target
+        found = SHEBANG_REGEX.match(head) if shebang else None
+        if found:
+            return self.interpreters.get(found.group(1).decode())
+        return None
+
+    def create(self, target: str, rules) -> object:
+        """Instantiates a "module:Class" target, passing rules to plugins that take them"""
+        if target not in self.classes:
+            module, name = target.split(":")
+            cls = getattr(import_module(module), name)
+            init = getattr(cls.__init__, "__code__", None)  # None when inherited from object
+            self.classes[target] = (cls, init is not None and "rules" in init.co_varnames[: init.co_argcount])
+        cls, takes_rules = self.classes[target]
+        return cls(rules) if takes_rules else cls()
@@ -1,13 +1,17 @@
 import shlex
 from pathlib import Path
+from typing import List, Tuple
 
 from whispers.log import debug
-from whispers.utils import escaped_chars, strip_string
+from whispers.utils import Pair, escaped_chars, strip_string
 
 
 class Shell:
+    STREAMING = True  # Reads files line by line
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
     def pairs(self, filepath: Path):
-        for cmdline in self.read_commands(filepath):
+        for lines, cmdline in self.read_commands(filepath):
             try:
                 cmd = shlex.split(cmdline)
             except Exception:
@@ -16,25 +20,44 @@ class Shell:
             if not cmd:
                 continue
             elif cmd[0].lower() == "curl":
-                yield from self.curl(cmd)
+                for key, value in self.curl(cmd):
+                    yield Pair(key, value, line=self.locate(lines, value))
             for item in cmd:
                 if "=" in item and len(item.split("=")) == 2:
                     key, value = item.split("=")
-                    yield key, value
+                    yield Pair(key, value, line=self.locate(lines, value))
+
+    @staticmethod
+    def locate(lines: List[Tuple[int, str]], value: str) -> int:
+        """
+        Returns the line of a (multi-line) command containing the value
+        """
+        if len(lines) > 1:
+            for line_number, line in lines:
+                if value in line:
+                    return line_number
+        return lines[0][0]
 
-    def read_commands(self, filepath: Path) -> str:
+    def read_commands(self, filepath: Path) -> Tuple[List[Tuple[int, str]], str]:
+        """
+        Yields commands with the numbered source lines they span
+        """
         ret = []
-        for line in filepath.open("r").readlines():
-            line = line.strip()
-            if line.startswith("#"):  # Comments
-                line = line.lstrip("#").strip()
-                line = line.translate(escaped_chars)
-            elif line.endswith("\\"):  # Multi-line commands
-                ret.append(line[:-1])
-                continue
-            ret.append(line)
-            yield " ".join(ret)
-            ret = []
+        lines = []
+        with filepath.open("r", encoding=self.encoding) as fh:
+            for line_number, line in enumerate(fh, 1):
+                lines.append((line_number, line))
+                line = line.strip()
+                if line.startswith("#"):  # Comments
+                    line = line.lstrip("#").strip()
+                    line = line.translate(escaped_chars)
+                elif line.endswith("\\"):  # Multi-line commands
+                    ret.append(line[:-1])
+                    continue
+                ret.append(line)
+                yield lines, " ".join(ret)
+                ret = []
+                lines = []
 
     def curl(self, cmd):
         indicators_combined = ["-u", "--user", "-U", "--proxy-user", "-E", "--cert"]
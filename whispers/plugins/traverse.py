@@ -1,37 +1,64 @@
 from whispers.plugins.uri import Uri
 from whispers.rules import WhisperRules
+from whispers.utils import Pair
+
+
+class PositionedDict(dict):
+    """Mapping that remembers the (line, column) of each value"""
+
+    __slots__ = ("positions",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.positions = {}
+
+
+class PositionedList(list):
+    """Sequence that remembers the (line, column) of each item"""
+
+    __slots__ = ("positions",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.positions = []
 
 
 class StructuredDocument:
+    encoding = None  # Encoding files are read with, set to the detected one by WhisperPlugins
+
     def __init__(self, rules: WhisperRules):
         self.breadcrumbs = []
         self.rules = rules
 
-    def traverse(self, code, key=None):
+    def traverse(self, code, key=None, line=0, column=0):
         """Recursively traverse YAML/JSON document"""
         if isinstance(code, dict):
+            positions = getattr(code, "positions", {})
             yield from self.cloudformation(code)
             for k, v in code.items():
+                k_line, k_column = positions.get(k, (0, 0))
                 self.breadcrumbs.append(k)
-                yield k, v, self.breadcrumbs
-                yield from self.traverse(v, key=k)
+                yield Pair(k, v, self.breadcrumbs, k_line, k_column)
+                yield from self.traverse(v, key=k, line=k_line, column=k_column)
                 self.breadcrumbs.pop()
             # Special key/value format
             elements = list(code.keys())
             if "key" in elements and "value" in elements:
-                yield code["key"], code["value"], self.breadcrumbs
+                yield Pair(code["key"], code["value"], self.breadcrumbs, *positions.get("value", (0, 0)))
         elif isinstance(code, list):
-            for item in code:
-                yield key, item, self.breadcrumbs
-                yield from self.traverse(item, key=key)
+            positions = getattr(code, "positions", [])
+            for idx, item in enumerate(code):
+                i_line, i_column = positions[idx] if idx < len(positions) else (0, 0)
+                yield Pair(key, item, self.breadcrumbs, i_line, i_column)
+                yield from self.traverse(item, key=key, line=i_line, column=i_column)
         elif isinstance(code, str):
             if "=" in code:
                 item = code.split("=", 1)
                 if len(item) == 2:
-                    yield item[0], item[1], self.breadcrumbs
+                    yield Pair(item[0], item[1], self.breadcrumbs, line, column)
             if self.rules.match("uri", code):
                 for k, v in Uri().pairs(code):
-                    yield k, v, self.breadcrumbs
+                    yield Pair(k, v, self.breadcrumbs, line, column)
 
     def cloudformation(self, code):
         """
@@ -46,4 +73,5 @@ class StructuredDocument:
         for key, values in code["Parameters"].items():
             if "Default" not in values:
                 continue  # No default value
-            yield key, values["Default"]
+            positions = getattr(values, "positions", {})
+            yield Pair(key, values["Default"], [], *positions.get("Default", (0, 0)))
@@ -5,58 +5,80 @@ from lxml import etree as ElementTree
 from whispers.log import debug
 from whispers.plugins.uri import Uri
 from whispers.rules import WhisperRules
+from whispers.utils import Pair
 
 
 class Xml:
+    STREAMING = True  # Reads files in bounded chunks
+    PARSES_BYTES = True  # lxml decodes files per their declaration
+
     def __init__(self, rules: WhisperRules):
         self.breadcrumbs = []
         self.rules = rules
 
     def pairs(self, filepath: Path):
-        def _traverse(tree):
-            """Traverse XML document"""
-            for event, element in tree:
-                if event == "end":
-                    self.breadcrumbs.pop()
-                    continue
+        """
+        Parse XML events while the file is read.
+        Elements are freed once their end tag is processed, so memory is
+        bounded by nesting depth rather than document size.
+        """
+        try:
+            events = ElementTree.iterparse(filepath.as_posix(), events=("start", "end"), recover=True)
+            yield from self.traverse(events)
+        except Exception as e:
+            debug(f"{type(e)} in {filepath}")
 
+    def traverse(self, events):
+        # <key>name</key><value>string</value> children seen per open element
+        siblings = []
+        for event, element in events:
+            if event == "start":
                 self.breadcrumbs.append(element.tag)
+                siblings.append({})
+                yield from self.attributes(element)
+                continue
 
-                # Format: <elem key="value">
-                for key, value in element.attrib.items():
-                    yield key, value, self.breadcrumbs
-
-                    # Format: <elem name="jdbc:mysql://host?k1=v1&amp;k2=v2">
-                    if self.rules.match("uri", value):
-                        for k, v in Uri().pairs(value):
-                            yield k, v, self.breadcrumbs
-
-                # Format: <key>value</key>
-                if not element.text:
-                    continue
-                yield element.tag, element.text, self.breadcrumbs
-
-                # Format: <elem>key=value</elem>
-                if "=" in element.text:
-                    item = element.text.split("=")
-                    if len(item) == 2:
-                        yield item[0], item[1], self.breadcrumbs
-
-                # Format: <key>name</key><value>string</value>
-                found_key = None
-                found_value = None
-                for item in element:
-                    if str(item.tag).lower() == "key":
-                        found_key = item.text
-                    elif str(item.tag).lower() == "value":
-                        found_value = item.text
-                if found_key and found_value:
-                    yield found_key, found_value, self.breadcrumbs
+            found = siblings.pop()
+            yield from self.text(element)
 
-        try:
-            parser = ElementTree.XMLParser(recover=True)
-            tree = ElementTree.parse(filepath.as_posix(), parser)
-            tree = ElementTree.iterwalk(tree, events=("start", "end"))
-            yield from _traverse(tree)
-        except Exception as e:
-            debug(f"{type(e)} in {filepath}")
+            # Format: <key>name</key><value>string</value>
+            if element.text and found.get("key") and found.get("value"):
+                yield Pair(found["key"], found["value"], self.breadcrumbs, found["value_line"])
+
+            self.breadcrumbs.pop()
+            tag = str(element.tag).lower()
+            if siblings and tag in ("key", "value"):
+                siblings[-1][tag] = element.text
+                siblings[-1][f"{tag}_line"] = element.sourceline or 0
+
+            # Free the element and any siblings already processed
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def attributes(self, element):
+        # The source line is where the start tag ends, not where an attribute
+        # is, so attributes are left for the text search to locate
+        line = 0
+
+        # Format: <elem key="value">
+        for key, value in element.attrib.items():
+            yield Pair(key, value, self.breadcrumbs, line)
+
+            # Format: <elem name="jdbc:mysql://host?k1=v1&amp;k2=v2">
+            if self.rules.match("uri", value):
+                for k, v in Uri().pairs(value):
+                    yield Pair(k, v, self.breadcrumbs, line)
+
+    def text(self, element):
+        # Format: <key>value</key>
+        if not element.text:
+            return
+        line = element.sourceline or 0
+        yield Pair(element.tag, element.text, self.breadcrumbs, line)
+
+        # Format: <elem>key=value</elem>
+        if "=" in element.text:
+            item = element.text.split("=")
+            if len(item) == 2:
+                yield Pair(item[0], item[1], self.breadcrumbs, line)
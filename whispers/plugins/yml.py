@@ -4,42 +4,87 @@ from pathlib import Path
 import yaml
 
 from whispers.log import debug
-from whispers.plugins.traverse import StructuredDocument
+from whispers.plugins.traverse import PositionedDict, PositionedList, StructuredDocument
+
+# Template blocks <% %> and {% %}, possibly over several lines
+BLOCK_REGEX = re.compile(r"[<{]%.*?%[}>]", flags=re.DOTALL)
+
+# Template blocks, or whole lines with a {{ placeholder }} after the line start
+TEMPLATE_REGEX = re.compile(
+    r"(?P<placeholder>^.+\{\{.*\}\}.*$)|(?P<block>[<{]%(?s:.*?)%[}>])",
+    flags=re.MULTILINE,
+)
+
+
+class YmlLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+    """
+    Safe YAML loader, backed by libyaml when available, that records the
+    source position of every mapping value and sequence item from the
+    parser node marks. Unknown tags such as !Ref are kept as text.
+    """
+
+    @staticmethod
+    def node_position(node) -> tuple:
+        mark = node.start_mark
+        return mark.line + 1, mark.column + 1
+
+    def construct_positioned_map(self, node):
+        data = PositionedDict()
+        yield data
+        data.update(self.construct_mapping(node))
+        for key_node, value_node in node.value:
+            try:
+                key = self.construct_object(key_node)
+                data.positions[key] = self.node_position(value_node)
+            except TypeError:
+                continue  # Unhashable key
+
+    def construct_positioned_seq(self, node):
+        data = PositionedList()
+        yield data
+        data.extend(self.construct_sequence(node))
+        data.positions = [self.node_position(item) for item in node.value]
+
+    def construct_tagged(self, tag_suffix, node):
+        """This is needed to parse IaC syntax"""
+        if isinstance(node, yaml.MappingNode):
+            return self.construct_mapping(node)
+        if isinstance(node, yaml.SequenceNode):
+            return self.construct_sequence(node)
+        ret = self.construct_scalar(node)
+        return f"{tag_suffix} {ret}"
+
+
+YmlLoader.add_constructor("tag:yaml.org,2002:map", YmlLoader.construct_positioned_map)
+YmlLoader.add_constructor("tag:yaml.org,2002:seq", YmlLoader.construct_positioned_seq)
+YmlLoader.add_multi_constructor("", YmlLoader.construct_tagged)
 
 
 class Yml(StructuredDocument):
     def pairs(self, filepath: Path):
-        def _constructor(loader, tag_suffix, node):
-            """This is needed to parse IaC syntax"""
-            if isinstance(node, yaml.MappingNode):
-                return loader.construct_mapping(node)
-            if isinstance(node, yaml.SequenceNode):
-                return loader.construct_sequence(node)
-            ret = loader.construct_scalar(node)
-            return f"{tag_suffix} {ret}"
+        document = self.preprocess(filepath.read_text(self.encoding))
+        try:
+            for code in yaml.load_all(document, Loader=YmlLoader):
+                yield from self.traverse(code)
+        except Exception as e:
+            debug(f"{type(e)} in {filepath}")
 
+    @staticmethod
+    def preprocess(document: str) -> str:
         """
-        Convert custom YAML to parsable YAML
-        - Skip ---
+        Convert custom YAML to parsable YAML in a single pass
         - Quote unquoted values such as {{ placeholder }}
         - Remove text between <% %> and {% %}
-        - Remove comments that start with #
+        Line breaks are kept so that node marks match the source lines.
         """
-        document = ""
-        for line in filepath.open("r").readlines():
-            if line.startswith("---"):
-                continue
-            if re.match(r".+(\[)?\{\{.*\}\}(\])?", line):
-                line = line.replace('"', "'")
-                line = line.replace("{{", '"{{').replace("}}", '}}"')
-            document += line
-        document = re.sub(r"[<{]%.*?%[}>]", "", document, flags=re.MULTILINE | re.DOTALL)
-        document = re.sub(r"^#.*$", "", document)
-
-        # Load converted YAML
-        yaml.add_multi_constructor("", _constructor, Loader=yaml.SafeLoader)
-        try:
-            code = yaml.safe_load(document)
-            yield from self.traverse(code)
-        except Exception as e:
-            debug(f"{type(e)} in {filepath}")
+        if "{{" not in document and "%" not in document:
+            return document  # Plain YAML
+        return TEMPLATE_REGEX.sub(Yml.replace_template, document)
+
+    @staticmethod
+    def replace_template(match) -> str:
+        text = match.group()
+        if match.lastgroup == "block":
+            return "\n" * text.count("\n")
+        text = text.replace('"', "'").replace("{{", '"{{').replace("}}", '}}"')
+        return BLOCK_REGEX.sub("", text)
@@ -0,0 +1,165 @@
+import json
+import re
+import sys
+from hashlib import md5
+from pathlib import Path
+from typing import Optional, TextIO, Tuple
+
+from whispers.__version__ import __version__
+from whispers.utils import Secret
+
+BUFFER_SIZE = 1 << 16
+
+
+def encode_secret(secret: Secret) -> Tuple[str, str]:
+    """
+    Returns the JSON encoding of a secret and its checksum.
+    The secret is serialised once: the checksum covers the same JSON
+    without the trailing column and rule ID.
+    """
+    data = json.dumps(secret._asdict())
+    identity = data[: data.rindex(', "column": ')] + "}"
+    return data, md5(identity.encode("utf-8")).hexdigest()
+
+
+class ReportWriter:
+    """
+    Writes secrets to an open text stream, one at a time.
+    Subclasses implement a format; nothing is kept in memory per secret.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, secret: Secret, data: str, checksum: str):
+        self.count += 1
+
+    def close(self):
+        self.stream.flush()
+
+
+class JsonLinesWriter(ReportWriter):
+    def write(self, secret: Secret, data: str, checksum: str):
+        super().write(secret, data, checksum)
+        self.stream.write(data + "\n")
+
+
+class YamlWriter(ReportWriter):
+    def write(self, secret: Secret, data: str, checksum: str):
+        super().write(secret, data, checksum)
+        self.stream.write(
+            f"{checksum}:\n"
+            f'  file: "{secret.file}"\n'
+            f'  line: "{secret.line}"\n'
+            f'  key: "{secret.key}"\n'
+            f'  value: "{secret.value}"\n'
+            f'  message: "{secret.message}"\n'
+            f'  severity: "{secret.severity}"\n'
+            "\n"
+        )
+
+
+class SarifWriter(ReportWriter):
+    """
+    Streams a SARIF 2.1.0 log. Results are written as they arrive and the
+    tool description, which lists the reported rules, is written last.
+    Results refer to rules by rule ID, or for secrets without one, such as
+    those cached by older versions, by a slug of the message.
+    Secret values are not included in the log.
+    """
+
+    levels = {"BLOCKER": "error", "CRITICAL": "error", "MAJOR": "warning", "MINOR": "note", "INFO": "note"}
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self.rules = {}  # Bounded by the number of rules
+        header = {"version": "2.1.0", "$schema": "https://json.schemastore.org/sarif-2.1.0.json"}
+        self.stream.write(json.dumps(header)[:-1] + ', "runs": [{"results": [')
+
+    @staticmethod
+    def rule_id(message: str) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", message.lower()).strip("-")
+
+    def write(self, secret: Secret, data: str, checksum: str):
+        rule_id = secret.rule_id or self.rule_id(secret.message)
+        self.rules.setdefault(rule_id, secret.message)
+        location = {"artifactLocation": {"uri": Path(secret.file).as_posix()}}
+        if secret.line:
+            location["region"] = {"startLine": secret.line}
+            if secret.column:
+                location["region"]["startColumn"] = secret.column
+        result = {
+            "ruleId": rule_id,
+            "level": self.levels.get(secret.severity, "note"),
+            "message": {"text": f"{secret.message} ({secret.key})" if secret.key else secret.message},
+            "locations": [{"physicalLocation": location}],
+            "partialFingerprints": {"whispers/v1": checksum},
+            "properties": {"severity": secret.severity},
+        }
+        self.stream.write((",\n" if self.count else "\n") + json.dumps(result))
+        super().write(secret, data, checksum)
+
+    def close(self):
+        driver = {
+            "name": "whispers",
+            "version": __version__,
+            "informationUri": "https://github.com/Skyscanner/whispers",
+            "rules": [
+                {"id": rule_id, "shortDescription": {"text": message}} for rule_id, message in self.rules.items()
+            ],
+        }
+        self.stream.write(f'\n], "tool": {json.dumps({"driver": driver})}}}]}}\n')
+        super().close()
+
+
+WRITERS = {"yml": YamlWriter, "jsonl": JsonLinesWriter, "sarif": SarifWriter}
+
+
+def output_format(output: Path, fmt: Optional[str] = None) -> str:
+    """Returns the requested format, or guesses it from the file extension"""
+    if fmt:
+        return fmt
+    suffix = output.suffix.lower()
+    if suffix == ".sarif":
+        return "sarif"
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "yml"
+
+
+class Report:
+    """
+    Fans secrets out to stdout (JSON lines) and an optional output file.
+    Each secret is encoded once, and the output file is opened once and
+    written through a buffer.
+    """
+
+    def __init__(self, output: Optional[Path] = None, fmt: Optional[str] = None, stdout: bool = True):
+        self.writers = []
+        self.files = []
+        self.count = 0
+        if stdout:
+            self.writers.append(JsonLinesWriter(sys.stdout))
+        if output:
+            stream = Path(output).open("w", encoding="utf-8", buffering=BUFFER_SIZE)
+            self.files.append(stream)
+            self.writers.append(WRITERS[output_format(Path(output), fmt)](stream))
+
+    def write(self, secret: Secret):
+        data, checksum = encode_secret(secret)
+        self.count += 1
+        for writer in self.writers:
+            writer.write(secret, data, checksum)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+        for stream in self.files:
+            stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
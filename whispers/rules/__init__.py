@@ -1,12 +1,16 @@
 import re
-import string
-from base64 import b64decode
+from functools import partial
 from pathlib import Path
-from typing import List
+from time import perf_counter
+from typing import Iterator, List, Set, Union
 
-from luhn import verify as luhn_verify
+from whispers.cache import load_bundle
+from whispers.rules.analysis import CHARSETS, PairMatrix, TextAnalysis, decode_base64, is_printable
+from whispers.rules.prefilter import LazyRegex, RegexSet
+from whispers.utils import LineIndex, Secret, is_similar, load_yaml_from_file
 
-from whispers.utils import Secret, find_line_number, load_yaml_from_file, similar_strings
+# Checks that read a shared TextAnalysis rather than the key or value itself
+ANALYSED_CHECKS = ("charset", "isBase64", "isAscii", "isUri", "minEntropy")
 
 
 class WhisperRules:
@@ -19,6 +23,18 @@ class WhisperRules:
         """
         self.rules = {}
         self.ruleslist = ruleslist.split(",")
+        self.checks = [
+            ("minlen", self.check_minlen),
+            ("regex", self.check_regex),
+            ("charset", self.check_charset),
+            ("isBase64", self.check_isBase64),
+            ("isAscii", self.check_isAscii),
+            ("isUri", self.check_isUri),
+            ("minEntropy", self.check_minEntropy),
+            ("isLuhn", self.check_isLuhn),
+        ]
+        self.index = None  # Built on first check
+        self.stats = None  # Optional WhisperStats
         self.load_rules(rulespath)
 
     def load_rules(self, rulespath: str = ""):
@@ -27,23 +43,34 @@ class WhisperRules:
         else:
             rulespath = Path(rulespath)
         if rulespath.is_dir():
-            for rulefile in rulespath.glob("*.yml"):
-                self.load_rules_from_file(rulefile)
+            self.load_rules_from_files(list(rulespath.glob("*.yml")))
         elif rulespath.is_file():
-            self.load_rules_from_file(rulespath)
+            self.load_rules_from_files([rulespath])
         else:
             raise TypeError("Rules must be loaded from a file or directory")
 
     def load_rules_from_file(self, rulefile: Path):
-        if not rulefile.exists():
-            raise FileNotFoundError(f"Rule file {rulefile.as_posix()} not found")
-        rules = load_yaml_from_file(rulefile)
-        for rule_id, rule in rules.items():
-            self.load_rule(rule_id, rule)
+        self.load_rules_from_files([rulefile])
+
+    def load_rules_from_files(self, rulefiles: list):
+        """
+        Loads rule files in order, parsing their YAML only when they changed.
+        Their regexes are validated when parsed, and compiled when first used.
+        """
+        for rulefile in rulefiles:
+            if not rulefile.exists():
+                raise FileNotFoundError(f"Rule file {rulefile.as_posix()} not found")
+        bundle = load_bundle(
+            rulefiles, lambda: [self.validate_rules(load_yaml_from_file(rulefile)) for rulefile in rulefiles]
+        )
+        for rules in bundle:
+            for rule_id, rule in rules.items():
+                self.load_rule(rule_id, rule)
 
     def load_rules_from_dict(self, custom_rules: dict):
         if not custom_rules:
             return
+        self.validate_rules(custom_rules)
         for rule_id, rule in custom_rules.items():
             self.load_rule(rule_id, rule)
 
@@ -51,6 +78,16 @@ class WhisperRules:
         if rule_id in self.rules:
             raise IndexError(f"Duplicated rule {rule_id}, {self.rules[rule_id]}")
         self.rules[rule_id] = self.parse_rule(rule_id, rule)
+        self.index = None  # Rebuild prefilter
+
+    @staticmethod
+    def validate_rules(rules: dict) -> dict:
+        """Compiles the regexes of rules once, so that invalid ones fail to load rather than during a scan"""
+        for rule in (rules or {}).values():
+            for idx in ("key", "value"):
+                if isinstance(rule.get(idx), dict) and isinstance(rule[idx].get("regex"), str):
+                    re.compile(rule[idx]["regex"], flags=re.IGNORECASE if rule[idx].get("ignorecase") else 0)
+        return rules
 
     @staticmethod
     def parse_rule(rule_id: str, rule: dict) -> dict:
@@ -65,7 +102,8 @@ class WhisperRules:
             flags = 0
             if rule[idx]["ignorecase"]:
                 flags = re.IGNORECASE
-            rule[idx]["regex"] = re.compile(rule[idx]["regex"], flags=flags)
+            rule[idx]["regex"] = LazyRegex(rule[idx]["regex"], flags=flags)
+        rule["id"] = rule_id
         return rule
 
     def match(self, rule_id: str, text: str):
@@ -76,61 +114,177 @@ class WhisperRules:
                     return True
         return False
 
-    def check(self, key: str, value: str, filepath: Path, foundlines: List[int]) -> Secret:
-        matrix = {"key": key, "value": value}
-        checks = {
-            "minlen": self.check_minlen,
-            "regex": self.check_regex,
-            "isBase64": self.check_isBase64,
-            "isAscii": self.check_isAscii,
-            "isUri": self.check_isUri,
-            "isLuhn": self.check_isLuhn,
-        }
-        if not filepath.is_file():
-            return  # Only check files
+    def value_matches(self, value: str) -> set:
+        """
+        Returns IDs of the reported rules without a key regex whose value
+        regex matches value. Their value regexes are matched at once, and the result is kept
+        for the latest value, so that every check of a pair shares it.
+        """
+        if self.index is None:
+            self.build_index()
+        if value != self.last_value[0]:
+            rule_ids = self.index["value_ids"]
+            self.last_value = (value, {rule_ids[ident] for ident in self.index["values"].match(value)})
+        return self.last_value[1]
+
+    def check_value_regex(self, rule_id: str, rule: dict, mkey: str, mvalue: str) -> bool:
+        """check_regex() for values, answered by value_matches()"""
+        if not isinstance(mvalue, str):
+            return False  # Not text
+        return rule_id in self.value_matches(mvalue)
+
+    def is_reported(self, rule_id: str, rule: dict) -> bool:
+        if self.ruleslist != ["all"]:
+            return rule_id in self.ruleslist  # Only report configured rules
+        return rule["severity"] != "INFO"  # Don't report INFO on all rules
+
+    def build_index(self):
+        """
+        Builds the prefilter over reported rules.
+        Each rule gets a plan of (check function, key or value, matrix slot)
+        steps, in the order they are evaluated. Steps read the key or value
+        from their slot, or its shared TextAnalysis. Key regexes go into a RegexSet so that a
+        single lookup returns the rules a given key can match; rules without
+        a key regex are candidates for every key, and their value regexes go
+        into another RegexSet, matched once per value. Value regexes behind a
+        key regex stay separate, as they only run for the few matching keys.
+        """
+        self.index = {"plans": [], "unfiltered": [], "keys": RegexSet(), "values": RegexSet(), "value_ids": []}
+        self.last_value = (None, set())
         for rule_id, rule in self.rules.items():
-            rule_matched = True
-            if self.ruleslist != ["all"]:
-                if rule_id not in self.ruleslist:
-                    continue  # Only report configured rules
-            else:
-                if rule["severity"] == "INFO":
-                    continue  # Don't report INFO on all rules
-            if "similar" in rule:
-                if self.check_similar(rule, key, value):
-                    rule_matched = False
-            for check_idx, check_function in checks.items():
-                if not rule_matched:
-                    break
-                for mkey, mvalue in matrix.items():
-                    if mkey not in rule:
-                        continue
-                    if check_idx not in rule[mkey]:
-                        continue
-                    if not check_function(rule, mkey, mvalue):
-                        rule_matched = False
-                        break
-            if not rule_matched:
+            if not self.is_reported(rule_id, rule):
                 continue
-            yield Secret(
-                filepath.as_posix(),
-                find_line_number(filepath, key, value, foundlines),
-                key,
-                value,
-                self.rules[rule_id]["message"],
-                self.rules[rule_id]["severity"],
-            )
-
-    def check_isBase64(self, rule, mkey, mvalue):
-        return rule[mkey]["isBase64"] == self.match("base64", mvalue)
-
-    def check_isAscii(self, rule, mkey, mvalue):
-        mvalue = self.decode_if_base64(rule, mkey, mvalue)
-        return self.is_ascii(mvalue)
-
-    def check_isUri(self, rule, mkey, mvalue):
-        mvalue = self.decode_if_base64(rule, mkey, mvalue)
-        return rule[mkey]["isUri"] == self.match("uri", mvalue)
+            if "regex" in rule.get("value", {}) and "regex" not in rule.get("key", {}):
+                self.index["values"].add(len(self.index["value_ids"]), rule["value"]["regex"])
+                self.index["value_ids"].append(rule_id)
+            plan = []
+            for check_idx, check_function in self.checks:
+                for mkey in ("key", "value"):
+                    if mkey in rule and check_idx in rule[mkey]:
+                        if check_idx == "regex" and mkey == "value" and rule_id in self.index["value_ids"]:
+                            plan.append((partial(self.check_value_regex, rule_id), mkey, mkey))
+                        elif check_idx in ANALYSED_CHECKS:
+                            plan.append((check_function, mkey, ("analysis", mkey)))
+                        else:
+                            plan.append((check_function, mkey, mkey))
+            ident = len(self.index["plans"])
+            self.index["plans"].append((rule_id, rule, plan))
+            if "key" in rule and "regex" in rule["key"]:
+                self.index["keys"].add(ident, rule["key"]["regex"])
+            else:
+                self.index["unfiltered"].append(ident)
+        self.index["keys"].compile()
+        self.index["values"].compile()
+
+    def candidates(self, key: str) -> list:
+        """Returns plans of rules whose key regex can match the given key"""
+        if self.index is None:
+            self.build_index()
+        idents = self.index["unfiltered"] + self.index["keys"].match(key)
+        plans = self.index["plans"]
+        return [plans[ident] for ident in sorted(idents)]
+
+    def check(
+        self,
+        key: str,
+        value: str,
+        filepath: Path,
+        lines: Union[LineIndex, Set[int], List[int]],
+        line: int = 0,
+        column: int = 0,
+    ) -> Secret:
+        """
+        Yields a secret for every rule matching the given pair.
+        Without a known line, it is looked up in the file text.
+        Reported lines are tracked by lines, or by a set or list of them.
+        """
+        if not filepath.is_file():
+            return  # Only check files
+        if not isinstance(lines, LineIndex):
+            lines = LineIndex(filepath, lines)
+        yield from self.report(self.matching(key, value), key, value, filepath, lines, line, column)
+
+    def matching(self, key: str, value: str) -> List[dict]:
+        """Returns the rules matching the given pair, which only depends on the pair"""
+        if self.stats:
+            return self.matching_stats(key, value)
+        matrix = PairMatrix(key, value, self.match)
+        return [rule for _, rule, plan in self.candidates(key) if self.matches(rule, plan, key, value, matrix)]
+
+    def matching_stats(self, key: str, value: str) -> List[dict]:
+        """matching() that records evaluations, matches and time per rule"""
+        ret = []
+        matrix = PairMatrix(key, value, self.match)
+        for rule_id, rule, plan in self.candidates(key):
+            start = perf_counter()
+            matched = self.matches(rule, plan, key, value, matrix)
+            entry = self.stats.rule(rule_id)
+            entry["evaluations"] += 1
+            entry["matches"] += matched
+            elapsed = perf_counter() - start
+            entry["seconds"] += elapsed
+            self.stats.add_time("rules", elapsed)
+            if matched:
+                ret.append(rule)
+        return ret
+
+    def report(
+        self, rules: List[dict], key: str, value: str, filepath: Path, lines: LineIndex, line: int = 0, column: int = 0
+    ) -> Iterator[Secret]:
+        """Yields a secret for each of the rules matching a pair, located in the file"""
+        for rule in rules:
+            start = perf_counter() if self.stats else 0
+            found = self.line_number(key, value, lines, line)
+            if self.stats:
+                self.stats.add_time("lines", perf_counter() - start)
+            yield Secret(filepath.as_posix(), found, key, value, rule["message"], rule["severity"], column, rule["id"])
+
+    def matches(self, rule: dict, plan: list, key: str, value: str, matrix: dict) -> bool:
+        """Evaluates the plan of a rule against a pair"""
+        if "similar" in rule:
+            if self.check_similar(rule, key, value):
+                return False
+        for check_function, mkey, slot in plan:
+            if not check_function(rule, mkey, matrix[slot]):
+                return False
+        return True
+
+    @staticmethod
+    def line_number(key: str, value: str, lines: LineIndex, line: int = 0) -> int:
+        """
+        Returns the known line, or searches the file text as a fallback
+        """
+        if not line:
+            return lines.find(key, value)
+        lines.mark(line)  # Not a candidate for text search anymore
+        return line
+
+    @staticmethod
+    def check_isBase64(rule, mkey, analysis: TextAnalysis):
+        return rule[mkey]["isBase64"] == analysis.is_base64()
+
+    @staticmethod
+    def check_isAscii(rule, mkey, analysis: TextAnalysis):
+        return analysis.is_printable(bool(rule[mkey].get("isBase64")))
+
+    @staticmethod
+    def check_isUri(rule, mkey, analysis: TextAnalysis):
+        return rule[mkey]["isUri"] == analysis.is_uri(bool(rule[mkey].get("isBase64")))
+
+    @staticmethod
+    def check_charset(rule, mkey, analysis: TextAnalysis):
+        charset = rule[mkey]["charset"]
+        if charset not in CHARSETS:
+            return False  # Unknown character set
+        return analysis.in_charset(charset)
+
+    @staticmethod
+    def check_minEntropy(rule, mkey, analysis: TextAnalysis):
+        """Entropy is in bits per character, of the decoded value with isBase64"""
+        minentropy = rule[mkey]["minEntropy"]
+        if not isinstance(minentropy, (int, float)):
+            return False  # Not numeric
+        return analysis.entropy(bool(rule[mkey].get("isBase64"))) >= minentropy
 
     @staticmethod
     def check_minlen(rule, mkey, mvalue):
@@ -166,39 +320,27 @@ class WhisperRules:
         greater than the rule similarity.
         """
         if "similar" not in rule:
-            return similar_strings(key, value) >= 0.3
+            return is_similar(key, value, 0.3)
         similar = rule["similar"]
         if not isinstance(similar, float):
             return False  # Not float
-        return similar_strings(key, value) >= similar
+        return is_similar(key, value, similar)
 
     @staticmethod
     def check_isLuhn(rule, key, value):
         if not value.isnumeric():
             return False
-        return luhn_verify(value)
+        from luhn import verify
+
+        return verify(value)
 
     @staticmethod
     def decode_if_base64(rule, mkey, mvalue):
         if "isBase64" in rule[mkey]:
             if rule[mkey]["isBase64"]:
-                decoded = b64decode(mvalue)
-                try:
-                    return decoded.decode("utf-8")
-                except UnicodeDecodeError:
-                    return decoded
+                return decode_base64(mvalue)
         return mvalue
 
     @staticmethod
     def is_ascii(data):
-        if isinstance(data, bytes):
-            try:
-                data = data.decode("utf-8")
-            except Exception:
-                return False
-        if not isinstance(data, str):
-            return False
-        for ch in data:
-            if ch not in string.printable:
-                return False
-        return True
+        return is_printable(data)
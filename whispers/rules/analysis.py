@@ -0,0 +1,113 @@
+import re
+import string
+from base64 import b64decode
+from collections import Counter
+from math import log2
+from typing import Callable, Union
+
+PRINTABLE_REGEX = re.compile(f"[{re.escape(string.printable)}]*")
+
+# Character sets a value can be required to consist of
+CHARSETS = {
+    "alphanumeric": re.compile(r"[A-Za-z0-9]*"),
+    "base64": re.compile(r"[A-Za-z0-9+/]*={0,2}"),
+    "base64url": re.compile(r"[A-Za-z0-9_\-]*={0,2}"),
+    "hex": re.compile(r"[A-Fa-f0-9]*"),
+}
+
+
+def decode_base64(text: str) -> Union[str, bytes]:
+    """Decodes base64 text, into text when it is UTF-8 and bytes otherwise"""
+    decoded = b64decode(text)
+    try:
+        return decoded.decode("utf-8")
+    except UnicodeDecodeError:
+        return decoded
+
+
+def is_printable(data) -> bool:
+    """Checks that data is text, or UTF-8 bytes, of printable ASCII characters only"""
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("utf-8")
+        except Exception:
+            return False
+    if not isinstance(data, str):
+        return False
+    return PRINTABLE_REGEX.fullmatch(data) is not None
+
+
+def shannon_entropy(data: Union[str, bytes]) -> float:
+    """Returns the Shannon entropy of data in bits per character"""
+    if not data:
+        return 0.0
+    size = len(data)
+    return log2(size) - sum(count * log2(count) for count in Counter(data).values()) / size
+
+
+class TextAnalysis:
+    """
+    Properties of a key or value that rule checks share: whether it is
+    base64, its decoded form, whether either form is printable or a URI,
+    its entropy and character sets.
+    Each is worked out on first use, then kept.
+    """
+
+    def __init__(self, text: str, match: Callable[[str, str], bool]):
+        self.text = text
+        self.match = match  # WhisperRules.match
+        self.found = {}
+
+    def is_base64(self) -> bool:
+        if "base64" not in self.found:
+            self.found["base64"] = self.match("base64", self.text)
+        return self.found["base64"]
+
+    def decoded(self, base64: bool) -> Union[str, bytes]:
+        """Returns the text, or with base64 its decoded form"""
+        if not base64:
+            return self.text
+        if "decoded" not in self.found:
+            self.found["decoded"] = decode_base64(self.text)
+        return self.found["decoded"]
+
+    def is_printable(self, base64: bool) -> bool:
+        name = ("printable", base64)
+        if name not in self.found:
+            self.found[name] = is_printable(self.decoded(base64))
+        return self.found[name]
+
+    def is_uri(self, base64: bool) -> bool:
+        name = ("uri", base64)
+        if name not in self.found:
+            self.found[name] = self.match("uri", self.decoded(base64))
+        return self.found[name]
+
+    def entropy(self, base64: bool) -> float:
+        name = ("entropy", base64)
+        if name not in self.found:
+            self.found[name] = shannon_entropy(self.decoded(base64))
+        return self.found[name]
+
+    def in_charset(self, charset: str) -> bool:
+        name = ("charset", charset)
+        if name not in self.found:
+            self.found[name] = CHARSETS[charset].fullmatch(self.text) is not None
+        return self.found[name]
+
+
+class PairMatrix(dict):
+    """
+    Key and value of a pair under "key" and "value", and their analyses
+    under ("analysis", "key") and ("analysis", "value"), made on first lookup.
+    """
+
+    def __init__(self, key: str, value: str, match: Callable[[str, str], bool]):
+        self.match = match
+        self["key"] = key
+        self["value"] = value
+
+    def __missing__(self, slot: tuple) -> TextAnalysis:
+        _, mkey = slot
+        analysis = self[slot] = TextAnalysis(self[mkey], self.match)
+        return analysis
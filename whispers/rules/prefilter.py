@@ -0,0 +1,134 @@
+import re
+from typing import Dict, List, Match, Optional, Pattern, Tuple
+
+# Regex that is nothing but an anchored literal, e.g. ^file$
+LITERAL_REGEX = re.compile(r"\^([A-Za-z0-9_\- ]+)\$")
+
+# Constructs that change meaning once a regex is embedded in a larger one
+UNCOMBINABLE_REGEX = re.compile(r"\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)|\(\?\(\d")
+
+# Named group in a regex, e.g. (?P<name>...)
+GROUP_NAME_REGEX = re.compile(r"\(\?P<(\w+)>")
+
+
+class LazyRegex:
+    """
+    Regex compiled on its first match, so that loading rules which are never
+    evaluated costs nothing. Has the pattern and flags of re.Pattern.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+
+    def match(self, *args) -> Optional[Match]:
+        self.match = re.compile(self.pattern, self.flags).match  # Later calls skip this method
+        return self.match(*args)
+
+
+class RegexSet:
+    """
+    Matches text against many regexes in one go and reports all that match.
+    Anchored literals are looked up in a dict, other regexes are combined into
+    a single regex of optional lookaheads with one named group per entry.
+    Regexes that cannot be combined, or that repeat a group name of another
+    regex, are matched one by one.
+    """
+
+    def __init__(self):
+        self.literals: Dict[str, List[int]] = {}
+        self.literals_nocase: Dict[str, List[int]] = {}
+        self.parts: List[Tuple[int, str, Pattern]] = []
+        self.fallback: List[Tuple[int, Pattern]] = []
+        self.combined = None
+        self.groups: List[Tuple[int, int]] = []
+        self.prefix = "r"  # Of the group names around entries
+
+    def add(self, ident: int, regex: Pattern):
+        """Adds a compiled regex under an integer identifier"""
+        nocase = bool(regex.flags & re.IGNORECASE)
+        if regex.flags & ~(re.IGNORECASE | re.UNICODE):
+            self.fallback.append((ident, regex))
+            return
+        literal = LITERAL_REGEX.fullmatch(regex.pattern)
+        if literal:
+            if nocase:
+                self.literals_nocase.setdefault(literal.group(1).lower(), []).append(ident)
+            else:
+                self.literals.setdefault(literal.group(1), []).append(ident)
+            return
+        if UNCOMBINABLE_REGEX.search(regex.pattern):
+            self.fallback.append((ident, regex))
+            return
+        self.parts.append((ident, f"(?{'i' if nocase else ''}:{regex.pattern})", regex))
+
+    def compile(self):
+        """Builds the combined regex, call after all regexes were added"""
+        self.combined = None
+        self.groups = []
+        self.split_conflicting()
+        if not self.parts:
+            return
+        try:
+            self.combined = re.compile(self.combine())
+        except re.error:
+            self.split_invalid()
+            try:
+                self.combined = re.compile(self.combine()) if self.parts else None
+            except re.error:
+                self.split_all()
+        if self.combined:
+            self.groups = [(self.combined.groupindex[f"{self.prefix}{ident}"] - 1, ident) for ident, _, _ in self.parts]
+
+    def combine(self) -> str:
+        return "".join(f"(?:(?=(?P<{self.prefix}{ident}>{part})))?" for ident, part, _ in self.parts)
+
+    def split_conflicting(self):
+        """
+        Moves parts that name a group like an earlier part to the regexes
+        matched one by one, and picks a group name prefix no part uses
+        """
+        parts = []
+        names = set()
+        for ident, part, regex in self.parts:
+            found = set(GROUP_NAME_REGEX.findall(part))
+            if found & names:
+                self.fallback.append((ident, regex))
+            else:
+                names |= found
+                parts.append((ident, part, regex))
+        self.parts = parts
+        self.prefix = "r"
+        while any(re.fullmatch(f"{self.prefix}[0-9]+", name) for name in names):
+            self.prefix += "_"
+
+    def split_invalid(self):
+        """Moves parts that do not compile on their own to the regexes matched one by one"""
+        parts = []
+        for ident, part, regex in self.parts:
+            try:
+                re.compile(part)
+                parts.append((ident, part, regex))
+            except re.error:
+                self.fallback.append((ident, regex))
+        self.parts = parts
+
+    def split_all(self):
+        """Moves all parts to the regexes matched one by one"""
+        self.fallback += [(ident, regex) for ident, _, regex in self.parts]
+        self.parts = []
+
+    def match(self, text: str) -> List[int]:
+        """Returns identifiers of all regexes matching the beginning of text"""
+        ret = []
+        if self.literals:
+            ret += self.literals.get(text, [])
+        if self.literals_nocase:
+            ret += self.literals_nocase.get(text.lower(), [])
+        if self.combined:
+            groups = self.combined.match(text).groups()
+            ret += [ident for group, ident in self.groups if groups[group] is not None]
+        for ident, regex in self.fallback:
+            if regex.match(text):
+                ret.append(ident)
+        return ret
@@ -1,19 +1,24 @@
 import re
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
+from whispers.cache import VerdictCache
 from whispers.plugins import WhisperPlugins
 from whispers.rules import WhisperRules
-from whispers.utils import Secret, simple_string, strip_string
+from whispers.utils import LineIndex, Pair, Secret, simple_string, strip_string
 
 
 class WhisperSecrets:
     def __init__(self, args):
         self.exclude = args.config["exclude"]
+        self.limits = args.config.get("limits")
         self.breadcrumbs = []  # Tracks key path
-        self.foundlines = {}  # Avoids dup line reports
+        self.foundlines = {}  # Line index per file, avoids dup line reports
         self.rules = WhisperRules(ruleslist=args.rules)
         self.rules.load_rules_from_dict(args.config["rules"])
+        self.stats = args.stats  # Optional WhisperStats
+        self.rules.stats = self.stats
+        self.verdicts = VerdictCache(self.evaluate)  # Pairs repeated across files
 
     def is_static(self, key: str, value: str) -> bool:
         """
@@ -60,6 +65,12 @@ class WhisperSecrets:
                 return False  # Exclude values
         return True  # Hardcoded static value
 
+    def evaluate(self, key: str, value: str) -> list:
+        """Returns the rules matching a pair, none when its value is not static"""
+        if not self.is_static(key, value):
+            return []
+        return self.rules.matching(key, value)
+
     def is_excluded(self, breadcrumbs: list) -> bool:
         for crumb in breadcrumbs:
             for ex in self.exclude["keys"]:
@@ -67,7 +78,20 @@ class WhisperSecrets:
                     return True
         return False
 
-    def detect_secrets(self, key: str, value: str, filepath: Path, breadcrumbs: list = []) -> Optional[Secret]:
+    def detect_secrets(
+        self,
+        key: str,
+        value: str,
+        filepath: Path,
+        breadcrumbs: list = [],
+        line: int = 0,
+        column: int = 0,
+        cached: bool = True,
+    ) -> Optional[Secret]:
+        """
+        Yields secrets for a pair. Its verdict is cached for repeats in other
+        files unless cached is False, for pairs that are unique per file.
+        """
         if not key:
             key = ""
         else:
@@ -78,22 +102,45 @@ class WhisperSecrets:
             value = str(value)
         else:
             return None  # Neither text nor digits
-        if not self.is_static(key, value):
-            return None  # Not static
+        rules = self.verdicts.get(key, value) if cached else self.evaluate(key, value)
+        if not rules:
+            return None  # Not static, or no rule matches
         if self.is_excluded(breadcrumbs):
             return None  # Excluded via config
-        yield from self.rules.check(key, value, filepath, self.foundlines[filepath.as_posix()])
+        yield from self.rules.report(rules, key, value, filepath, self.foundlines[filepath.as_posix()], line, column)
 
     def scan(self, filename: str) -> Optional[Secret]:
-        plugin = WhisperPlugins(filename, self.rules)
-        if not plugin:
-            return None
-        self.foundlines[plugin.filepath.as_posix()] = []
-        yield from self.detect_secrets("file", plugin.filepath.as_posix(), plugin.filepath)
-        for ret in plugin.pairs():
-            if len(ret) == 2:
-                key, value = ret
-                yield from self.detect_secrets(key, value, plugin.filepath)
-            elif len(ret) == 3:
-                key, value, breadcrumbs = ret
-                yield from self.detect_secrets(key, value, plugin.filepath, breadcrumbs=breadcrumbs)
+        plugin = WhisperPlugins(filename, self.rules, self.limits)
+        if not plugin.filepath.is_file():
+            return None  # Only check files
+        if plugin.skipped and self.stats:
+            self.stats.count(f"skipped.{plugin.skipped}")
+        self.foundlines[plugin.filepath.as_posix()] = LineIndex(plugin.filepath)
+        hits, misses = self.verdicts.hits, self.verdicts.misses
+        pairs = plugin.pairs()
+        if self.stats:
+            pairs = self.stats_pairs(plugin, pairs)
+        try:
+            yield from self.detect_secrets("file", plugin.filepath.as_posix(), plugin.filepath, cached=False)
+            for pair in pairs:
+                if not isinstance(pair, Pair):
+                    pair = Pair(*pair)  # Plain (key, value[, breadcrumbs]) tuple
+                yield from self.detect_secrets(
+                    pair.key, pair.value, plugin.filepath, pair.breadcrumbs, pair.line, pair.column
+                )
+        finally:
+            del self.foundlines[plugin.filepath.as_posix()]  # File done, free its index
+            if self.stats:
+                self.stats.count("verdicts.hits", self.verdicts.hits - hits)
+                self.stats.count("verdicts.misses", self.verdicts.misses - misses)
+
+    def stats_pairs(self, plugin: WhisperPlugins, pairs: Iterator) -> Iterator:
+        """Counts the file and times its plugin while pairs are consumed"""
+        self.stats.count("files")
+        entry = self.stats.plugin(type(plugin.plugin).__name__ if plugin.plugin else "unsupported")
+        entry["files"] += 1
+        try:
+            entry["bytes"] += plugin.filepath.stat().st_size
+        except OSError:
+            pass
+        return self.stats.timed(pairs, "parse", entry)
@@ -0,0 +1,104 @@
+import json
+from time import perf_counter
+from typing import Iterable, Iterator, Optional
+
+PLUGIN_FIELDS = ("files", "bytes", "pairs", "seconds")
+RULE_FIELDS = ("evaluations", "matches", "seconds")
+
+
+class WhisperStats:
+    """
+    Scan counters and wall times per stage, plugin and rule.
+    Instrumented code only runs when a stats object is configured, so a scan
+    without --stats pays one attribute test per file, pair and rule check.
+    Plain dicts keep it picklable for worker processes.
+    """
+
+    def __init__(self):
+        self.counters = {}  # name: count
+        self.stages = {}  # stage: seconds
+        self.plugins = {}  # plugin: PLUGIN_FIELDS
+        self.rules = {}  # rule ID: RULE_FIELDS
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def plugin(self, name: str) -> dict:
+        if name not in self.plugins:
+            self.plugins[name] = dict.fromkeys(PLUGIN_FIELDS, 0)
+        return self.plugins[name]
+
+    def rule(self, rule_id: str) -> dict:
+        if rule_id not in self.rules:
+            self.rules[rule_id] = dict.fromkeys(RULE_FIELDS, 0)
+        return self.rules[rule_id]
+
+    def timed(self, iterable: Iterable, stage: str, entry: Optional[dict] = None) -> Iterator:
+        """
+        Yields from iterable, adding the time spent producing items to a stage.
+        With a plugin entry, items and time are also added to it.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_timed(stage, entry, perf_counter() - start, 0)
+                return
+            self.add_timed(stage, entry, perf_counter() - start, 1)
+            yield item
+
+    def add_timed(self, stage: str, entry: Optional[dict], seconds: float, items: int):
+        self.add_time(stage, seconds)
+        if entry is not None:
+            entry["seconds"] += seconds
+            entry["pairs"] += items
+
+    def to_dict(self) -> dict:
+        return {"counters": self.counters, "stages": self.stages, "plugins": self.plugins, "rules": self.rules}
+
+    def pop(self) -> dict:
+        """Returns collected stats and starts over, used to ship worker stats"""
+        ret = self.to_dict()
+        self.__init__()
+        return ret
+
+    def merge(self, data: dict):
+        """Adds stats collected elsewhere, e.g. in a worker process"""
+        for name, value in data["counters"].items():
+            self.count(name, value)
+        for stage, seconds in data["stages"].items():
+            self.add_time(stage, seconds)
+        for name, values in data["plugins"].items():
+            entry = self.plugin(name)
+            for field in PLUGIN_FIELDS:
+                entry[field] += values[field]
+        for rule_id, values in data["rules"].items():
+            entry = self.rule(rule_id)
+            for field in RULE_FIELDS:
+                entry[field] += values[field]
+
+    def dump(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def summary(self) -> str:
+        """Human readable tables, slowest first"""
+        ret = ["counters:"]
+        for name, value in sorted(self.counters.items()):
+            ret.append(f"  {name:24} {value:>12}")
+        ret.append("stages:")
+        for stage, seconds in sorted(self.stages.items(), key=lambda item: -item[1]):
+            ret.append(f"  {stage:24} {seconds:>11.3f}s")
+        ret.append(f"plugins:{'files':>21} {'bytes':>12} {'pairs':>10} {'seconds':>10}")
+        for name, entry in sorted(self.plugins.items(), key=lambda item: -item[1]["seconds"]):
+            ret.append(
+                f"  {name:20} {entry['files']:>7} {entry['bytes']:>12} {entry['pairs']:>10} {entry['seconds']:>10.3f}"
+            )
+        ret.append(f"rules:{'evaluations':>29} {'matches':>10} {'seconds':>10}")
+        for rule_id, entry in sorted(self.rules.items(), key=lambda item: -item[1]["seconds"]):
+            ret.append(f"  {rule_id:24} {entry['evaluations']:>10} {entry['matches']:>10} {entry['seconds']:>10.3f}")
+        return "\n".join(ret) + "\n"
@@ -1,14 +1,31 @@
 import json
 import re
+from bisect import bisect_right
 from collections import namedtuple
+from functools import lru_cache
 from hashlib import md5
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
-from Levenshtein import ratio
-from yaml import safe_load
+SIMILAR_CACHE_SIZE = 1 << 12  # Normalised keys and values kept by similar_form()
+WORD_REGEX = re.compile(r"\w+")
 
-Secret = namedtuple("Secret", ["file", "line", "key", "value", "message", "severity"])
+Secret = namedtuple(
+    "Secret", ["file", "line", "key", "value", "message", "severity", "column", "rule_id"], defaults=(0, "")
+)
+
+
+class Pair(NamedTuple):
+    """
+    Key-value pair reported by a plugin.
+    Line and column are 1-based source locations, 0 when unknown.
+    """
+
+    key: str
+    value: str
+    breadcrumbs: list = []
+    line: int = 0
+    column: int = 0
 
 
 escaped_chars = str.maketrans({"'": r"\'", '"': r"\""})
@@ -42,13 +59,37 @@ def simple_string(value: str) -> str:
     return value
 
 
+@lru_cache(maxsize=SIMILAR_CACHE_SIZE)
+def similar_form(value: str) -> str:
+    """
+    Returns the form of a value that similarity is computed on.
+    Memoised, as the same keys and values are compared for many rules.
+    """
+    return simple_string(value).replace("_", "")
+
+
 def similar_strings(a: str, b: str) -> float:
     """
     Returns similarity coefficient between two strings
     """
-    a = simple_string(a).replace("_", "")
-    b = simple_string(b).replace("_", "")
-    return ratio(a, b)
+    from Levenshtein import ratio
+
+    return ratio(similar_form(a), similar_form(b))
+
+
+def is_similar(a: str, b: str, threshold: float) -> bool:
+    """
+    Checks if similar_strings(a, b) reaches threshold.
+    The coefficient is at most 2 * min(len) / (len(a) + len(b)), so strings
+    of too different lengths are told apart without computing it.
+    """
+    from Levenshtein import ratio
+
+    a, b = similar_form(a), similar_form(b)
+    total = len(a) + len(b)
+    if total and 2 * min(len(a), len(b)) < threshold * total:
+        return False
+    return ratio(a, b) >= threshold
 
 
 def string_is_quoted(value: str) -> bool:
@@ -93,75 +134,120 @@ def line_begins_with_value(value: str, line: str) -> bool:
     return value_str.startswith(line_str)
 
 
-def find_line_number(filepath: Path, key: str, value: str, foundlines: List[int]) -> int:
+class LineIndex:
+    """
+    Per-file index used to locate findings that have no known line.
+    The file is read on the first lookup, into maps from each word to the
+    lines containing it and from each normalised line to its line numbers,
+    so that a lookup only evaluates the lines that can match.
+    Reported line numbers are tracked in foundlines, a set or a list.
+    """
+
+    def __init__(self, filepath: Path, foundlines: Optional[Union[Set[int], List[int]]] = None):
+        self.filepath = filepath
+        self.foundlines = set() if foundlines is None else foundlines
+        self.mark = self.foundlines.append if isinstance(self.foundlines, list) else self.foundlines.add
+        self.lines = None  # Line number: (line, normalised line) for non-empty lines
+        self.words = None  # Word: line numbers
+        self.vocabulary = ""  # Words, one per line, to find words containing a given text
+        self.offsets = []  # Offset of each word in vocabulary
+        self.word_lines = []  # Line numbers of each word in vocabulary
+        self.simple = None  # Normalised line: line numbers
+        self.lengths = []  # Lengths of normalised lines
+
+    def load(self) -> Dict[int, Tuple[str, str]]:
+        self.lines, self.words, self.simple = {}, {}, {}
+        with self.filepath.open() as fh:
+            for line_number, line in enumerate(fh, 1):
+                if not strip_string(line):
+                    continue
+                line_str = simple_string(line)
+                self.lines[line_number] = (line, line_str)
+                self.simple.setdefault(line_str, []).append(line_number)
+                for word in set(WORD_REGEX.findall(line)):
+                    self.words.setdefault(word, []).append(line_number)
+        self.offsets, offset = [], 0
+        for word in self.words:
+            self.offsets.append(offset)
+            offset += len(word) + 1
+        self.vocabulary = "\n".join(self.words)
+        self.word_lines = list(self.words.values())
+        self.lengths = sorted({len(line_str) for line_str in self.simple})
+        return self.lines
+
+    def containing(self, value: str) -> Optional[Set[int]]:
+        """
+        Returns the lines that may contain value, or None for all lines.
+        Any such line has the longest word of value inside one of its words,
+        and as a whole word when value has other characters on both sides.
+        """
+        found = max(WORD_REGEX.finditer(value), key=lambda match: len(match.group()), default=None)
+        if not found:
+            return None
+        word = found.group()
+        if 0 < found.start() and found.end() < len(value):
+            return set(self.words.get(word, []))
+        ret = set()
+        start = self.vocabulary.find(word)
+        while start >= 0:
+            idx = bisect_right(self.offsets, start) - 1
+            ret.update(self.word_lines[idx])
+            if idx + 1 == len(self.offsets):
+                break
+            start = self.vocabulary.find(word, self.offsets[idx + 1])
+        return ret
+
+    def find(self, key: str, value: str) -> int:
+        """
+        Returns line number with given key and value
+        """
+        if not value:
+            return 0
+        if self.lines is None:
+            self.load()
+        value = value.split("\n")[0]
+        value_str = simple_string(value)
+        candidates = self.containing(value)
+        if candidates is None:
+            candidates = self.lines.keys()
+        else:
+            for length in self.lengths:  # Lines that value starts with
+                if length > len(value_str):
+                    break
+                candidates.update(self.simple.get(value_str[:length], []))
+        value_line_number = 0
+        for line_number in sorted(candidates):
+            if line_number in self.foundlines:
+                continue
+            line, line_str = self.lines[line_number]
+            if line_with_key_value(key, value, line) or value_str.startswith(line_str):
+                self.mark(line_number)
+                return line_number
+            elif line_with_value(value, line):
+                value_line_number = line_number
+        if value_line_number:
+            self.mark(value_line_number)
+        return value_line_number
+
+
+def find_line_number(filepath: Path, key: str, value: str, foundlines: Union[Set[int], List[int]]) -> int:
     """
     Returns line number in file with given key and value
     """
-    if not value:
-        return 0
-    value = value.split("\n")[0]
-    value_line_number = 0
-    for line_number, line in enumerate(filepath.open().readlines(), 1):
-        if not strip_string(line):
-            continue
-        if line_number in foundlines:
-            continue
-        if line_with_key_value(key, value, line):
-            foundlines.append(line_number)
-            return line_number
-        elif line_begins_with_value(value, line):
-            foundlines.append(line_number)
-            return line_number
-        elif line_with_value(value, line):
-            value_line_number = line_number
-    if value_line_number:
-        foundlines.append(value_line_number)
-    return value_line_number
+    return LineIndex(filepath, foundlines).find(key, value)
 
 
 def load_yaml_from_file(filepath: Path) -> dict:
-    ret = safe_load(filepath.read_text())
+    import yaml
+
+    ret = yaml.load(filepath.read_text(), Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
     if not isinstance(ret, dict):
         return {}
     return ret
 
 
 def secret_checksum(secret: Secret) -> str:
-    secret = json.dumps(secret._asdict())
+    secret = json.dumps(dict(zip(Secret._fields[:6], secret)))  # Column and rule ID are not part of the identity
     chk = md5()
     chk.update(secret.encode("utf-8"))
     return chk.hexdigest()
-
-
-def format_secret(secret: Secret) -> str:
-    return (
-        secret_checksum(secret)
-        + ":\n"
-        + '  file: "'
-        + str(secret.file)
-        + '"\n'
-        + '  line: "'
-        + str(secret.line)
-        + '"\n'
-        + '  key: "'
-        + str(secret.key)
-        + '"\n'
-        + '  value: "'
-        + str(secret.value)
-        + '"\n'
-        + '  message: "'
-        + str(secret.message)
-        + '"\n'
-        + '  severity: "'
-        + str(secret.severity)
-        + '"\n'
-        + "\n"
-    )
-
-
-def format_stdout(secret: Secret, output: Optional[Path] = None) -> str:
-    if output:
-        output.open("a").write(format_secret(secret))
-    data = json.dumps(secret._asdict())
-    print(data)
-    return data